@@ -6,6 +6,7 @@ Analysis Agent - LLM 驱动的深度分析者
 使用 MCP (Model Context Protocol) 标准工具系统
 """
 from typing import Dict, Any, List, Optional
+from itertools import islice
 from loguru import logger
 import time
 
@@ -18,6 +19,17 @@ from app.core.tool_adapter import create_tool_bridge
 from app.core.monitoring import get_monitoring_system
 from app.core.resilience import get_llm_circuit, get_llm_rate_limiter, get_tool_circuit
 
+# 初始消息中展示的扫描结果条目
+_SCAN_RESULT_ITEM_TMPL = """
+{index}. **{title}** ({severity})
+   - 类型: {type}
+   - 文件: {file_path}
+   - 描述: {description}...
+"""
+
+# 初始消息中最多展示的扫描结果数量
+_MAX_LISTED_SCAN_RESULTS = 10
+
 
 class AnalysisAgent(BaseAgent):
     """
@@ -139,6 +151,11 @@ class AnalysisAgent(BaseAgent):
         analysis_context["_scan_results"] = scan_results
 
         tool_handlers, llm_tools = create_tool_bridge(context=analysis_context)
+        # 同一项目代码未变化（指纹相同）时，只读工具结果可在多次审计间复用；
+        # 没有侦察指纹时不使用共享缓存
+        project_id = analysis_context.get("project_id")
+        fingerprint = analysis_context.get("project_fingerprint")
+        shared_cache_namespace = f"{project_id}:{fingerprint}" if project_id and fingerprint else None
 
         self.think(f"已加载 {len(llm_tools)} 个 MCP 工具")
         logger.info(f"[Analysis Agent] 已加载 {len(llm_tools)} 个工具: {[t.get('function', {}).get('name') for t in llm_tools]}")
@@ -150,7 +167,8 @@ class AnalysisAgent(BaseAgent):
             tool_handlers=tool_handlers,
             system_prompt=system_prompt,
             max_iterations=self.max_iterations,
-            event_callback=self._publish_event
+            event_callback=self._publish_event,
+            shared_cache_namespace=shared_cache_namespace,
         )
 
         await loop.run(user_input=initial_message)
@@ -167,7 +185,7 @@ class AnalysisAgent(BaseAgent):
             "status": "success",
             "result": self._confirmed_findings,
             "findings": self._confirmed_findings,
-            "task_handoff": next_handoff.to_dict() if next_handoff else None,
+            "task_handoff": next_handoff,
             "stats": {
                 "total_analyzed": len(scan_results),
                 "confirmed": len(self._confirmed_findings),
@@ -183,6 +201,7 @@ class AnalysisAgent(BaseAgent):
             "audit_id": input_data.get("audit_id"),
             "project_id": input_data.get("project_id"),
             "project_path": input_data.get("project_path"),
+            "project_fingerprint": input_data.get("project_fingerprint"),
             "scan_results": scan_results,
         }
 
@@ -193,18 +212,21 @@ class AnalysisAgent(BaseAgent):
         scan_results = context["scan_results"]
         scan_count = len(scan_results)
 
-        # 格式化扫描结果列表
-        results_list = ""
-        for i, result in enumerate(scan_results[:10], 1):  # 只显示前10个
-            results_list += f"""
-{i}. **{result.get('title', '未命名')}** ({result.get('severity', 'unknown').upper()})
-   - 类型: {result.get('type', 'unknown')}
-   - 文件: {result.get('file_path', 'unknown')}
-   - 描述: {result.get('description', '无描述')[:100]}...
-"""
+        # 格式化扫描结果列表（只显示前 10 个）
+        results_list = "".join(
+            _SCAN_RESULT_ITEM_TMPL.format(
+                index=i,
+                title=result.get('title', '未命名'),
+                severity=result.get('severity', 'unknown').upper(),
+                type=result.get('type', 'unknown'),
+                file_path=result.get('file_path', 'unknown'),
+                description=result.get('description', '无描述')[:100],
+            )
+            for i, result in enumerate(islice(scan_results, _MAX_LISTED_SCAN_RESULTS), 1)
+        )
 
-        if scan_count > 10:
-            results_list += f"\n... 还有 {scan_count - 10} 个扫描结果\n"
+        if scan_count > _MAX_LISTED_SCAN_RESULTS:
+            results_list += f"\n... 还有 {scan_count - _MAX_LISTED_SCAN_RESULTS} 个扫描结果\n"
 
         return f"""⚠️ **重要：你必须对每个扫描结果做出明确判断**
 
@@ -10,12 +10,24 @@ Agent 基类
 - 事件发射增强
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List, Callable, AsyncIterator
+from typing import Dict, Any, Optional, List, Callable, AsyncIterator, Tuple
 from loguru import logger
 import time
 import asyncio
 import json
 
+# 事件管理器（首次发布事件时导入一次，导入时会初始化事件持久化数据库）
+_event_manager = None
+
+
+def _get_event_manager():
+    """获取事件管理器（延迟导入，只导入一次）"""
+    global _event_manager
+    if _event_manager is None:
+        from app.services.event_manager import event_manager
+        _event_manager = event_manager
+    return _event_manager
+
 
 class BaseAgent(ABC):
     """
@@ -143,7 +155,6 @@ class BaseAgent(ABC):
         if self._audit_id:
             # 使用 asyncio.create_task 避免阻塞
             try:
-                import asyncio
                 # 显式使用 'thinking' 事件类型，对应前端映射
                 asyncio.create_task(self._publish_event("thinking", {"message": thought}))
             except Exception as e:
@@ -161,36 +172,56 @@ class BaseAgent(ABC):
             return
 
         try:
-            from app.services.event_manager import event_manager
-
-            # 创建事件数据
-            message = data.get("message") or str(data)
-
-            # 提取重要字段到根级别，同时也保留在 metadata 中
+            event_manager = _get_event_manager()
             await event_manager.add_event(
                 task_id=self._audit_id,
                 sequence=0,  # EventManager 会自动分配序列号
-                event_type=event_type,
-                agent_type=self.name,
-                message=message,
-                # 重要字段直接放在根级别
-                progress=data.get("progress"),
-                status=data.get("status"),
-                phase=data.get("phase"),
-                # 工具相关
-                tool_name=data.get("tool"),
-                tool_input=data.get("tool_input"),
-                tool_output=data.get("tool_output"),
-                tool_duration_ms=data.get("tool_duration_ms"),
-                # 其他
-                finding_id=data.get("finding_id"),
-                tokens_used=data.get("tokens_used", 0),
-                # 完整数据保存在 metadata 中
-                metadata=data,
+                **self._event_fields(event_type, data),
             )
         except Exception as e:
             logger.warning(f"[{self.name}] 发布事件失败: {e}")
 
+    async def _publish_events(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        批量发布 Agent 事件（一次获取事件管理器锁，持久化合并为单个事务）
+
+        Args:
+            events: (事件类型, 事件数据) 列表，按顺序发布
+        """
+        if not self._audit_id or not events:
+            return
+
+        try:
+            event_manager = _get_event_manager()
+            await event_manager.add_events(
+                self._audit_id,
+                [self._event_fields(event_type, data) for event_type, data in events],
+            )
+        except Exception as e:
+            logger.warning(f"[{self.name}] 批量发布事件失败: {e}")
+
+    def _event_fields(self, event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """构建事件字段：重要字段提升到根级别，完整数据保留在 metadata 中"""
+        return {
+            "event_type": event_type,
+            "agent_type": self.name,
+            "message": data.get("message") or str(data),
+            # 重要字段直接放在根级别
+            "progress": data.get("progress"),
+            "status": data.get("status"),
+            "phase": data.get("phase"),
+            # 工具相关
+            "tool_name": data.get("tool"),
+            "tool_input": data.get("tool_input"),
+            "tool_output": data.get("tool_output"),
+            "tool_duration_ms": data.get("tool_duration_ms"),
+            # 其他
+            "finding_id": data.get("finding_id"),
+            "tokens_used": data.get("tokens_used", 0),
+            # 完整数据保存在 metadata 中
+            "metadata": data,
+        }
+
     async def call_llm(
         self,
         prompt: str,
@@ -8,25 +8,263 @@ Orchestrator Agent - LLM 驱动的自主编排者
 - LLM 分析结果，决定下一步
 - 重复直到 LLM 决定完成
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Deque, Set, Tuple
 from loguru import logger
+import asyncio
 import time
 import json
 import re
-from dataclasses import dataclass
+import sys
+import uuid
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field, fields
+from os.path import basename
+
+import orjson
 
 from app.agents.base import BaseAgent
 from app.services.llm import LLMService, LLMProvider
 from app.services.llm.adapters.base import LLMMessage
 from app.core.agent_registry import agent_registry
 from app.core.graph_controller import agent_graph_controller
+from app.core.task_handoff import TaskHandoff
 from app.services.rust_client import rust_client
 from app.core.audit_phase import AuditPhaseManager, AuditPhase, get_phase_manager
 from app.core.monitoring import get_monitoring_system
 from app.core.resilience import get_llm_circuit, get_llm_rate_limiter, with_retry, LLM_RETRY_CONFIG
 
 
-@dataclass
+# 高频比较的角色 / Agent 名称常量（显式驻留，保证来自 JSON 的字符串也走指针比较快路径）
+_ROLE_SYSTEM = sys.intern("system")
+_ROLE_USER = sys.intern("user")
+_ROLE_ASSISTANT = sys.intern("assistant")
+_AGENT_RECON = sys.intern("recon")
+_AGENT_ANALYSIS = sys.intern("analysis")
+_AGENT_VERIFICATION = sys.intern("verification")
+
+# 汇总中固定展示的严重程度
+_SEVERITY_LEVELS = ("critical", "high", "medium", "low")
+
+# 发现汇总的固定头部模板
+_SUMMARY_HEADER_TMPL = (
+    "## 当前发现汇总\n\n"
+    "**总计**: {total} 个漏洞\n\n"
+    "### 严重程度分布\n"
+    "- Critical: {critical}\n"
+    "- High: {high}\n"
+    "- Medium: {medium}\n"
+    "- Low: {low}\n\n"
+    "### 漏洞类型分布\n"
+)
+
+# 子 Agent 任务的共享项目头
+# 所有子 Agent 的 prompt 以相同字节开头，使上游 provider 的前缀缓存（KV cache）可以复用；
+# 多数 provider 只缓存 >= 128 token 的前缀，因此必须保持逐字节一致（不能包含时间戳等可变内容）
+_PROJECT_HEADER = "Project: {project_id}\nAudit: {audit_id}\nType: {audit_type}\n\n"
+
+# 快速审计的固定调度顺序 (agent, task)，不经过 LLM 决策
+_QUICK_AUDIT_PLAN: Tuple[Tuple[str, str], ...] = (
+    (_AGENT_RECON, "分析项目结构、技术栈和入口点"),
+    (_AGENT_ANALYSIS, "对侦察发现的高风险区域进行安全分析"),
+)
+
+# 各审计类型完整流程需要调度的子 Agent
+_REQUIRED_AGENTS_BY_TYPE = {
+    "full": frozenset({_AGENT_RECON, _AGENT_ANALYSIS, _AGENT_VERIFICATION}),
+    "quick": frozenset({_AGENT_RECON, _AGENT_ANALYSIS}),
+}
+
+# ReAct 决策解析正则（模块导入时编译一次）
+_MARKDOWN_LABEL_RE = re.compile(r'\*\*(Thought|Action Input|Action):\*\*')
+_THOUGHT_RE = re.compile(r'Thought:\s*(.*?)(?=Action:|$)', re.DOTALL)
+_ACTION_RE = re.compile(r'Action:\s*(\w+)')
+_ACTION_INPUT_RE = re.compile(r'Action Input:\s*(.*?)(?=Thought:|Observation:|$)', re.DOTALL)
+_CODE_FENCE_RE = re.compile(r'```(?:json)?\s*')
+
+# Anthropic 提示词缓存断点（OpenAI 等 provider 自动缓存前缀，适配器会忽略该字段）
+_CACHE_EPHEMERAL = {"type": "ephemeral"}
+
+# 分析完成后附加到观察结果的提示，告诉 LLM 接下来的选择
+_ANALYSIS_DONE_HINT = """
+
+---
+
+## 📊 分析已完成
+
+分析Agent已完成代码审计。现在你可以：
+
+1. **查看上述分析结果**
+2. **如果发现高危漏洞，强烈建议调度 `verification` Agent 进行验证**
+3. 如果满意，也可以调用 `finish` 完成审计
+
+**建议：如果有高危漏洞，请务必验证！**
+"""
+
+# 系统提示词模板：按 audit_type 在模块导入时预先特化，
+# 同一审计类型的请求共享逐字节一致的系统提示词前缀，提高上游前缀缓存命中率
+_SYSTEM_PROMPT_TEMPLATE = """你是 CTX-Audit 的编排 Agent，负责**自主**协调整个安全审计流程。
+
+## 你的角色
+你是整个审计流程的**大脑**，你需要：
+1. 自主思考和决策
+2. 根据观察结果动态调整策略
+3. 决定何时调用哪个子 Agent
+4. 判断何时审计完成
+
+## 🧠 战略思考协议 (Strategic Thinking Protocol) ⚡⚡⚡
+作为编排者，你的 `Thought` 必须包含以下维度：
+
+### 1. 全局态势感知 (Situational Awareness)
+- **当前阶段**：我们在审计的哪个阶段？(侦察/分析/验证)
+- **信息完整性**：我们对项目结构、技术栈、攻击面了解多少？是否还有盲区？
+
+### 2. 决策逻辑 (Decision Logic)
+- **Why**: 为什么要调用这个 Agent？(例如："Recon 发现大量 API 端点，需要 Analysis 深度扫描")
+- **Expectation**: 期望它返回什么？(例如："期望发现未授权访问漏洞")
+
+{reflection}## 你可以调度的子 Agent
+1. **recon**: 信息收集 Agent - 分析项目结构、技术栈、入口点
+2. **analysis**: 分析 Agent - 深度代码审计、漏洞检测
+{agent}
+## 你可以使用的操作
+
+### 1. 调度子 Agent
+```
+Action: dispatch_agent
+Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}
+```
+
+### 2. 汇总发现
+```
+Action: summarize
+Action Input: {{}}
+```
+
+### 3. 完成审计
+```
+Action: finish
+Action Input: {{"conclusion": "审计结论"}}
+```
+
+### 4. 查看完整观察结果
+较长的观察结果在对话中只保留摘要，需要细节时按步骤 ID 取回原文：
+```
+Action: get_observation_detail
+Action Input: {{"step_id": "step_1"}}
+```
+
+## 工作方式
+每一步，你需要：
+
+1. **Thought**: 严格遵循 [战略思考协议]。分析当前状态，评估已有的发现，决定下一步的最佳策略。
+2. **Action**: 选择一个操作 (dispatch_agent/summarize/get_observation_detail/finish)
+3. **Action Input**: 提供操作参数 (必须是有效的 JSON)
+
+## 输出格式
+每一步必须严格按照以下格式（禁止使用 Markdown 格式标记）：
+
+```
+Thought: 
+[Situational Awareness] Recon 已完成，确认项目为 Python Flask 应用，发现 3 个 API 端点和 1 个数据库连接文件。
+[Decision Logic] 由于发现了数据库连接代码，存在 SQL 注入风险，需要调度 Analysis Agent 进行深度扫描。
+[Expectation] 期望 Analysis Agent 能覆盖这些高风险文件。
+
+Action: dispatch_agent
+Action Input: {{"agent": "analysis", "task": "深度分析数据库连接和API接口"}}
+```
+
+## ⚠️ 重要格式要求
+
+**禁止使用 Markdown 格式标记！** 你的输出必须是纯文本格式。
+
+## 审计流程要求
+
+虽然你需要自主决策，但通常遵循以下逻辑：
+
+1. **侦察阶段**：调用 `recon` Agent 了解项目。如果信息不足，可以再次调用。
+2. **分析阶段**：调用 `analysis` Agent 进行深度分析。
+   - 如果发现大量漏洞，可以考虑分批分析。
+   - 如果没有发现漏洞，但你怀疑有遗漏，可以指定特定的关注点再次调用 `analysis`。
+{flow}
+**重要：**
+- 必须先侦察 (recon)。
+- 不要急于 finish，确保已充分挖掘潜在漏洞。
+- 只有在确认没有更多工作需要做时，才调用 finish。
+- Action Input 必须是有效的 JSON 格式。
+
+## 示例流程
+
+```
+Thought: 我需要先了解项目的结构和技术栈，以便进行后续的安全审计
+Action: dispatch_agent
+Action Input: {{"agent": "recon", "task": "分析项目结构、技术栈和入口点"}}
+
+Observation: [recon 结果...]
+
+Thought: 
+[Situational Awareness] 项目是 Python Flask 应用，发现了一些高风险区域。
+[Decision Logic] 现在我需要对这些区域进行深度分析。
+
+Action: dispatch_agent
+Action Input: {{"agent": "analysis", "task": "深度分析高风险区域的代码安全问题"}}
+
+Observation: [analysis 结果...]
+
+{example}Action: finish
+Action Input: {{"conclusion": "审计结论"}}
+```
+
+## 启动要求
+收到项目信息后：
+- **不能直接调用 finish！必须先调度 recon Agent！**
+- 首先输出你的思考，然后调用 dispatch_agent 调度 recon Agent。
+
+现在开始审计，请先调用 recon Agent！"""
+
+# 初始用户消息：只携带每次审计不同的标识，保持在系统提示词之后且尽量短小
+_INITIAL_MESSAGE_TMPL = """请开始对以下项目进行安全审计。
+
+## 项目信息
+- Project ID: {project_id}
+- Audit ID: {audit_id}
+- Audit Type: {audit_type}"""
+
+_SYSTEM_PROMPT_FULL_SECTIONS = {
+    "reflection": """### 3. 自我反思 (Self-Reflection)
+- 我是否在重复调度同一个 Agent 而没有新发现？
+- 我是否遗漏了某些高危文件？
+
+""",
+    "agent": """3. **verification**: 验证 Agent - 验证发现的漏洞，生成 PoC
+""",
+    "flow": """3. **验证阶段**（推荐）：如果有高危漏洞，调用 `verification` Agent 进行验证。
+4. **完成**：调用 `finish` 完成审计。
+""",
+    "example": """Thought: 分析发现了一个 SQL 注入漏洞，我需要验证它是否真实存在
+Action: dispatch_agent
+Action Input: {"agent": "verification", "task": "验证 SQL 注入漏洞"}
+
+Observation: [verification 结果...]
+
+Thought: 已完成验证，漏洞确认为真实。审计工作已经充分完成
+""",
+}
+
+# 快速审计：不包含验证阶段和自我反思协议，减少每次请求的 token 数
+_SYSTEM_PROMPT_QUICK_SECTIONS = {
+    "reflection": "",
+    "agent": "",
+    "flow": "3. **完成**：调用 `finish` 完成审计。\n",
+    "example": "Thought: 分析已覆盖高风险区域，快速审计工作已经完成\n",
+}
+
+_SYSTEM_PROMPT_BY_TYPE = {
+    "full": _SYSTEM_PROMPT_TEMPLATE.format(**_SYSTEM_PROMPT_FULL_SECTIONS),
+    "quick": _SYSTEM_PROMPT_TEMPLATE.format(**_SYSTEM_PROMPT_QUICK_SECTIONS),
+}
+
+
+@dataclass(slots=True)
 class AgentStep:
     """执行步骤"""
     thought: str
@@ -36,6 +274,67 @@ class AgentStep:
     sub_agent_result: Optional[Any] = None
 
 
+@dataclass(slots=True)
+class Finding:
+    """
+    紧凑的发现表示（可选）
+
+    启用 compact_findings 配置后，Orchestrator 内部以该结构存储发现，
+    仅在交给子 Agent 或返回结果时转换为字典。
+    提供与 dict 兼容的 get / update，内部逻辑无需区分两种表示。
+    """
+    id: str
+    severity: str = "medium"
+    vulnerability_type: str = "other"
+    title: str = ""
+    file_path: str = ""
+    line_start: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Finding":
+        """从标准化后的字典创建"""
+        known = {k: v for k, v in data.items() if k in _FINDING_FIELDS}
+        extra = {k: v for k, v in data.items() if k not in _FINDING_FIELDS}
+        return cls(**known, extra=extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = {name: getattr(self, name) for name in _FINDING_FIELDS}
+        data.update(self.extra)
+        return data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FINDING_FIELDS:
+            return getattr(self, key)
+        return self.extra.get(key, default)
+
+    def update(self, values: Dict[str, Any]) -> None:
+        for key, value in values.items():
+            if key in _FINDING_FIELDS:
+                setattr(self, key, value)
+            else:
+                self.extra[key] = value
+
+
+_FINDING_FIELDS = frozenset(f.name for f in fields(Finding) if f.name != "extra")
+
+
+def _default_summary_fmt(result: Any, new_count: int) -> str:
+    """未知 Agent 的结果摘要"""
+    return "执行完成"
+
+
+def _step_to_dict(s: AgentStep) -> Dict[str, Any]:
+    """将执行步骤转换为结果摘要（观察结果截断到 500 字符）"""
+    return {
+        "thought": s.thought,
+        "action": s.action,
+        "action_input": s.action_input,
+        "observation": s.observation[:500] if s.observation else None,
+    }
+
+
 class OrchestratorAgent(BaseAgent):
     """
     编排 Agent - ReAct 模式
@@ -48,7 +347,34 @@ class OrchestratorAgent(BaseAgent):
     5. 重复直到 LLM 决定完成
     """
 
-    def __init__(self, config: Optional[Dict[str, Any]] = None):
+    # 调度子 Agent 前的阶段转换: agent -> (阶段, 进度, 消息)
+    _AGENT_PHASE_PRE = {
+        _AGENT_RECON: (AuditPhase.RECONNAISSANCE, 15, "开始侦察项目结构"),
+        _AGENT_ANALYSIS: (AuditPhase.ANALYSIS, 45, "开始分析漏洞"),
+        _AGENT_VERIFICATION: (AuditPhase.VERIFICATION, 75, "开始验证漏洞"),
+    }
+
+    # 子 Agent 完成后的阶段转换: agent -> (阶段, 进度, 消息, 观察结果附加提示)
+    _AGENT_PHASE_POST = {
+        _AGENT_RECON: (AuditPhase.ANALYSIS, 35, "侦察完成，准备分析", ""),
+        _AGENT_ANALYSIS: (AuditPhase.VERIFICATION, 70, "分析完成，准备验证", _ANALYSIS_DONE_HINT),
+        _AGENT_VERIFICATION: (AuditPhase.COMPLETE, 95, "验证完成，准备生成报告", ""),
+    }
+
+    # 发现字段别名: (原字段, 标准字段)
+    _ALIAS_MAP = (("file", "file_path"), ("line", "line_start"))
+
+    # 无信息量的通用类型，不作为 vulnerability_type
+    _GENERIC_TYPES = frozenset({"vulnerability", "finding", "issue"})
+
+    # 子 Agent 结果摘要格式化: agent -> (result, 新发现数量) -> 摘要
+    _SUMMARY_FMT = {
+        _AGENT_RECON: lambda r, n: f"发现 {n} 个潜在问题。项目技术栈: {r.get('tech_stack', {}).get('languages', [])}",
+        _AGENT_ANALYSIS: lambda r, n: f"分析完成，发现 {n} 个漏洞。",
+        _AGENT_VERIFICATION: lambda r, n: f"验证完成。确认 {r.get('total_verified', 0)} 个漏洞，排除 {r.get('total_false_positives', 0)} 个误报。",
+    }
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
         super().__init__(name="orchestrator", config=config)
 
         config = config or {}
@@ -56,9 +382,22 @@ class OrchestratorAgent(BaseAgent):
         self._llm: Optional[LLMService] = None
 
         self.max_iterations = config.get("max_iterations", 20)
-        self._conversation: List[Dict[str, Any]] = []
+        self._conversation: List[LLMMessage] = []
+        # 对话历史上限：系统提示词和初始消息常驻，超出时丢弃最早的轮次
+        self._max_conversation_messages: int = config.get(
+            "max_conversation_messages", 2 * self.max_iterations + 2
+        )
         self._steps: List[AgentStep] = []
         self._all_findings: List[Dict[str, Any]] = []
+        # finding id -> finding 索引，与 _all_findings 同步维护
+        self._findings_by_id: Dict[str, Dict[str, Any]] = {}
+        # 严重程度 / 漏洞类型计数，随发现增量更新
+        self._severity_counts: Counter = Counter()
+        self._type_counts: Counter = Counter()
+        self._reset_findings()
+
+        # 文件路径 -> basename 缓存（超过上限时清空）
+        self._basename_cache: Dict[str, str] = {}
 
         # 运行时上下文
         self._runtime_context: Dict[str, Any] = {}
@@ -69,9 +408,42 @@ class OrchestratorAgent(BaseAgent):
         # 保存各个 Agent 的完整结果
         self._agent_results: Dict[str, Dict[str, Any]] = {}
 
+        # 最近一次子 Agent 交接（审计内直接传递对象，不做字典往返）
+        self._last_handoff: Optional[TaskHandoff] = None
+
         # 进度跟踪
         self._progress: int = 0
 
+        # 连续空响应 / 格式错误计数
+        self._empty_response_count: int = 0
+        self._format_error_count: int = 0
+
+        # 快速审计是否仍走 LLM 决策循环（默认按固定流程直接调度）
+        self._quick_audit_use_llm: bool = config.get("quick_audit_use_llm", False)
+
+        # 是否以紧凑的 Finding 结构存储发现（可选）
+        self._compact_findings: bool = config.get("compact_findings", False)
+
+        # 最近决策的哈希，用于检测 LLM 重复决策循环
+        self._decision_hashes: Deque[int] = deque(maxlen=4)
+
+        # 对话中的滚动缓存断点（系统提示词断点常驻，另保留最近两个，不超过 Anthropic 的 4 个上限）
+        self._cache_anchors: Deque[LLMMessage] = deque()
+        # 提示词缓存的写入 / 命中 token 统计
+        self._cache_usage: Counter = Counter()
+
+        # 停滞检测：(发现数量, 子 Agent 调度次数) 签名与连续无进展轮数
+        self._progress_signature: Tuple[int, int] = (0, 0)
+        self._stall_count: int = 0
+        self._max_stalled_iterations: int = config.get("max_stalled_iterations", 3)
+
+        # 本轮暂存待发布的事件 (event_type, data)
+        self._pending_events: List[Tuple[str, Dict[str, Any]]] = []
+
+        # 被压缩的完整观察结果: step_id -> observation
+        self._observations: Dict[str, str] = {}
+        self._observation_preview_chars: int = config.get("observation_preview_chars", 2000)
+
         # 集成审计阶段管理
         self._phase_manager: Optional[AuditPhaseManager] = None
         self._monitoring = get_monitoring_system()
@@ -80,7 +452,7 @@ class OrchestratorAgent(BaseAgent):
         self._llm_circuit = get_llm_circuit()
         self._llm_rate_limiter = get_llm_rate_limiter()
 
-    def _update_progress(self, progress: int, message: str = ""):
+    def _update_progress(self, progress: int, message: str = "") -> None:
         """更新审计进度"""
         self._progress = min(100, max(0, progress))
         if message:
@@ -88,9 +460,7 @@ class OrchestratorAgent(BaseAgent):
 
         # 发布进度事件到前端
         # 创建异步任务来发布事件（不阻塞主流程）
-        import asyncio
-
-        async def _publish_progress():
+        async def _publish_progress() -> None:
             try:
                 await self._publish_event("progress", {
                     "progress": self._progress,
@@ -108,7 +478,7 @@ class OrchestratorAgent(BaseAgent):
             pass
 
     @property
-    def llm(self):
+    def llm(self) -> LLMService:
         """延迟初始化 LLM 服务"""
         if self._llm is None:
             try:
@@ -136,9 +506,11 @@ class OrchestratorAgent(BaseAgent):
         self.think(f"开始编排审计任务: {audit_id}")
 
         try:
+            if context.get("audit_type", "quick") == "quick" and not self._quick_audit_use_llm:
+                return await self._execute_quick(context)
             return await self._execute_with_llm(context)
         except Exception as e:
-            logger.error(f"审计执行失败: {e}", exc_info=True)
+            logger.opt(exception=e).error("审计执行失败: {}", e)
             return {
                 "agent": self.name,
                 "status": "error",
@@ -146,11 +518,10 @@ class OrchestratorAgent(BaseAgent):
                 "thinking_chain": self.thinking_chain
             }
 
-    async def _execute_with_llm(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        """LLM 驱动的自主编排 - ReAct 模式"""
+    async def _initialize_audit(self, context: Dict[str, Any]) -> None:
+        """注册 Orchestrator、保存运行时上下文并重置单次审计状态"""
         audit_id = context["audit_id"]
         project_id = context["project_id"]
-        start_time = time.time()
 
         # 初始化阶段管理器
         self._phase_manager = get_phase_manager(audit_id)
@@ -182,32 +553,81 @@ class OrchestratorAgent(BaseAgent):
 
         # 初始化审计阶段
         await self._phase_manager.transition_to(AuditPhase.INITIALIZATION)
-        await self._publish_event("thinking", {
+        self._queue_event("thinking", {
             "message": f"审计阶段: {self._phase_manager.current_phase.value}"
         })
 
-        # 构建初始消息
-        system_prompt = self._get_system_prompt()
-        initial_message = self._format_initial_message(context)
-
-        # 初始化对话历史 - 使用 LLMMessage 对象
-        self._conversation = [
-            LLMMessage(role="system", content=system_prompt),
-            LLMMessage(role="user", content=initial_message),
-        ]
+        self._cache_anchors.clear()
+        self._cache_usage.clear()
+        self._observations.clear()
 
         self._steps = []
-        self._all_findings = []
+        self._reset_findings()
         self._agent_results = {}
+        self._last_handoff = None
         self._dispatched_tasks = {}
-        final_result = None
+        self._decision_hashes.clear()
+        self._progress_signature = (0, 0)
+        self._stall_count = 0
 
         # 初始化错误计数器
         self._empty_response_count = 0
         self._format_error_count = 0
 
+    async def _execute_quick(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """快速审计：按固定顺序调度 recon → analysis，不经过 LLM 决策循环"""
+        start_time = time.time()
+        self._pending_events.clear()
+        await self._initialize_audit(context)
+
+        self.think("快速审计：按固定流程调度子 Agent，跳过 LLM 编排")
+        self._queue_event("thinking", {
+            "message": "快速审计：按固定流程执行 recon → analysis"
+        })
+
+        try:
+            await self._phase_manager.transition_to(AuditPhase.PLANNING)
+
+            for agent_name, task in _QUICK_AUDIT_PLAN:
+                step = AgentStep(
+                    thought=f"快速审计固定流程：调度 {agent_name} Agent",
+                    action="dispatch_agent",
+                    action_input={"agent": agent_name, "task": task},
+                )
+                self._steps.append(step)
+                step.observation = await self._handle_dispatch_action(step)
+
+            return await self._build_success_result(start_time, None)
+
+        except Exception as e:
+            logger.opt(exception=e).error("Quick audit failed: {}", e)
+            await self._flush_events()
+            return {
+                "agent": self.name,
+                "status": "error",
+                "error": str(e),
+                "thinking_chain": self.thinking_chain
+            }
+
+    async def _execute_with_llm(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """LLM 驱动的自主编排 - ReAct 模式"""
+        start_time = time.time()
+        self._pending_events.clear()
+        await self._initialize_audit(context)
+
+        # 构建初始消息
+        system_prompt = self._get_system_prompt(self._runtime_context["audit_type"])
+        initial_message = self._format_initial_message(context)
+
+        # 初始化对话历史 - 使用 LLMMessage 对象
+        self._conversation = [
+            LLMMessage(role=_ROLE_SYSTEM, content=system_prompt, cache_control=_CACHE_EPHEMERAL),
+            LLMMessage(role=_ROLE_USER, content=initial_message),
+        ]
+        final_result = None
+
         self.think("Orchestrator Agent 启动，LLM 开始自主编排决策...")
-        await self._publish_event("thinking", {
+        self._queue_event("thinking", {
             "message": "Orchestrator Agent 启动，开始审计编排..."
         })
 
@@ -223,21 +643,28 @@ class OrchestratorAgent(BaseAgent):
                 try:
                     logger.debug(f"[Orchestrator] 发送 LLM 请求，当前对话历史长度: {len(self._conversation)}")
 
-                    # 应用速率限制
-                    await self._llm_rate_limiter.acquire()
+                    # 调用 LLM 前一次性发布本轮积累的事件
+                    await self._flush_events()
 
-                    # 使用熔断器保护 LLM 调用
-                    async def _llm_call():
-                        return await self.llm.generate(messages=self._conversation)
+                    # 限制对话长度，并将缓存断点移到对话末尾，下一轮即可复用到此为止的前缀
+                    self._trim_conversation()
+                    self._mark_cache_breakpoint()
 
-                    response = await self._llm_circuit.call(_llm_call)
+                    # 应用速率限制，并使用熔断器保护 LLM 调用
+                    async with self._llm_rate_limiter, self._llm_circuit:
+                        llm_start = time.perf_counter()
+                        response = await self.llm.generate(messages=self._conversation)
+                        llm_duration = time.perf_counter() - llm_start
                     llm_output = response.content if hasattr(response, 'content') else ""
 
-                    # 记录 LLM 调用指标
+                    # 记录 LLM 调用指标（优先使用 provider 返回的 usage，否则按 ~4 字节/token 估算）
+                    usage = getattr(response, "usage", None) or {}
+                    self._cache_usage["cache_creation_input_tokens"] += usage.get("cache_creation_input_tokens") or 0
+                    self._cache_usage["cache_read_input_tokens"] += usage.get("cache_read_input_tokens") or 0
                     await self._monitoring.record_llm_call(
                         model=self._llm_config.get("llm_model", "unknown"),
-                        tokens_used=len(llm_output.split()),  # 粗略估计
-                        duration=0.1,  # TODO: 实际测量
+                        tokens_used=usage.get("completion_tokens") or (len(llm_output) >> 2),
+                        duration=llm_duration,
                         success=True,
                     )
 
@@ -255,6 +682,8 @@ class OrchestratorAgent(BaseAgent):
                         error=e,
                     )
 
+                    await self._flush_events()
+
                     await self._publish_event("error", {
                         "message": f"LLM 调用失败: {str(e)}"
                     })
@@ -269,10 +698,11 @@ class OrchestratorAgent(BaseAgent):
                 if not llm_output or not llm_output.strip():
                     logger.warning(f"[Orchestrator] Empty LLM response")
                     # 空响应重试机制
-                    empty_count = getattr(self, '_empty_response_count', 0) + 1
-                    self._empty_response_count = empty_count
+                    self._empty_response_count += 1
+                    empty_count = self._empty_response_count
                     if empty_count >= 3:
                         error_msg = "连续 3 次收到空响应，停止审计"
+                        await self._flush_events()
                         await self._publish_event("error", {"message": error_msg})
                         return {
                             "agent": self.name,
@@ -281,7 +711,7 @@ class OrchestratorAgent(BaseAgent):
                             "thinking_chain": self.thinking_chain,
                         }
                     # 提示 LLM 重新输出
-                    self._conversation.append(LLMMessage(role="user", content="请输出你的决策：Thought + Action + Action Input"))
+                    self._conversation.append(LLMMessage(role=_ROLE_USER, content="请输出你的决策：Thought + Action + Action Input"))
                     continue
 
                 # 重置空响应计数
@@ -297,10 +727,11 @@ class OrchestratorAgent(BaseAgent):
 
                 if not step:
                     # LLM 输出格式不正确，提示重试
-                    format_count = getattr(self, '_format_error_count', 0) + 1
-                    self._format_error_count = format_count
+                    self._format_error_count += 1
+                    format_count = self._format_error_count
                     if format_count >= 3:
                         error_msg = "连续 3 次格式错误，停止审计"
+                        await self._flush_events()
                         await self._publish_event("error", {"message": error_msg})
                         return {
                             "agent": self.name,
@@ -308,27 +739,39 @@ class OrchestratorAgent(BaseAgent):
                             "error": error_msg,
                             "thinking_chain": self.thinking_chain,
                         }
-                    await self._publish_event("thinking", {
+                    self._queue_event("thinking", {
                         "message": f"LLM 输出格式错误 ({format_count}/3)，请重新输出"
                     })
-                    self._conversation.append(LLMMessage(role="assistant", content=llm_output))
-                    self._conversation.append(LLMMessage(role="user", content="请按照规定格式输出：Thought + Action + Action Input"))
+                    self._conversation.append(LLMMessage(role=_ROLE_ASSISTANT, content=llm_output))
+                    self._conversation.append(LLMMessage(role=_ROLE_USER, content="请按照规定格式输出：Thought + Action + Action Input"))
                     continue
 
                 # 重置格式错误计数
                 self._format_error_count = 0
 
+                # 检测重复决策：第二次重复时提示 LLM 推进，第三次直接结束
+                repeat_count = self._record_decision(step)
+                if repeat_count >= 3:
+                    logger.warning(f"[Orchestrator] 检测到重复决策循环 ({step.action})，自动结束审计")
+                    final_result = {"conclusion": "检测到重复决策循环，自动结束审计"}
+                    break
+                if repeat_count == 2:
+                    logger.warning(f"[Orchestrator] 检测到重复决策 ({step.action})，要求 LLM 推进流程")
+                    self._conversation.append(LLMMessage(role=_ROLE_ASSISTANT, content=llm_output))
+                    self._conversation.append(LLMMessage(role=_ROLE_USER, content="你重复了之前完全相同的决策，请根据已有观察结果推进到下一步（调度其他 Agent 或调用 finish）。"))
+                    continue
+
                 self._steps.append(step)
 
                 # 发送思考内容事件
                 if step.thought:
                     self.think(step.thought)
-                    await self._publish_event("thinking", {
+                    self._queue_event("thinking", {
                         "message": step.thought
                     })
 
                 # 添加 LLM 响应到历史
-                self._conversation.append(LLMMessage(role="assistant", content=llm_output))
+                self._conversation.append(LLMMessage(role=_ROLE_ASSISTANT, content=llm_output))
 
                 # 执行 LLM 决定的操作
                 if step.action == "finish":
@@ -336,10 +779,10 @@ class OrchestratorAgent(BaseAgent):
                     if len(self._steps) <= 2 and iteration == 1:
                         # 第一步就调用 finish，拒绝并要求先调度 recon
                         logger.warning(f"[Orchestrator] LLM 尝试在第一步直接调用 finish，拒绝")
-                        await self._publish_event("thinking", {
+                        self._queue_event("thinking", {
                             "message": "不能直接完成审计，必须先调度 recon Agent"
                         })
-                        self._conversation.append(LLMMessage(role="user", content="""
+                        self._conversation.append(LLMMessage(role=_ROLE_USER, content="""
 你不能直接调用 finish。必须按照审计流程执行：
 
 1. 首先调用 dispatch_agent 调度 recon Agent
@@ -357,137 +800,37 @@ Action Input: {"agent": "recon", "task": "侦察项目结构和技术栈"}
 
                     # LLM 决定完成审计
                     self.think("审计完成，LLM 判断审计已充分完成")
-                    await self._publish_event("status", {
+                    self._queue_event("status", {
                         "status": "completed",
                         "message": f"审计完成，发现 {len(self._all_findings)} 个漏洞"
                     })
                     final_result = step.action_input
                     break
 
-                elif step.action == "dispatch_agent":
-                    # LLM 决定调度子 Agent
-                    agent_name = step.action_input.get("agent", "")
-                    task = step.task = step.action_input.get("task", "")
-
-                    # 根据agent类型转换审计阶段
-                    if agent_name == "recon":
-                        await self._phase_manager.transition_to(AuditPhase.RECONNAISSANCE)
-                        self._update_progress(15, f"开始侦察项目结构")
-                    elif agent_name == "analysis":
-                        await self._phase_manager.transition_to(AuditPhase.ANALYSIS)
-                        self._update_progress(45, f"开始分析漏洞")
-                    elif agent_name == "verification":
-                        await self._phase_manager.transition_to(AuditPhase.VERIFICATION)
-                        self._update_progress(75, f"开始验证漏洞")
-
-                    self.think(f"调度 {agent_name} Agent: {task[:100]}")
-                    await self._publish_event("action", {
-                        "message": f"调度 {agent_name} Agent",
-                        "agent": agent_name,
-                        "task": task
-                    })
-
-                    try:
-                        observation = await self._dispatch_agent(step.action_input)
-                        step.observation = observation
-
-                        # 更新进度和阶段
-                        if agent_name == "recon":
-                            await self._phase_manager.transition_to(AuditPhase.ANALYSIS)
-                            self._update_progress(35, "侦察完成，准备分析")
-                        elif agent_name == "analysis":
-                            # 分析完成后，建议进入验证阶段
-                            await self._phase_manager.transition_to(AuditPhase.VERIFICATION)
-                            self._update_progress(70, "分析完成，准备验证")
-
-                            # 添加提示，告诉LLM接下来的选择
-                            observation = f"""{observation}
-
----
-
-## 📊 分析已完成
-
-分析Agent已完成代码审计。现在你可以：
-
-1. **查看上述分析结果**
-2. **如果发现高危漏洞，强烈建议调度 `verification` Agent 进行验证**
-3. 如果满意，也可以调用 `finish` 完成审计
-
-**建议：如果有高危漏洞，请务必验证！**
-"""
-                            step.observation = observation
-                        
-                        elif agent_name == "verification":
-                            await self._phase_manager.transition_to(AuditPhase.COMPLETE)
-                            self._update_progress(95, "验证完成，准备生成报告")
-
-                    except Exception as e:
-                        logger.error(f"[Orchestrator] Sub-agent {agent_name} failed: {e}")
-                        observation = f"## {agent_name} Agent 执行失败\n\n错误: {str(e)}"
-                        step.observation = observation
-                        await self._publish_event("error", {
-                            "message": f"{agent_name} Agent 执行失败: {str(e)[:100]}"
-                        })
-
-                    # 发送观察事件
-                    self.think(f"{agent_name} Agent 执行完成")
-
-                elif step.action == "summarize":
-                    # LLM 要求汇总
-                    self.think("汇总当前发现")
-                    await self._publish_event("thinking", {
-                        "message": "汇总当前发现"
-                    })
-                    observation = self._summarize_findings()
-                    step.observation = observation
-
                 else:
-                    observation = f"未知操作: {step.action}，可用操作: dispatch_agent, summarize, finish"
-                    step.observation = observation
-                    await self._publish_event("thinking", {
-                        "message": observation
-                    })
+                    handler = self._ACTION_HANDLERS.get(step.action)
+                    if handler:
+                        step.observation = await handler(self, step)
+                    else:
+                        step.observation = f"未知操作: {step.action}，可用操作: dispatch_agent, summarize, get_observation_detail, finish"
+                        self._queue_event("thinking", {
+                            "message": step.observation
+                        })
 
                 # 添加观察结果到历史
-                self._conversation.append(LLMMessage(role="user", content=f"Observation:\n{step.observation}"))
-
-            # 生成最终结果
-            duration_ms = int((time.time() - start_time) * 1000)
+                self._conversation.append(LLMMessage(role=_ROLE_USER, content=f"Observation:\n{self._compact_observation(step)}"))
 
-            # 更新进度到 100%
-            self._update_progress(100, "审计完成")
-
-            await self._publish_event("status", {
-                "status": "completed",
-                "message": f"Orchestrator 完成: {len(self._all_findings)} 个发现, {len(self._steps)} 轮决策"
-            })
+                # 停滞检测：连续多轮既没有新发现也没有新的子 Agent 调度时自动结束
+                if self._check_stalled():
+                    logger.warning(f"[Orchestrator] 连续 {self._stall_count} 轮无进展，自动结束审计")
+                    final_result = {"conclusion": "审计已连续多轮无新进展，自动结束审计"}
+                    break
 
-            return {
-                "agent": self.name,
-                "status": "success",
-                "result": {
-                    "findings": self._all_findings,
-                    "summary": final_result or self._generate_default_summary(),
-                    "steps": [
-                        {
-                            "thought": s.thought,
-                            "action": s.action,
-                            "action_input": s.action_input,
-                            "observation": s.observation[:500] if s.observation else None,
-                        }
-                        for s in self._steps
-                    ],
-                },
-                "thinking_chain": self.thinking_chain,
-                "duration_ms": duration_ms,
-                "stats": {
-                    "files_scanned": self._runtime_context.get("files_scanned", 0),
-                    "findings_count": len(self._all_findings),
-                }
-            }
+            return await self._build_success_result(start_time, final_result)
 
         except Exception as e:
-            logger.error(f"Orchestrator execution failed: {e}", exc_info=True)
+            logger.opt(exception=e).error("Orchestrator execution failed: {}", e)
+            await self._flush_events()
             return {
                 "agent": self.name,
                 "status": "error",
@@ -495,187 +838,159 @@ Action Input: {"agent": "recon", "task": "侦察项目结构和技术栈"}
                 "thinking_chain": self.thinking_chain
             }
 
-    def _get_system_prompt(self) -> str:
-        """获取系统提示词"""
-        return """你是 CTX-Audit 的编排 Agent，负责**自主**协调整个安全审计流程。
-
-## 你的角色
-你是整个审计流程的**大脑**，你需要：
-1. 自主思考和决策
-2. 根据观察结果动态调整策略
-3. 决定何时调用哪个子 Agent
-4. 判断何时审计完成
-
-## 🧠 战略思考协议 (Strategic Thinking Protocol) ⚡⚡⚡
-作为编排者，你的 `Thought` 必须包含以下维度：
-
-### 1. 全局态势感知 (Situational Awareness)
-- **当前阶段**：我们在审计的哪个阶段？(侦察/分析/验证)
-- **信息完整性**：我们对项目结构、技术栈、攻击面了解多少？是否还有盲区？
-
-### 2. 决策逻辑 (Decision Logic)
-- **Why**: 为什么要调用这个 Agent？(例如："Recon 发现大量 API 端点，需要 Analysis 深度扫描")
-- **Expectation**: 期望它返回什么？(例如："期望发现未授权访问漏洞")
-
-### 3. 自我反思 (Self-Reflection)
-- 我是否在重复调度同一个 Agent 而没有新发现？
-- 我是否遗漏了某些高危文件？
-
-## 你可以调度的子 Agent
-1. **recon**: 信息收集 Agent - 分析项目结构、技术栈、入口点
-2. **analysis**: 分析 Agent - 深度代码审计、漏洞检测
-3. **verification**: 验证 Agent - 验证发现的漏洞，生成 PoC
-
-## 你可以使用的操作
-
-### 1. 调度子 Agent
-```
-Action: dispatch_agent
-Action Input: {"agent": "recon", "task": "侦察项目结构和技术栈"}
-```
-
-### 2. 汇总发现
-```
-Action: summarize
-Action Input: {}
-```
-
-### 3. 完成审计
-```
-Action: finish
-Action Input: {"conclusion": "审计结论"}
-```
-
-## 工作方式
-每一步，你需要：
-
-1. **Thought**: 严格遵循 [战略思考协议]。分析当前状态，评估已有的发现，决定下一步的最佳策略。
-2. **Action**: 选择一个操作 (dispatch_agent/summarize/finish)
-3. **Action Input**: 提供操作参数 (必须是有效的 JSON)
-
-## 输出格式
-每一步必须严格按照以下格式（禁止使用 Markdown 格式标记）：
-
-```
-Thought: 
-[Situational Awareness] Recon 已完成，确认项目为 Python Flask 应用，发现 3 个 API 端点和 1 个数据库连接文件。
-[Decision Logic] 由于发现了数据库连接代码，存在 SQL 注入风险，需要调度 Analysis Agent 进行深度扫描。
-[Expectation] 期望 Analysis Agent 能覆盖这些高风险文件。
-
-Action: dispatch_agent
-Action Input: {"agent": "analysis", "task": "深度分析数据库连接和API接口"}
-```
-
-## ⚠️ 重要格式要求
-
-**禁止使用 Markdown 格式标记！** 你的输出必须是纯文本格式。
-
-## 审计流程要求
+    async def _build_success_result(
+        self,
+        start_time: float,
+        final_result: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """生成最终结果并发布完成事件"""
+        duration_ms = int((time.time() - start_time) * 1000)
 
-虽然你需要自主决策，但通常遵循以下逻辑：
+        # 更新进度到 100%
+        self._update_progress(100, "审计完成")
 
-1. **侦察阶段**：调用 `recon` Agent 了解项目。如果信息不足，可以再次调用。
-2. **分析阶段**：调用 `analysis` Agent 进行深度分析。
-   - 如果发现大量漏洞，可以考虑分批分析。
-   - 如果没有发现漏洞，但你怀疑有遗漏，可以指定特定的关注点再次调用 `analysis`。
-3. **验证阶段**（推荐）：如果有高危漏洞，调用 `verification` Agent 进行验证。
-4. **完成**：调用 `finish` 完成审计。
-
-**重要：**
-- 必须先侦察 (recon)。
-- 不要急于 finish，确保已充分挖掘潜在漏洞。
-- 只有在确认没有更多工作需要做时，才调用 finish。
-- Action Input 必须是有效的 JSON 格式。
-
-## 示例流程
-
-```
-Thought: 我需要先了解项目的结构和技术栈，以便进行后续的安全审计
-Action: dispatch_agent
-Action Input: {"agent": "recon", "task": "分析项目结构、技术栈和入口点"}
+        self._queue_event("status", {
+            "status": "completed",
+            "message": f"Orchestrator 完成: {len(self._all_findings)} 个发现, {len(self._steps)} 轮决策"
+        })
+        await self._flush_events()
 
-Observation: [recon 结果...]
+        return {
+            "agent": self.name,
+            "status": "success",
+            "result": {
+                "findings": self._findings_as_dicts(),
+                "summary": final_result or self._generate_default_summary(),
+                "steps": list(map(_step_to_dict, self._steps)),
+            },
+            "thinking_chain": self.thinking_chain,
+            "duration_ms": duration_ms,
+            "stats": {
+                "files_scanned": self._runtime_context.get("files_scanned", 0),
+                "findings_count": len(self._all_findings),
+                "cache_creation_input_tokens": self._cache_usage["cache_creation_input_tokens"],
+                "cache_read_input_tokens": self._cache_usage["cache_read_input_tokens"],
+            }
+        }
 
-Thought: 
-[Situational Awareness] 项目是 Python Flask 应用，发现了一些高风险区域。
-[Decision Logic] 现在我需要对这些区域进行深度分析。
+    async def _handle_dispatch_action(self, step: AgentStep) -> str:
+        """处理 dispatch_agent 操作：调度子 Agent 并转换审计阶段"""
+        agent_name = sys.intern(str(step.action_input.get("agent", "")))
+        task = step.action_input.get("task", "")
+
+        # 根据agent类型转换审计阶段
+        pre = self._AGENT_PHASE_PRE.get(agent_name)
+        if pre:
+            await self._phase_manager.transition_to(pre[0])
+            self._update_progress(pre[1], pre[2])
+
+        self.think(f"调度 {agent_name} Agent: {task[:100]}")
+        self._queue_event("action", {
+            "message": f"调度 {agent_name} Agent",
+            "agent": agent_name,
+            "task": task
+        })
 
-Action: dispatch_agent
-Action Input: {"agent": "analysis", "task": "深度分析高风险区域的代码安全问题"}
+        try:
+            await self._flush_events()
+            observation = await self._dispatch_agent(step.action_input)
 
-Observation: [analysis 结果...]
+            # 更新进度和阶段
+            post = self._AGENT_PHASE_POST.get(agent_name)
+            if post:
+                await self._phase_manager.transition_to(post[0])
+                self._update_progress(post[1], post[2])
+                observation += post[3]
 
-Thought: 分析发现了一个 SQL 注入漏洞，我需要验证它是否真实存在
-Action: dispatch_agent
-Action Input: {"agent": "verification", "task": "验证 SQL 注入漏洞"}
+        except Exception as e:
+            logger.error(f"[Orchestrator] Sub-agent {agent_name} failed: {e}")
+            observation = f"## {agent_name} Agent 执行失败\n\n错误: {str(e)}"
+            await self._flush_events()
+            await self._publish_event("error", {
+                "message": f"{agent_name} Agent 执行失败: {str(e)[:100]}"
+            })
 
-Observation: [verification 结果...]
+        self.think(f"{agent_name} Agent 执行完成")
+        return observation
 
-Thought: 已完成验证，漏洞确认为真实。审计工作已经充分完成
-Action: finish
-Action Input: {"conclusion": "审计结论"}
-```
+    async def _handle_summarize_action(self, step: AgentStep) -> str:
+        """处理 summarize 操作：汇总当前发现"""
+        self.think("汇总当前发现")
+        self._queue_event("thinking", {
+            "message": "汇总当前发现"
+        })
+        return self._summarize_findings()
+
+    async def _handle_observation_detail_action(self, step: AgentStep) -> str:
+        """处理 get_observation_detail 操作：取回之前被压缩的完整观察结果"""
+        step_id = str(step.action_input.get("step_id", ""))
+        observation = self._observations.get(step_id)
+        if observation is None:
+            return f"未找到观察结果: {step_id}，可用的步骤 ID: {', '.join(self._observations) or '无'}"
+        return observation
+
+    # 操作分发表（finish 需要控制循环，在主循环中单独处理）
+    _ACTION_HANDLERS = {
+        "dispatch_agent": _handle_dispatch_action,
+        "summarize": _handle_summarize_action,
+        "get_observation_detail": _handle_observation_detail_action,
+    }
+
+    def _compact_observation(self, step: AgentStep) -> str:
+        """
+        压缩写入对话历史的观察结果
+
+        超过预览长度的观察结果保存到 _observations，对话中只保留开头预览和步骤 ID，
+        避免每轮 LLM 调用都重复发送全部历史观察（总 token 随轮数平方增长）。
+        取回的原文不再压缩，否则 LLM 永远拿不到完整内容。
+        """
+        observation = step.observation or ""
+        if step.action == "get_observation_detail" or len(observation) <= self._observation_preview_chars:
+            return observation
+
+        step_id = f"step_{len(self._steps)}"
+        self._observations[step_id] = observation
+        return (
+            f"{observation[:self._observation_preview_chars]}\n\n"
+            f"...（已省略 {len(observation) - self._observation_preview_chars} 字符，"
+            f"完整内容见 {step_id}，可通过 get_observation_detail 获取）"
+        )
 
-现在开始审计，请先调用 recon Agent！"""
+    def _get_system_prompt(self, audit_type: str = "full") -> str:
+        """获取系统提示词（按审计类型预先特化，未知类型使用完整版本）"""
+        return _SYSTEM_PROMPT_BY_TYPE.get(audit_type, _SYSTEM_PROMPT_BY_TYPE["full"])
 
     def _format_initial_message(self, context: Dict[str, Any]) -> str:
-        """构建初始消息"""
-        return f"""请开始对以下项目进行安全审计。
-
-## 项目信息
-- Project ID: {context.get("project_id", "unknown")}
-- Audit ID: {context.get("audit_id", "unknown")}
-- Audit Type: {context.get("audit_type", "quick")}
-
-## 可用子 Agent
-- recon: 信息收集 Agent，用于分析项目结构和技术栈
-- analysis: 分析 Agent，用于深度代码审计和漏洞检测
-- verification: 验证 Agent，用于验证发现的漏洞
-
-## ⚠️ 重要提示
-推荐的执行步骤：
-1. **首先**调用 recon Agent 了解项目
-2. **然后**调用 analysis Agent 进行分析
-3. **可选**调用 verification Agent 验证高危漏洞
-4. **最后**调用 finish 完成审计
-
-**不能直接调用 finish！必须先调度 recon Agent！**
-
-请立即开始：首先输出你的思考，然后调用 dispatch_agent 调度 recon Agent。
-
-示例：
-Thought: 我需要先了解项目的结构和技术栈
-Action: dispatch_agent
-Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}"""
-
+        """构建初始消息（只包含本次审计的标识，指令性内容全部位于可缓存的系统提示词中）"""
+        return _INITIAL_MESSAGE_TMPL.format(
+            project_id=context.get("project_id", "unknown"),
+            audit_id=context.get("audit_id", "unknown"),
+            audit_type=context.get("audit_type", "quick"),
+        )
 
     def _parse_llm_response(self, response: str) -> Optional[AgentStep]:
         """解析 LLM 响应"""
         # 预处理 - 移除 Markdown 格式标记
-        cleaned_response = response
-        cleaned_response = re.sub(r'\*\*Action:\*\*', 'Action:', cleaned_response)
-        cleaned_response = re.sub(r'\*\*Action Input:\*\*', 'Action Input:', cleaned_response)
-        cleaned_response = re.sub(r'\*\*Thought:\*\*', 'Thought:', cleaned_response)
+        cleaned_response = _MARKDOWN_LABEL_RE.sub(r'\1:', response)
 
         # 提取 Thought
-        thought_match = re.search(r'Thought:\s*(.*?)(?=Action:|$)', cleaned_response, re.DOTALL)
+        thought_match = _THOUGHT_RE.search(cleaned_response)
         thought = thought_match.group(1).strip() if thought_match else ""
 
         # 提取 Action
-        action_match = re.search(r'Action:\s*(\w+)', cleaned_response)
+        action_match = _ACTION_RE.search(cleaned_response)
         if not action_match:
             return None
         action = action_match.group(1).strip()
 
         # 提取 Action Input
-        input_match = re.search(r'Action Input:\s*(.*?)(?=Thought:|Observation:|$)', cleaned_response, re.DOTALL)
+        input_match = _ACTION_INPUT_RE.search(cleaned_response)
         if not input_match:
             return None
 
         input_text = input_match.group(1).strip()
         # 移除 markdown 代码块
-        input_text = re.sub(r'```json\s*', '', input_text)
-        input_text = re.sub(r'```\s*', '', input_text)
+        input_text = _CODE_FENCE_RE.sub('', input_text)
 
         try:
             action_input = json.loads(input_text)
@@ -689,9 +1004,71 @@ Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}"""
             action_input=action_input,
         )
 
+    def _check_stalled(self) -> bool:
+        """
+        记录本轮进展并判断是否停滞
+
+        发现数量和子 Agent 调度次数都未变化即视为无进展；
+        该审计类型需要的子 Agent 都已调度过后，只容忍一轮无进展。
+        """
+        signature = (len(self._all_findings), sum(self._dispatched_tasks.values()))
+        if signature != self._progress_signature:
+            self._progress_signature = signature
+            self._stall_count = 0
+            return False
+
+        self._stall_count += 1
+        required = _REQUIRED_AGENTS_BY_TYPE.get(self._runtime_context.get("audit_type"), _REQUIRED_AGENTS_BY_TYPE["full"])
+        limit = 1 if required <= self._dispatched_tasks.keys() else self._max_stalled_iterations
+        return self._stall_count >= limit
+
+    def _queue_event(self, event_type: str, data: Dict[str, Any]) -> None:
+        """暂存事件，在下一次 LLM 调用或子 Agent 调度前批量发布"""
+        self._pending_events.append((event_type, data))
+
+    async def _flush_events(self) -> None:
+        """批量发布暂存的事件"""
+        if self._pending_events:
+            events, self._pending_events = self._pending_events, []
+            await self._publish_events(events)
+
+    def _trim_conversation(self) -> None:
+        """
+        超过上限时丢弃最早的对话轮次
+
+        系统提示词和初始消息常驻；裁剪后保证常驻消息之后以 assistant 消息开头，
+        维持 user / assistant 交替（Anthropic 要求）。
+        """
+        overflow = len(self._conversation) - max(self._max_conversation_messages, 3)
+        if overflow <= 0:
+            return
+        cut = 2 + overflow
+        while cut < len(self._conversation) - 1 and self._conversation[cut].role != _ROLE_ASSISTANT:
+            cut += 1
+        del self._conversation[2:cut]
+
+    def _mark_cache_breakpoint(self) -> None:
+        """在对话最后一条消息上设置缓存断点，只保留最近两个滚动断点"""
+        last = self._conversation[-1]
+        if last.cache_control:
+            return
+        if len(self._cache_anchors) >= 2:
+            self._cache_anchors.popleft().cache_control = None
+        last.cache_control = _CACHE_EPHEMERAL
+        self._cache_anchors.append(last)
+
+    def _record_decision(self, step: AgentStep) -> int:
+        """记录决策哈希，返回该决策在最近窗口内出现的次数"""
+        decision_hash = hash((
+            step.action,
+            orjson.dumps(step.action_input, option=orjson.OPT_SORT_KEYS, default=str),
+        ))
+        self._decision_hashes.append(decision_hash)
+        return self._decision_hashes.count(decision_hash)
+
     async def _dispatch_agent(self, params: Dict[str, Any]) -> str:
         """调度子 Agent"""
-        agent_name = params.get("agent", "")
+        agent_name = sys.intern(str(params.get("agent", "")))
         task = params.get("task", "")
 
         logger.info(f"[Orchestrator] Dispatching {agent_name} Agent: {task[:50]}...")
@@ -753,16 +1130,25 @@ Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}"""
             has_key = bool(llm_params.get("api_key"))
             logger.info(f"[Orchestrator] Dispatching {agent_name} with LLM config: provider={llm_params.get('llm_provider')}, has_key={has_key}")
 
-            # 执行子 Agent
+            # 执行子 Agent（任务前缀共享项目头，便于复用前缀缓存）
+            project_header = _PROJECT_HEADER.format(
+                project_id=self._runtime_context.get("project_id"),
+                audit_id=self._runtime_context.get("audit_id"),
+                audit_type=self._runtime_context.get("audit_type", "quick"),
+            )
             result_data = await agent.run({
                 "audit_id": self._runtime_context.get("audit_id"),
                 "project_id": self._runtime_context.get("project_id"),
                 "project_path": self._runtime_context.get("project_path"),
-                "task": task,
+                # 侦察阶段计算的项目指纹，供跨审计工具缓存区分代码版本
+                "project_fingerprint": self._runtime_context.get("project_fingerprint"),
+                "task": project_header + task,
                 # 传递已有的发现给验证 Agent
-                "findings": self._all_findings if agent_name == "verification" else [],
+                "findings": self._findings_as_dicts() if agent_name == _AGENT_VERIFICATION else [],
                 # 传递之前 Agent 的结果
                 **self._agent_results,
+                # 上游交接直接以对象传递
+                "task_handoff": self._last_handoff,
                 # 传递 LLM 配置给子 Agent
                 **llm_params
             })
@@ -780,8 +1166,9 @@ Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}"""
             new_findings = []
             
             # Recon Agent 返回 findings 在 tool_findings, dataflow_findings 等字段
-            if agent_name == "recon":
+            if agent_name == _AGENT_RECON:
                 if isinstance(result, dict):
+                    self._runtime_context["project_fingerprint"] = result.get("project_fingerprint")
                     # 提取工具发现
                     if "tool_findings" in result:
                         new_findings.extend(result["tool_findings"])
@@ -790,7 +1177,7 @@ Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}"""
                         new_findings.extend(result["dataflow_findings"])
             
             # Analysis Agent 通常直接返回 findings 列表或包含 findings 的字典
-            elif agent_name == "analysis":
+            elif agent_name == _AGENT_ANALYSIS:
                 if isinstance(result, dict):
                     if "findings" in result:
                         new_findings.extend(result["findings"])
@@ -798,35 +1185,23 @@ Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}"""
                     new_findings.extend(result)
 
             # Verification Agent 返回验证后的 findings
-            elif agent_name == "verification":
+            elif agent_name == _AGENT_VERIFICATION:
                 # 验证 Agent 不产生新漏洞，而是更新现有漏洞的状态
                 # 这里我们可以获取验证结果报告
                 verified_results = result.get("verified", [])
                 # 更新 _all_findings 中的验证状态
                 for v_res in verified_results:
-                    f_id = v_res.get("finding_id")
-                    is_verified = v_res.get("verified", False)
-                    for finding in self._all_findings:
-                        if finding.get("id") == f_id:
-                            finding["verified"] = is_verified
-                            finding["verification_evidence"] = v_res.get("evidence")
-                            finding["poc_code"] = v_res.get("poc_code")
+                    finding = self._findings_by_id.get(v_res.get("finding_id"))
+                    if finding:
+                        finding.update({
+                            "verified": v_res.get("verified", False),
+                            "verification_evidence": v_res.get("evidence"),
+                            "poc_code": v_res.get("poc_code"),
+                        })
 
             # 将新发现添加到总列表中 (去重)
-            added_count = 0
-            existing_ids = {f.get("id") for f in self._all_findings if f.get("id")}
-            
-            for f in new_findings:
-                # 确保每个 finding 都有 ID
-                if not f.get("id"):
-                    import uuid
-                    f["id"] = str(uuid.uuid4())
-                
-                if f.get("id") not in existing_ids:
-                    self._all_findings.append(f)
-                    existing_ids.add(f.get("id"))
-                    added_count += 1
-            
+            added_count = self._merge_findings(new_findings)
+
             logger.info(f"[Orchestrator] 从 {agent_name} 收集到 {added_count} 个新发现 (总计: {len(self._all_findings)})")
             
             # 实时通知前端有新发现
@@ -842,16 +1217,16 @@ Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}"""
 
             # 保存 Agent 结果
             self._agent_results[agent_name] = result
+            if isinstance(result, dict) and result.get("task_handoff") is not None:
+                self._last_handoff = result["task_handoff"]
+
+            # 没有新发现时直接返回简短结果（侦察 Agent 的技术栈用于规划后续调度，
+            # 验证 Agent 的价值在于验证统计，两者仍需完整摘要）
+            if not new_findings and agent_name not in (_AGENT_RECON, _AGENT_VERIFICATION):
+                return f"## {agent_name} 执行成功\n\n无新增发现。当前总发现: {len(self._all_findings)}\n"
 
             # 格式化观察结果供 LLM 阅读
-            if agent_name == "recon":
-                summary = f"发现 {len(new_findings)} 个潜在问题。项目技术栈: {result.get('tech_stack', {}).get('languages', [])}"
-            elif agent_name == "analysis":
-                summary = f"分析完成，发现 {len(new_findings)} 个漏洞。"
-            elif agent_name == "verification":
-                summary = f"验证完成。确认 {result.get('total_verified', 0)} 个漏洞，排除 {result.get('total_false_positives', 0)} 个误报。"
-            else:
-                summary = "执行完成"
+            summary = self._SUMMARY_FMT.get(agent_name, _default_summary_fmt)(result, len(new_findings))
 
             return f"""## {agent_name} 执行成功
 
@@ -865,99 +1240,183 @@ Action Input: {{"agent": "recon", "task": "侦察项目结构和技术栈"}}"""
 """
 
         except Exception as e:
-            logger.error(f"调度 {agent_name} 失败: {e}", exc_info=True)
+            logger.opt(exception=e).error("调度 {} 失败: {}", agent_name, e)
             return f"调度失败: {str(e)}"
 
+    def _reset_findings(self) -> None:
+        """重置发现列表及其索引和计数"""
+        self._all_findings = []
+        self._findings_by_id = {}
+        self._severity_counts = Counter(dict.fromkeys(_SEVERITY_LEVELS, 0))
+        self._type_counts = Counter()
+        # 按严重程度分桶的发现，支持 O(1) 计数和按严重程度查询
+        self._by_severity: Dict[str, List[Dict[str, Any]]] = defaultdict(list, {sev: [] for sev in _SEVERITY_LEVELS})
+        # 发现指纹 (file_path, line_start, vulnerability_type)，滚动保留最近 10000 个
+        self._seen_hashes: Set[int] = set()
+        self._seen_order: Deque[int] = deque(maxlen=10000)
+        # 汇总 "详细列表" 的行缓存，随发现增量追加
+        self._summary_detail_lines: List[str] = []
+
+    def _add_findings(self, batch: List[Dict[str, Any]]) -> None:
+        """批量添加标准化后的发现，并同步更新索引和计数"""
+        stored = [Finding.from_dict(n) for n in batch] if self._compact_findings else batch
+        start = len(self._all_findings)
+        self._all_findings.extend(stored)
+        self._findings_by_id.update(zip((n["id"] for n in batch), stored))
+        self._severity_counts.update(n["severity"] for n in batch)
+        self._type_counts.update(n.get("vulnerability_type", "other") for n in batch)
+        for n, f in zip(batch, stored):
+            self._by_severity[n["severity"]].append(f)
+        self._summary_detail_lines.extend(
+            f"{i}. [{n['severity']}] {n['title']} ({n.get('file_path')})"
+            for i, n in enumerate(batch, start + 1)
+        )
+
+    def _ensure_counts(self) -> None:
+        """计数与发现列表不一致时（列表被直接修改），全量重新统计并重建详细列表"""
+        if sum(self._severity_counts.values()) == len(self._all_findings):
+            return
+        self._severity_counts = Counter(dict.fromkeys(_SEVERITY_LEVELS, 0))
+        self._severity_counts.update(f.get("severity", "low") for f in self._all_findings)
+        self._type_counts = Counter(f.get("vulnerability_type", "other") for f in self._all_findings)
+        self._by_severity = defaultdict(list, {sev: [] for sev in _SEVERITY_LEVELS})
+        for f in self._all_findings:
+            self._by_severity[f.get("severity", "low")].append(f)
+        self._summary_detail_lines = [
+            f"{i}. [{f.get('severity')}] {f.get('title')} ({f.get('file_path')})"
+            for i, f in enumerate(self._all_findings, 1)
+        ]
+
+    def _merge_findings(self, new_findings: List[Dict[str, Any]]) -> int:
+        """按 ID 去重合并新发现，返回新增数量"""
+        batch = []
+        batch_ids = set()
+        for f in new_findings:
+            # 只接受字典格式的发现，之后的汇总逻辑不再逐项检查类型
+            if not isinstance(f, dict):
+                continue
+
+            # 确保每个 finding 都有 ID
+            f_id = f.get("id")
+            if not f_id:
+                f_id = f["id"] = uuid.uuid4().hex
+
+            if f_id in self._findings_by_id or f_id in batch_ids:
+                continue
+            norm = self._normalize_finding(f)
+            if norm is None:
+                continue
+            batch.append(norm)
+            batch_ids.add(f_id)
+
+        if batch:
+            self._add_findings(batch)
+        return len(batch)
+
+    def _basename(self, file_path: str) -> str:
+        """获取文件名（按路径缓存）"""
+        name = self._basename_cache.get(file_path)
+        if name is None:
+            if len(self._basename_cache) > 4096:
+                self._basename_cache.clear()
+            name = self._basename_cache[file_path] = basename(file_path)
+        return name
+
     def _normalize_finding(self, finding: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """标准化发现格式"""
         normalized = dict(finding)
 
-        # 处理 file -> file_path
-        if "file" in normalized and "file_path" not in normalized:
-            normalized["file_path"] = normalized["file"]
-
-        # 处理 line -> line_start
-        if "line" in normalized and "line_start" not in normalized:
-            normalized["line_start"] = normalized["line"]
+        # 处理字段别名: file -> file_path, line -> line_start
+        for src, dst in self._ALIAS_MAP:
+            if dst not in normalized and src in normalized:
+                normalized[dst] = normalized[src]
 
-        # 处理 type -> vulnerability_type
+        # 处理 type -> vulnerability_type（忽略无信息量的通用类型）
         if "type" in normalized and "vulnerability_type" not in normalized:
             type_val = normalized["type"]
-            if type_val and type_val.lower() not in ["vulnerability", "finding", "issue"]:
+            if type_val and type_val.lower() not in self._GENERIC_TYPES:
                 normalized["vulnerability_type"] = type_val
 
         # 确保 severity 存在
         if "severity" not in normalized:
             normalized["severity"] = "medium"
 
+        # 驻留低基数的分类字符串，多个发现共享同一对象，计数时走哈希快路径
+        for key in ("severity", "vulnerability_type"):
+            value = normalized.get(key)
+            if type(value) is str:
+                normalized[key] = sys.intern(value)
+
         # 生成 title 如果不存在
         if "title" not in normalized:
-            vuln_type = normalized.get("vulnerability_type", "Unknown")
-            file_path = normalized.get("file_path", "")
-            if file_path:
-                import os
-                normalized["title"] = f"{vuln_type.replace('_', ' ').title()} in {os.path.basename(file_path)}"
-            else:
-                normalized["title"] = f"{vuln_type.replace('_', ' ').title()} Vulnerability"
+            pretty = normalized.get("vulnerability_type", "Unknown").replace("_", " ").title()
+            file_path = normalized.get("file_path")
+            normalized["title"] = f"{pretty} in {self._basename(file_path)}" if file_path else f"{pretty} Vulnerability"
+
+        # 按位置指纹去重（没有文件路径的发现无法定位，不参与去重）
+        if normalized.get("file_path"):
+            fingerprint = hash((
+                normalized["file_path"],
+                normalized.get("line_start", 0),
+                normalized.get("vulnerability_type", ""),
+            ))
+            if fingerprint in self._seen_hashes:
+                return None
+            if len(self._seen_order) == self._seen_order.maxlen:
+                self._seen_hashes.discard(self._seen_order[0])
+            self._seen_order.append(fingerprint)
+            self._seen_hashes.add(fingerprint)
 
         return normalized
 
+    def _findings_as_dicts(self) -> List[Dict[str, Any]]:
+        """以字典形式返回全部发现（紧凑存储时进行转换）"""
+        if not self._compact_findings:
+            return self._all_findings
+        return [f.to_dict() for f in self._all_findings]
+
+    def get_findings_by_severity(self, severity: str) -> List[Dict[str, Any]]:
+        """获取指定严重程度的发现"""
+        self._ensure_counts()
+        return list(self._by_severity.get(severity, ()))
+
     def _summarize_findings(self) -> str:
         """汇总当前发现"""
         if not self._all_findings:
             return "目前还没有发现任何漏洞。"
 
-        # 统计
-        severity_counts = {"critical": 0, "high": 0, "medium": 0, "low": 0}
-        type_counts = {}
-
-        for f in self._all_findings:
-            if not isinstance(f, dict):
-                continue
-
-            sev = f.get("severity", "low")
-            severity_counts[sev] = severity_counts.get(sev, 0) + 1
-
-            vtype = f.get("vulnerability_type", "other")
-            type_counts[vtype] = type_counts.get(vtype, 0) + 1
-
-        summary = f"""## 当前发现汇总
-
-**总计**: {len(self._all_findings)} 个漏洞
-
-### 严重程度分布
-- Critical: {severity_counts['critical']}
-- High: {severity_counts['high']}
-- Medium: {severity_counts['medium']}
-- Low: {severity_counts['low']}
+        # 统计（计数随发现增量维护）
+        self._ensure_counts()
+        severity_counts = self._severity_counts
+        type_counts = self._type_counts
 
-### 漏洞类型分布
-"""
+        parts = [_SUMMARY_HEADER_TMPL.format_map({"total": len(self._all_findings), **severity_counts})]
         for vtype, count in type_counts.items():
-            summary += f"- {vtype}: {count}\n"
+            parts.append(f"- {vtype}: {count}\n")
 
-        summary += "\n### 详细列表\n"
-        for i, f in enumerate(self._all_findings):
-            if isinstance(f, dict):
-                summary += f"{i+1}. [{f.get('severity')}] {f.get('title')} ({f.get('file_path')})\n"
+        parts.append("\n### 详细列表\n")
+        parts.append("\n".join(self._summary_detail_lines))
+        parts.append("\n")
 
-        return summary
+        return "".join(parts)
 
     def _generate_default_summary(self) -> Dict[str, Any]:
         """生成默认摘要"""
-        severity_counts = {"critical": 0, "high": 0, "medium": 0, "low": 0}
-
-        for f in self._all_findings:
-            if isinstance(f, dict):
-                sev = f.get("severity", "low")
-                severity_counts[sev] = severity_counts.get(sev, 0) + 1
-
+        self._ensure_counts()
         return {
             "total_findings": len(self._all_findings),
-            "severity_distribution": severity_counts,
+            "severity_distribution": {sev: len(bucket) for sev, bucket in self._by_severity.items()},
             "conclusion": "审计完成",
         }
 
 
-# 创建全局实例
-orchestrator_agent = OrchestratorAgent()
+# 全局实例（首次使用时创建；处理审计请求时应为每个请求创建新实例）
+_orchestrator_agent: Optional[OrchestratorAgent] = None
+
+
+def get_orchestrator() -> OrchestratorAgent:
+    """获取全局 Orchestrator 实例"""
+    global _orchestrator_agent
+    if _orchestrator_agent is None:
+        _orchestrator_agent = OrchestratorAgent()
+    return _orchestrator_agent
@@ -4,9 +4,24 @@ Recon Agent - 侦察兵（增强版）
 负责信息收集、项目结构分析和攻击面识别
 集成外部安全工具和数据流分析
 """
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable, Awaitable, AsyncIterator
 from loguru import logger
 from pathlib import Path
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+import asyncio
+import contextlib
+import copy
+import functools
+import hashlib
+import operator
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import orjson
 
 from app.agents.base import BaseAgent
 from app.services.external_tools import (
@@ -19,6 +34,794 @@ from app.core.dataflow_analysis import (
     get_dataflow_analyzer,
     Vulnerability,
 )
+from app.core.tool_cache import ToolResultCache, get_tool_result_cache
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+# 扫描时忽略的目录（按路径分段匹配）
+_IGNORED_DIRS = frozenset({
+    ".git", "node_modules", "venv", ".venv", "__pycache__",
+    "dist", "build", "target", "vendor", ".idea", ".vscode",
+    "bin", "obj", "out",
+    # 框架构建产物和工具缓存
+    ".next", ".nuxt", ".cache", ".tox", ".mypy_cache", ".pytest_cache",
+})
+
+# 高价值目标扫描时排除的路径片段（按子串匹配）
+_IGNORED_PATH_TOKENS = tuple(sorted(_IGNORED_DIRS))
+
+# 依赖/构建配置文件: (文件名, 语言, 框架列表)
+_MANIFEST_FILES: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("package.json", "JavaScript", ("Node.js",)),
+    ("tsconfig.json", "TypeScript", ("Node.js",)),
+    ("requirements.txt", "Python", ("Python/Pip",)),
+    ("Pipfile", "Python", ("Pipenv",)),
+    ("pyproject.toml", "Python", ("Poetry",)),
+    ("setup.py", "Python", ("Python",)),
+    ("pom.xml", "Java", ("Maven",)),
+    ("build.gradle", "Java", ("Gradle",)),
+    ("Cargo.toml", "Rust", ("Cargo",)),
+    ("go.mod", "Go", ("Go Module",)),
+    ("composer.json", "PHP", ("Composer",)),
+    ("Gemfile", "Ruby", ("Bundler",)),
+    ("pubspec.yaml", "Dart", ("Pub",)),
+    ("mix.exs", "Elixir", ("Hex",)),
+)
+
+# 依赖文件 -> 包管理器
+_PACKAGE_MANAGERS: Dict[str, str] = {
+    "package.json": "npm",
+    "requirements.txt": "pip",
+    "Cargo.toml": "cargo",
+    "go.mod": "go",
+    "pom.xml": "maven",
+    "build.gradle": "gradle",
+    "Gemfile": "bundler",
+    "composer.json": "composer",
+}
+
+# 可推荐的外部工具（静态数据，模块加载时创建一次）
+_RECOMMENDABLE_TOOLS: Dict[str, ToolInfo] = {
+    "semgrep": ToolInfo(
+        name="semgrep",
+        description="静态代码分析工具，支持多种语言",
+        language=["*"],
+        install_cmd="pip install semgrep",
+        check_cmd=["semgrep", "--version"],
+        priority=10,
+    ),
+    "bandit": ToolInfo(
+        name="bandit",
+        description="Python 安全漏洞扫描工具",
+        language=["python"],
+        install_cmd="pip install bandit",
+        check_cmd=["bandit", "--version"],
+        priority=9,
+    ),
+    "safety": ToolInfo(
+        name="safety",
+        description="Python 依赖漏洞扫描工具",
+        language=["python"],
+        install_cmd="pip install safety",
+        check_cmd=["safety", "--version"],
+        priority=7,
+    ),
+    "gitleaks": ToolInfo(
+        name="gitleaks",
+        description="密钥和敏感信息检测工具",
+        language=["*"],
+        install_cmd="go install github.com/zricethezav/gitleaks/v8/cmd/gitleaks@latest",
+        check_cmd=["gitleaks", "version"],
+        priority=8,
+    ),
+    "npm_audit": ToolInfo(
+        name="npm_audit",
+        description="Node.js 依赖漏洞扫描工具",
+        language=["javascript", "typescript"],
+        install_cmd="",  # npm 自带
+        check_cmd=["npm", "--version"],
+        priority=6,
+    ),
+}
+
+# 文件扩展名 -> 语言
+_EXTENSION_LANGUAGES: Dict[str, str] = {
+    ".py": "Python",
+    ".js": "JavaScript",
+    ".ts": "TypeScript",
+    ".tsx": "TypeScript",
+    ".jsx": "JavaScript",
+    ".java": "Java",
+    ".go": "Go",
+    ".rs": "Rust",
+    ".php": "PHP",
+    ".rb": "Ruby",
+    ".cs": "C#",
+    ".cpp": "C++",
+    ".c": "C",
+    ".kt": "Kotlin",
+    ".swift": "Swift",
+}
+
+# 根目录特征文件 -> Web 框架（只按文件名判断）
+_WEB_FRAMEWORK_FILES: Dict[str, str] = {
+    "app.py": "Flask",
+    "wsgi.py": "Flask",
+    "manage.py": "Django",
+    "application.go": "Go Web Framework",
+    "gin.go": "Gin",
+    "main.go": "Go",  # 通用
+    "NestFactory": "NestJS",  # 内容检测可能太慢，这里只做文件名
+}
+
+# 高价值目标文件模式: 类别 -> glob 列表
+_HIGH_VALUE_PATTERNS: Dict[str, Tuple[str, ...]] = {
+    "config": (
+        "config.py", "settings.py", ".env", "application.yml", "application.properties",
+        "web.config", "uwsgi.ini", "nginx.conf", "docker-compose.yml", "Dockerfile",
+        "k8s.yaml", "helm.yaml"
+    ),
+    "auth": (
+        "*auth*", "*login*", "*user*", "*permission*", "*role*", "*jwt*", "*token*",
+        "*middleware*", "*interceptor*", "*filter*", "*security*"
+    ),
+    "upload": (
+        "*upload*", "*file*", "*image*", "*attachment*", "*import*", "*export*"
+    ),
+    "database": (
+        "*schema*", "*migration*", "*model*", "*entity*", "*db*", "*database*", "*sql*"
+    ),
+    "api": (
+        "*api*", "*route*", "*controller*", "*view*", "*endpoint*", "*handler*"
+    ),
+    "crypto": (
+        "*crypto*", "*cipher*", "*encrypt*", "*decrypt*", "*key*", "*secret*"
+    ),
+}
+
+
+def _tech_stack_to_dict(tech_stack: Dict[str, Set[str]]) -> Dict[str, List[str]]:
+    """将内部使用的技术栈集合转换为可序列化的有序列表（只在输出边界调用）"""
+    return {key: sorted(values) for key, values in tech_stack.items()}
+
+
+def _keyword_pattern(keywords: Tuple[str, ...]) -> "re.Pattern[str]":
+    """将关键词列表编译为一个子串匹配正则"""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+# 攻击面分类规则: (类型, 描述, 严重程度, 路径关键词)，按顺序生成入口点
+_ATTACK_SURFACE_RULES: Tuple[Tuple[str, str, Optional[str], Tuple[str, ...]], ...] = (
+    ("web_route", "Web 路由定义文件", None,
+     ("route", "controller", "handler", "api", "view", "endpoint")),
+    ("database", "数据库操作文件", None,
+     ("model", "query", "database", "db", "sql")),
+    ("auth", "认证/授权文件", "high",
+     ("auth", "login", "permission", "access", "user", "session")),
+    ("file_operation", "文件操作文件", None,
+     ("file", "fs", "io", "upload", "download", "storage")),
+    ("command_execution", "命令执行相关", "high",
+     ("exec", "spawn", "shell", "command", "system", "subprocess")),
+)
+
+# 模块导入时编译一次，每个类别对小写路径做一次 C 层扫描
+_ATTACK_SURFACE_PATTERNS = tuple(
+    (entry_type, description, severity, _keyword_pattern(keywords))
+    for entry_type, description, severity, keywords in _ATTACK_SURFACE_RULES
+)
+
+
+# 用户输入处理文件关键词（只匹配文件名）
+_USER_INPUT_KEYWORDS = ("form", "input", "upload", "submit")
+_USER_INPUT_PATTERN = _keyword_pattern(_USER_INPUT_KEYWORDS)
+
+
+def _build_attack_surface_automaton() -> Optional[Any]:
+    """
+    将所有类别的关键词编译为一个 Aho-Corasick 自动机（需要 pyahocorasick）
+
+    一次线性扫描即可得到路径命中的全部类别和用户输入关键词；
+    未安装时返回 None，使用正则匹配。
+
+    每个关键词的值为 (类别位掩码, 是否为用户输入关键词, 关键词长度)，
+    第 i 位对应 _ATTACK_SURFACE_RULES 中的第 i 条规则。
+    """
+    if not AHOCORASICK_AVAILABLE:
+        return None
+
+    keyword_masks: Dict[str, int] = dict.fromkeys(_USER_INPUT_KEYWORDS, 0)
+    for bit, (_, _, _, keywords) in enumerate(_ATTACK_SURFACE_RULES):
+        for keyword in keywords:
+            keyword_masks[keyword] = keyword_masks.get(keyword, 0) | (1 << bit)
+
+    automaton = ahocorasick.Automaton()
+    for keyword, mask in keyword_masks.items():
+        automaton.add_word(keyword, (mask, keyword in _USER_INPUT_KEYWORDS, len(keyword)))
+    automaton.make_automaton()
+    return automaton
+
+
+_ATTACK_SURFACE_AUTOMATON = _build_attack_surface_automaton()
+
+# 类别位掩码 -> 按规则顺序命中的规则，按掩码一次查表代替逐类别判断
+_ATTACK_SURFACE_RULES_BY_MASK = tuple(
+    tuple(rule for bit, rule in enumerate(_ATTACK_SURFACE_PATTERNS) if mask >> bit & 1)
+    for mask in range(1 << len(_ATTACK_SURFACE_PATTERNS))
+)
+
+# Rust 后端是否支持 walk 接口（返回 404/405 后不再尝试）
+_walk_supported = True
+
+
+async def _walk_project(project_path: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    由 Rust 后端一次请求遍历项目目录
+
+    Returns:
+        条目列表（path, is_dir）；后端不支持或请求失败时返回 None
+    """
+    global _walk_supported
+
+    if not _walk_supported:
+        return None
+
+    from app.services.rust_client import rust_client
+
+    try:
+        # 不限制层数：深层文件（如 src/main/java/...）同样需要进入索引
+        return await rust_client.walk(project_path, ignore=sorted(_IGNORED_DIRS))
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (404, 405):
+            logger.info("Rust 后端不支持 walk 接口，退回按层列出目录")
+            _walk_supported = False
+        else:
+            logger.warning(f"遍历项目目录失败，退回按层列出目录: {e}")
+    except Exception as e:
+        logger.warning(f"遍历项目目录失败，退回按层列出目录: {e}")
+    return None
+
+
+# 高风险区域统计的严重程度
+_RISK_SEVERITIES = ("critical", "high", "medium", "low")
+_RISK_SEVERITY_INDEX = {severity: index for index, severity in enumerate(_RISK_SEVERITIES)}
+
+# 按优先级排序的键（C 实现，代替 lambda）
+_by_priority = operator.itemgetter("priority")
+
+# 优先扫描的数据流发现严重程度
+_HIGH_SEVERITIES = frozenset({"critical", "high"})
+
+# 需要解析的依赖清单（小写文件名）
+_DEPENDENCY_MANIFESTS = frozenset({"package.json", "requirements.txt"})
+
+
+@dataclass(slots=True, frozen=True)
+class EntryPoint:
+    """攻击面入口点"""
+    type: str
+    file: str
+    description: str
+    severity: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（没有严重程度时不输出该字段）"""
+        entry = {"type": self.type, "file": self.file, "description": self.description}
+        if self.severity:
+            entry["severity"] = self.severity
+        return entry
+
+
+@dataclass(slots=True, frozen=True)
+class UserInput:
+    """用户输入处理文件"""
+    file: str
+    description: str = "用户输入处理文件"
+    type: str = "user_input"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {"type": self.type, "file": self.file, "description": self.description}
+
+
+@dataclass(slots=True, frozen=True)
+class Library:
+    """依赖库"""
+    name: str
+    version: str
+    type: str
+    ecosystem: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {"name": self.name, "version": self.version, "type": self.type, "ecosystem": self.ecosystem}
+
+
+def _records_to_dicts(section: Dict[str, Any]) -> Dict[str, Any]:
+    """将结果中的记录列表转换为字典列表（只在输出边界调用）"""
+    return {
+        key: [record.to_dict() for record in value] if isinstance(value, list) else value
+        for key, value in section.items()
+    }
+
+
+def _classify_attack_surface(
+    file_path: str,
+    entry_points: List[EntryPoint],
+    user_inputs: List[UserInput],
+    by_type: Dict[str, List[EntryPoint]],
+) -> None:
+    """识别单个文件的攻击面类别（有自动机时一次扫描，否则每个类别一次正则扫描）"""
+    lower_path = file_path.lower()
+    name_start = lower_path.rfind("/") + 1
+
+    if _ATTACK_SURFACE_AUTOMATON is not None:
+        # 自动机一次扫描合并全部命中类别的位掩码和文件名中的用户输入关键词
+        mask = 0
+        is_user_input = False
+        for end, (keyword_mask, user_input_keyword, length) in _ATTACK_SURFACE_AUTOMATON.iter(lower_path):
+            mask |= keyword_mask
+            if user_input_keyword and end - length + 1 >= name_start:
+                is_user_input = True
+        rules = _ATTACK_SURFACE_RULES_BY_MASK[mask]
+    else:
+        rules = [rule for rule in _ATTACK_SURFACE_PATTERNS if rule[3].search(lower_path)]
+        is_user_input = _USER_INPUT_PATTERN.search(lower_path, name_start) is not None
+
+    for entry_type, description, severity, _ in rules:
+        entry = EntryPoint(entry_type, file_path, description, severity)
+        entry_points.append(entry)
+        by_type[entry_type].append(entry)
+
+    # 表单/输入处理（只看文件名）
+    if is_user_input:
+        user_inputs.append(UserInput(file_path))
+
+
+@dataclass
+class _StructureIndex:
+    """
+    结构扫描时顺带建立的文件索引
+
+    攻击面分类和依赖清单识别在发现文件时一次完成，
+    后续阶段不再重复遍历整个文件列表。
+    """
+    entry_points: List[EntryPoint] = field(default_factory=list)
+    user_inputs: List[UserInput] = field(default_factory=list)
+    manifests: List[str] = field(default_factory=list)
+    # 数据流分析的候选文件（与分析器默认的 *.py 一致）
+    dataflow_files: List[str] = field(default_factory=list)
+    # 索引是否覆盖整棵项目树（仅后端 walk 完整返回时为 True；否则数据流分析自行递归查找文件）
+    complete: bool = False
+    # 按类型分组的入口点（与 entry_points 引用同一批对象）
+    by_type: Dict[str, List[EntryPoint]] = field(default_factory=lambda: defaultdict(list))
+
+    def add_file(self, file_path: str, file_name: str) -> None:
+        """登记一个新发现的文件"""
+        _classify_attack_surface(file_path, self.entry_points, self.user_inputs, self.by_type)
+        lower_name = file_name.lower()
+        if lower_name in _DEPENDENCY_MANIFESTS:
+            self.manifests.append(file_path)
+        elif lower_name.endswith(".py"):
+            self.dataflow_files.append(file_path)
+
+    @classmethod
+    def from_files(cls, files: List[str]) -> "_StructureIndex":
+        """从已有的文件列表建立索引"""
+        index = cls()
+        for file_path in files:
+            index.add_file(file_path, file_path.replace("\\", "/").rsplit("/", 1)[-1])
+        return index
+
+
+# 按扩展名识别语言时最多检查的文件数
+_EXTENSION_SCAN_MAX_FILES = 20000
+
+# 已识别到语言后，连续这么多个目录没有发现新语言即停止扩展名扫描
+_EXTENSION_SCAN_STABLE_DIRS = 64
+
+# 依赖清单/框架特征文件的识别深度（根目录为 0）
+_MANIFEST_SCAN_DEPTH = 2
+
+# 根目录子目录数超过该值时才并行遍历，最多使用的线程数
+_PARALLEL_WALK_MIN_SUBDIRS = 4
+_PARALLEL_WALK_MAX_WORKERS = 8
+
+
+@dataclass(slots=True)
+class _TechStackScan:
+    """技术栈识别的一次遍历结果"""
+    languages: Set[str] = field(default_factory=set)
+    # 根目录下的名称
+    root_names: Set[str] = field(default_factory=set)
+    # 深度 1..2 子目录中的名称（对应原先的 */name 和 */*/name）
+    nested_names: Set[str] = field(default_factory=set)
+
+    def merge(self, other: "_TechStackScan") -> None:
+        self.languages |= other.languages
+        self.root_names |= other.root_names
+        self.nested_names |= other.nested_names
+
+
+class _FileBudget:
+    """
+    多个遍历线程共享的文件数量上限
+
+    语言集合稳定（已有识别结果且连续多个目录无新语言）时提前耗尽预算，
+    后续只列出浅层目录，不再深入大而单一的子树。
+    """
+
+    def __init__(self, limit: int):
+        self.remaining = limit
+        self._lock = threading.Lock()
+        self._found_language = False
+        self._stable_dirs = 0
+
+    def consume(self, count: int, new_languages: bool) -> None:
+        with self._lock:
+            self.remaining -= count
+            if new_languages:
+                self._found_language = True
+                self._stable_dirs = 0
+                return
+            self._stable_dirs += 1
+            if self._found_language and self._stable_dirs > _EXTENSION_SCAN_STABLE_DIRS:
+                self.remaining = 0
+
+
+def _scan_directory(
+    directory: str,
+    depth: int,
+    scan: _TechStackScan,
+    budget: _FileBudget,
+    subdirs: List[Tuple[str, int]],
+) -> None:
+    """
+    读取一个目录：记录浅层名称、按扩展名识别语言，并收集待遍历的子目录
+
+    扩展名识别只在文件数上限内进行；超出上限后仍会列出浅层目录，
+    保证依赖清单和框架特征文件的识别不受上限影响。
+    """
+    names = scan.root_names if depth == 0 else scan.nested_names if depth <= _MANIFEST_SCAN_DEPTH else None
+    count_extensions = budget.remaining > 0
+    file_count = 0
+    known_languages = len(scan.languages)
+
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if names is not None:
+                    names.add(name)
+
+                if entry.is_dir(follow_symlinks=False):
+                    if name not in _IGNORED_DIRS:
+                        subdirs.append((entry.path, depth + 1))
+                    continue
+
+                if count_extensions:
+                    file_count += 1
+                    dot = name.rfind(".")
+                    if dot > 0:
+                        lang = _EXTENSION_LANGUAGES.get(name[dot:].lower())
+                        if lang:
+                            scan.languages.add(lang)
+    except OSError:
+        return
+
+    if count_extensions:
+        budget.consume(file_count, len(scan.languages) > known_languages)
+
+
+def _walk_subtree(root: str, depth: int, budget: _FileBudget) -> _TechStackScan:
+    """从 root 开始用显式栈遍历（每个线程使用自己的结果集合）"""
+    scan = _TechStackScan()
+    stack = [(root, depth)]
+
+    while stack:
+        directory, dir_depth = stack.pop()
+        # 超出文件数上限后只继续列出浅层目录
+        if budget.remaining <= 0 and dir_depth > _MANIFEST_SCAN_DEPTH:
+            continue
+        _scan_directory(directory, dir_depth, scan, budget, stack)
+
+    return scan
+
+
+def _scan_tech_stack_files(project_dir: Path, max_files: int = _EXTENSION_SCAN_MAX_FILES) -> _TechStackScan:
+    """
+    一次遍历完成技术栈识别所需的全部文件系统检查
+
+    显式栈 + os.scandir：只读取目录项名称和 d_type，不创建 Path 对象、不额外 stat，
+    忽略目录整棵跳过。同一次遍历同时收集根目录/浅层名称（依赖清单、框架特征文件）
+    和扩展名对应的语言。根目录下子目录较多时，各子树交给线程池并行遍历，
+    重叠目录读取的 I/O 等待。文件数上限按目录粒度检查，语言集合稳定后提前停止。
+    """
+    budget = _FileBudget(max_files)
+    scan = _TechStackScan()
+    subdirs: List[Tuple[str, int]] = []
+    _scan_directory(os.fspath(project_dir), 0, scan, budget, subdirs)
+
+    # 小项目线程启动开销不划算，顺序遍历
+    if len(subdirs) <= _PARALLEL_WALK_MIN_SUBDIRS:
+        for subdir, depth in subdirs:
+            scan.merge(_walk_subtree(subdir, depth, budget))
+        return scan
+
+    max_workers = min(_PARALLEL_WALK_MAX_WORKERS, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for subtree in executor.map(lambda item: _walk_subtree(item[0], item[1], budget), subdirs):
+            scan.merge(subtree)
+
+    return scan
+
+
+def _git_head(project_dir: Path) -> Optional[str]:
+    """读取 git HEAD 指向的提交（非 git 仓库返回 None）"""
+    git_dir = project_dir / ".git"
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        if not head.startswith("ref: "):
+            return head
+
+        ref = head[5:]
+        ref_file = git_dir / ref
+        if ref_file.is_file():
+            return ref_file.read_text(encoding="utf-8").strip()
+
+        packed = git_dir / "packed-refs"
+        if packed.is_file():
+            for line in packed.read_text(encoding="utf-8").splitlines():
+                if line.endswith(" " + ref):
+                    return line.split(" ", 1)[0]
+    except OSError:
+        pass
+    return None
+
+
+def _tree_digest(project_path: str) -> str:
+    """
+    整棵项目树的摘要：每个条目的路径、mtime 和大小（跳过忽略目录，不跟随符号链接）
+
+    任意层级的文件新增、删除、修改都会改变摘要；根目录 mtime 只反映根目录下的直接条目。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    stack = [project_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _IGNORED_DIRS:
+                        stack.append(entry.path)
+                    line = f"{entry.path}/\n"
+                else:
+                    stat = entry.stat(follow_symlinks=False)
+                    line = f"{entry.path}\0{stat.st_mtime_ns}\0{stat.st_size}\n"
+            except OSError:
+                continue
+            digest.update(line.encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+def _project_fingerprint(project_path: str) -> Optional[str]:
+    """
+    计算项目指纹：git HEAD + 整棵项目树的摘要（覆盖未提交的修改）
+
+    两者都不变时认为项目未变化；无法读取时返回 None（不缓存）。
+    需要遍历整个项目，调用方应放到线程中执行。
+    """
+    if not os.path.isdir(project_path):
+        return None
+    return f"{_git_head(Path(project_path)) or '-'}:{_tree_digest(project_path)}"
+
+
+# requirements.txt 行: 包名、可选 extras、版本约束（到注释或环境标记为止）
+_REQUIREMENT_RE = re.compile(
+    r"([A-Za-z0-9][A-Za-z0-9_.\-]*)\s*(?:\[[^\]]*\])?\s*([<>=~!][^#;]*)?"
+)
+
+# 并发读取依赖清单的上限
+_MANIFEST_READ_CONCURRENCY = 8
+
+# 依赖清单解析缓存: (解析器, 内容摘要) -> 依赖列表，进程内共享
+_MANIFEST_CACHE: "OrderedDict[Tuple[str, str], List[Library]]" = OrderedDict()
+_MANIFEST_CACHE_MAX_ENTRIES = 256
+
+
+def _content_memoize(
+    parse: Callable[[Any, str], List[Library]],
+) -> Callable[[Any, str], Awaitable[List[Library]]]:
+    """
+    依赖清单解析装饰器
+
+    被装饰的解析函数接收文件内容；包装后的方法接收文件路径（以及可选的
+    预读内容），按 blake2b 摘要缓存解析结果，相同内容的清单只解析一次。
+    """
+    @functools.wraps(parse)
+    async def wrapper(self, file_path: str, content: Optional[str] = None) -> List[Library]:
+        if content is None:
+            from app.services.rust_client import rust_client
+
+            try:
+                content = await rust_client.read_file(file_path)
+            except Exception as e:
+                logger.warning(f"读取依赖文件失败 {file_path}: {e}")
+                return []
+
+        digest = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+        key = (parse.__name__, digest)
+        libraries = _MANIFEST_CACHE.get(key)
+        if libraries is None:
+            libraries = parse(self, content)
+            _MANIFEST_CACHE[key] = libraries
+            while len(_MANIFEST_CACHE) > _MANIFEST_CACHE_MAX_ENTRIES:
+                _MANIFEST_CACHE.popitem(last=False)
+        else:
+            _MANIFEST_CACHE.move_to_end(key)
+
+        # Library 不可变，只需复制列表即可保护缓存
+        return list(libraries)
+
+    return wrapper
+
+
+# 按文件缓存依赖解析结果: 路径 -> ((mtime_ns, 大小), 依赖列表)
+# 增量审计时未变化的清单既不读取也不解析
+_MANIFEST_FILE_CACHE: "OrderedDict[str, Tuple[Tuple[int, int], List[Library]]]" = OrderedDict()
+_MANIFEST_FILE_CACHE_MAX_ENTRIES = 1024
+
+
+def _file_signature(file_path: str) -> Optional[Tuple[int, int]]:
+    """文件的 (mtime_ns, 大小)，本地不可访问时返回 None（不参与按文件缓存）"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Rust 后端是否支持批量读取接口（返回 404/405 后不再尝试）
+_read_batch_supported = True
+
+
+async def _prefetch_manifests(paths: List[str]) -> Dict[str, str]:
+    """
+    一次请求批量读取依赖清单内容
+
+    批量读取失败时返回空字典，由各解析器退回逐个读取。
+    """
+    global _read_batch_supported
+
+    if len(paths) < 2 or not _read_batch_supported:
+        return {}
+
+    from app.services.rust_client import rust_client
+
+    try:
+        return await rust_client.read_files_batch(paths)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (404, 405):
+            logger.info("Rust 后端不支持批量读取文件，退回逐个读取")
+            _read_batch_supported = False
+        else:
+            logger.warning(f"批量读取依赖文件失败，退回逐个读取: {e}")
+    except Exception as e:
+        logger.warning(f"批量读取依赖文件失败，退回逐个读取: {e}")
+    return {}
+
+
+# 侦察结果缓存: project_id -> {(项目路径, 指纹): 侦察结果}
+_recon_cache: Optional[ToolResultCache] = None
+
+
+class _KeyedLocks:
+    """按键分配的异步锁，最后一个使用者释放后删除条目，不随键的数量无限增长"""
+
+    def __init__(self):
+        # 键 -> [锁, 持有或等待该锁的协程数]
+        self._locks: Dict[Any, List[Any]] = {}
+
+    @contextlib.asynccontextmanager
+    async def hold(self, key: Any) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+# 同一项目同一指纹的侦察串行执行，并发审计等待首个结果后直接命中缓存
+_recon_locks = _KeyedLocks()
+
+
+def get_recon_cache() -> ToolResultCache:
+    """获取全局侦察结果缓存（项目变更时调用 invalidate_project_caches）"""
+    global _recon_cache
+    if _recon_cache is None:
+        _recon_cache = ToolResultCache(ttl_seconds=1800.0, max_entries=64)
+    return _recon_cache
+
+
+def invalidate_project_caches(project_id: str) -> int:
+    """
+    清除项目的跨审计缓存（侦察结果和只读工具结果）
+
+    Returns:
+        清除的条目数量
+    """
+    return get_recon_cache().invalidate(project_id) + get_tool_result_cache().invalidate(project_id)
+
+
+def _scan_high_value_targets(project_path: str, max_targets: int = 100) -> List[Dict[str, Any]]:
+    """
+    按高价值文件模式递归查找目标文件（阻塞，调用方应放到线程中执行）
+
+    Args:
+        project_path: 项目路径
+        max_targets: 最多返回的目标数量（限制数量以防卡死）
+
+    Returns:
+        目标列表，同一文件只记录一次
+    """
+    project_dir = Path(project_path)
+    targets: List[Dict[str, Any]] = []
+    seen_paths: Set[str] = set()
+
+    for category, pattern_list in _HIGH_VALUE_PATTERNS.items():
+        if len(targets) >= max_targets:
+            break
+
+        for pattern in pattern_list:
+            try:
+                # 使用 rglob 递归查找
+                for file_path in project_dir.rglob(pattern):
+                    if len(targets) >= max_targets:
+                        break
+
+                    # 过滤忽略目录（路径只规范化一次）
+                    norm_path = str(file_path).replace("\\", "/")
+                    if any(token in norm_path for token in _IGNORED_PATH_TOKENS):
+                        continue
+
+                    if not file_path.is_file():
+                        continue
+
+                    rel_path = str(file_path.relative_to(project_dir))
+                    # 避免重复
+                    if rel_path in seen_paths:
+                        continue
+                    seen_paths.add(rel_path)
+
+                    targets.append({
+                        "path": rel_path,
+                        "category": category,
+                        "type": "high_value_file",
+                        "description": f"Potential {category} file: {rel_path}"
+                    })
+            except Exception as e:
+                logger.warning(f"Error scanning pattern {pattern}: {e}")
+
+    return targets
 
 
 class ReconAgent(BaseAgent):
@@ -39,6 +842,11 @@ class ReconAgent(BaseAgent):
         super().__init__(name="recon", config=config)
         self._tool_service: Optional[ExternalToolService] = None
         self._dataflow_analyzer: Optional[DataFlowAnalyzer] = None
+        # 依赖清单文件名（小写） -> 解析方法，一次字典查找完成分派
+        self._manifest_parsers: Dict[str, Callable[..., Awaitable[List[Library]]]] = {
+            "package.json": self._parse_package_json,
+            "requirements.txt": self._parse_requirements_txt,
+        }
 
     async def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -74,14 +882,43 @@ class ReconAgent(BaseAgent):
             if not project_path:
                 return {"error": "项目路径不存在"}
 
+        # 项目未变化时直接复用上一次的侦察结果
+        fingerprint = await asyncio.to_thread(_project_fingerprint, project_path)
+        if fingerprint is None:
+            return await self._run_recon(project_info, project_path)
+
+        cache = get_recon_cache()
+        cache_key = (project_path, fingerprint)
+        async with _recon_locks.hold((project_id, cache_key)):
+            cached = cache.get(project_id, cache_key)
+            if cached is not None:
+                self.think(f"项目未变化，复用缓存的侦察结果 ({fingerprint})")
+                # 下游会修改发现字典，返回副本以保护缓存
+                return copy.deepcopy(cached)
+
+            result = await self._run_recon(project_info, project_path)
+            # 下游用指纹区分跨审计工具缓存，不必重新遍历项目
+            result["project_fingerprint"] = fingerprint
+            cache.set(project_id, cache_key, copy.deepcopy(result))
+            return result
+
+    async def _run_recon(self, project_info: Dict[str, Any], project_path: str) -> Dict[str, Any]:
+        """执行完整的侦察流程"""
         # 初始化服务
         self._tool_service = get_external_tool_service(project_path)
         self._dataflow_analyzer = get_dataflow_analyzer()
 
-        # 2. 识别技术栈
-        tech_stack = await self._identify_tech_stack(project_path)
-        self.think(f"识别到语言: {tech_stack.get('languages', [])}")
-        self.think(f"识别到框架: {tech_stack.get('frameworks', [])}")
+        # 2. 识别技术栈、扫描项目结构、识别高价值目标（Weaponization）互不依赖，并发执行
+        tech_stack, (structure, structure_index), hvt_targets = await asyncio.gather(
+            self._identify_tech_stack(project_path),
+            self._collect_structure(project_path),
+            self._identify_high_value_targets(project_path),
+        )
+        tech_stack_summary = _tech_stack_to_dict(tech_stack)
+        self.think(f"识别到语言: {tech_stack_summary['languages']}")
+        self.think(f"识别到框架: {tech_stack_summary['frameworks']}")
+        self.think(f"发现 {structure['file_count']} 个文件")
+        self.think(f"识别到 {len(hvt_targets)} 个高价值目标文件")
 
         # 3. 推荐并检查可用工具
         recommended_tools = await self._recommend_tools(tech_stack)
@@ -89,9 +926,15 @@ class ReconAgent(BaseAgent):
         self.think(f"推荐工具: {[t.name for t in recommended_tools]}")
         self.think(f"可用工具: {[t.name for t in available_tools]}")
 
-        # 4. 运行外部工具进行快速扫描
-        tool_findings = await self._scan_with_tools(recommended_tools, available_tools)
+        # 4. 外部工具扫描、数据流分析、依赖分析只依赖上一步的结果，并发执行
+        tool_findings, dataflow_findings, dependencies = await asyncio.gather(
+            self._scan_with_tools(recommended_tools, available_tools),
+            self._run_dataflow_analysis(project_path, tech_stack, structure_index),
+            self._analyze_dependencies(structure, structure_index),
+        )
         self.think(f"外部工具发现 {len(tool_findings)} 个潜在问题")
+        self.think(f"数据流分析发现 {len(dataflow_findings)} 个潜在漏洞")
+        self.think(f"发现 {len(dependencies.get('libraries', []))} 个依赖库")
 
         # 5. 提取高风险区域
         high_risk_areas = await self._extract_high_risk_areas(
@@ -99,26 +942,10 @@ class ReconAgent(BaseAgent):
         )
         self.think(f"识别到 {len(high_risk_areas)} 个高风险区域")
 
-        # 6. 执行数据流分析
-        dataflow_findings = await self._run_dataflow_analysis(project_path, tech_stack)
-        self.think(f"数据流分析发现 {len(dataflow_findings)} 个潜在漏洞")
-
-        # 7. 扫描项目结构
-        structure = await self._scan_structure(project_path)
-        self.think(f"发现 {len(structure.get('files', []))} 个文件")
-
-        # 8. 提取攻击面
-        attack_surface = await self._extract_attack_surface(structure, tech_stack)
+        # 6. 提取攻击面
+        attack_surface = await self._extract_attack_surface(structure, tech_stack, structure_index)
         self.think(f"发现 {len(attack_surface.get('entry_points', []))} 个攻击面入口点")
 
-        # 9. 分析依赖
-        dependencies = await self._analyze_dependencies(structure)
-        self.think(f"发现 {len(dependencies.get('libraries', []))} 个依赖库")
-
-        # 10. 识别高价值目标（Weaponization）
-        hvt_targets = await self._identify_high_value_targets(project_path)
-        self.think(f"识别到 {len(hvt_targets)} 个高价值目标文件")
-        
         # 合并到 high_risk_areas
         for target in hvt_targets:
             high_risk_areas.append({
@@ -127,7 +954,7 @@ class ReconAgent(BaseAgent):
                 "reason": target["description"]
             })
 
-        # 11. 生成优先级排序的扫描目标
+        # 7. 生成优先级排序的扫描目标
         prioritized_targets = self._prioritize_scan_targets(
             high_risk_areas, dataflow_findings, attack_surface
         )
@@ -135,7 +962,7 @@ class ReconAgent(BaseAgent):
         return {
             "project_info": project_info,
             "project_path": project_path, # 返回解析后的路径
-            "tech_stack": tech_stack,
+            "tech_stack": tech_stack_summary,
             "recommended_tools": [t.name for t in recommended_tools],
             "available_tools": [t.name for t in available_tools],
             "tool_findings": tool_findings,
@@ -143,11 +970,30 @@ class ReconAgent(BaseAgent):
             "dataflow_findings": dataflow_findings,
             "hvt_targets": hvt_targets,
             "structure": structure,
-            "attack_surface": attack_surface,
-            "dependencies": dependencies,
+            "attack_surface": _records_to_dicts(attack_surface),
+            "dependencies": _records_to_dicts(dependencies),
             "prioritized_targets": prioritized_targets,
         }
 
+    async def _collect_structure(self, project_path: str) -> Tuple[Dict[str, int], _StructureIndex]:
+        """
+        流式消费项目结构扫描结果
+
+        只保留计数和文件索引，不在内存中保存完整文件列表。
+
+        Returns:
+            (结构计数, 文件索引)
+        """
+        structure_index = _StructureIndex()
+        structure = {"file_count": 0, "directory_count": 0}
+        async for kind, path, name in self._iter_structure(project_path, structure_index):
+            if kind == "file":
+                structure["file_count"] += 1
+                structure_index.add_file(path, name)
+            else:
+                structure["directory_count"] += 1
+        return structure, structure_index
+
     async def _resolve_project_path(self, path_str: str) -> str:
         """智能解析项目路径"""
         if not path_str:
@@ -208,79 +1054,17 @@ class ReconAgent(BaseAgent):
 
     async def _identify_high_value_targets(self, project_path: str) -> List[Dict[str, Any]]:
         """识别高价值目标文件 (Weaponization)"""
-        project_dir = Path(project_path)
-        targets = []
-        
-        # 定义高价值模式
-        patterns = {
-            "config": [
-                "config.py", "settings.py", ".env", "application.yml", "application.properties",
-                "web.config", "uwsgi.ini", "nginx.conf", "docker-compose.yml", "Dockerfile",
-                "k8s.yaml", "helm.yaml"
-            ],
-            "auth": [
-                "*auth*", "*login*", "*user*", "*permission*", "*role*", "*jwt*", "*token*",
-                "*middleware*", "*interceptor*", "*filter*", "*security*"
-            ],
-            "upload": [
-                "*upload*", "*file*", "*image*", "*attachment*", "*import*", "*export*"
-            ],
-            "database": [
-                "*schema*", "*migration*", "*model*", "*entity*", "*db*", "*database*", "*sql*"
-            ],
-            "api": [
-                "*api*", "*route*", "*controller*", "*view*", "*endpoint*", "*handler*"
-            ],
-            "crypto": [
-                "*crypto*", "*cipher*", "*encrypt*", "*decrypt*", "*key*", "*secret*"
-            ]
-        }
-        
         self.think("正在扫描高价值目标文件...")
-        
-        # 扫描 (限制数量以防卡死)
-        count = 0
-        max_targets = 100
-        
-        for category, pattern_list in patterns.items():
-            if count >= max_targets:
-                break
-                
-            for pattern in pattern_list:
-                try:
-                    # 使用 rglob 递归查找
-                    for file_path in project_dir.rglob(pattern):
-                        if count >= max_targets:
-                            break
-                            
-                        # 过滤忽略目录
-                        if any(p in str(file_path).replace("\\", "/") for p in [".git", "node_modules", "venv", ".venv", "__pycache__", "dist", "build", "target", "vendor", ".idea", ".vscode", "bin", "obj", "out"]):
-                            continue
-                            
-                        if file_path.is_file():
-                            try:
-                                rel_path = str(file_path.relative_to(project_dir))
-                                # 避免重复
-                                if any(t["path"] == rel_path for t in targets):
-                                    continue
-                                    
-                                targets.append({
-                                    "path": rel_path,
-                                    "category": category,
-                                    "type": "high_value_file",
-                                    "description": f"Potential {category} file: {rel_path}"
-                                })
-                                count += 1
-                                
-                                # 实时通知发现
-                                await self._publish_event("thinking", {
-                                    "message": f"🎯 发现高价值目标: {rel_path} ({category})"
-                                })
-                            except:
-                                pass
-                except Exception as e:
-                    logger.warning(f"Error scanning pattern {pattern}: {e}")
-                            
+
+        # rglob 遍历是阻塞的文件系统操作，放到线程中执行，与其他侦察阶段真正并发
+        targets = await asyncio.to_thread(_scan_high_value_targets, project_path)
+
+        for target in targets:
+            # 实时通知发现
+            await self._publish_event("thinking", {
+                "message": f"🎯 发现高价值目标: {target['path']} ({target['category']})"
+            })
+
         return targets
 
     async def _get_project_info(self, project_id: str) -> Dict[str, Any]:
@@ -293,7 +1077,7 @@ class ReconAgent(BaseAgent):
             logger.warning(f"获取项目信息失败: {e}")
             return {"id": project_id, "path": "unknown"}
 
-    async def _identify_tech_stack(self, project_path: str) -> Dict[str, Any]:
+    async def _identify_tech_stack(self, project_path: str) -> Dict[str, Set[str]]:
         """
         识别技术栈
 
@@ -301,11 +1085,11 @@ class ReconAgent(BaseAgent):
             project_path: 项目路径
 
         Returns:
-            技术栈信息
+            技术栈信息（集合形式，输出时由 _tech_stack_to_dict 排序）
         """
-        languages = set()
-        frameworks = set()
-        package_managers = set()
+        languages: Set[str] = set()
+        frameworks: Set[str] = set()
+        package_managers: Set[str] = set()
 
         # 规范化路径：转换为绝对路径并规范化分隔符
         project_dir = Path(project_path).resolve()
@@ -315,153 +1099,43 @@ class ReconAgent(BaseAgent):
         if not project_dir.exists():
             self.think(f"警告: 项目目录不存在: {project_dir}")
             return {
-                "languages": [],
-                "frameworks": [],
-                "package_managers": [],
+                "languages": languages,
+                "frameworks": frameworks,
+                "package_managers": package_managers,
             }
             
-        # 忽略目录列表
-        ignored_dirs = {
-            ".git", "node_modules", "venv", ".venv", "__pycache__", 
-            "dist", "build", "target", "vendor", ".idea", ".vscode",
-            "bin", "obj", "out"
-        }
-
-        # 检查常见文件识别语言和框架
-        check_files = [
-            ("package.json", "JavaScript", ["Node.js"]),
-            ("tsconfig.json", "TypeScript", ["Node.js"]),
-            ("requirements.txt", "Python", ["Python/Pip"]),
-            ("Pipfile", "Python", ["Pipenv"]),
-            ("pyproject.toml", "Python", ["Poetry"]),
-            ("setup.py", "Python", ["Python"]),
-            ("pom.xml", "Java", ["Maven"]),
-            ("build.gradle", "Java", ["Gradle"]),
-            ("Cargo.toml", "Rust", ["Cargo"]),
-            ("go.mod", "Go", ["Go Module"]),
-            ("composer.json", "PHP", ["Composer"]),
-            ("Gemfile", "Ruby", ["Bundler"]),
-            ("pubspec.yaml", "Dart", ["Pub"]),
-            ("mix.exs", "Elixir", ["Hex"]),
-        ]
+        # 一次遍历同时得到浅层文件名和扩展名语言，后续判断都是集合查找
+        scan = await asyncio.to_thread(_scan_tech_stack_files, project_dir)
+        languages |= scan.languages
 
         found_files = []
-        # 递归检查配置文件（限制深度）
-        for file_name, lang, fw_list in check_files:
-            try:
-                # 首先检查根目录
-                if (project_dir / file_name).exists():
-                    languages.add(lang)
-                    frameworks.update(fw_list)
-                    found_files.append(file_name)
-                    self._update_package_managers(file_name, package_managers)
-                else:
-                    # 如果根目录没有，尝试在子目录查找（深度2）
-                    # 注意：rglob 可能会很慢，所以限制查找
-                    matches = list(project_dir.glob(f"*/{file_name}")) + list(project_dir.glob(f"*/*/{file_name}"))
-                    if matches:
-                        # 过滤忽略目录
-                        valid_match = False
-                        for match in matches:
-                            if not any(d in match.parts for d in ignored_dirs):
-                                valid_match = True
-                                break
-                        
-                        if valid_match:
-                            languages.add(lang)
-                            frameworks.update(fw_list)
-                            found_files.append(file_name)
-                            self._update_package_managers(file_name, package_managers)
-            except Exception:
-                pass
+        for file_name, lang, fw_list in _MANIFEST_FILES:
+            if file_name in scan.root_names or file_name in scan.nested_names:
+                languages.add(lang)
+                frameworks.update(fw_list)
+                found_files.append(file_name)
+                self._update_package_managers(file_name, package_managers)
 
         if found_files:
             self.think(f"找到配置文件: {found_files}")
 
-        # 通过文件扩展名补充语言识别
-        extension_map = {
-            ".py": "Python",
-            ".js": "JavaScript",
-            ".ts": "TypeScript",
-            ".tsx": "TypeScript",
-            ".jsx": "JavaScript",
-            ".java": "Java",
-            ".go": "Go",
-            ".rs": "Rust",
-            ".php": "PHP",
-            ".rb": "Ruby",
-            ".cs": "C#",
-            ".cpp": "C++",
-            ".c": "C",
-            ".kt": "Kotlin",
-            ".swift": "Swift",
-        }
-
-        # 限制扫描深度，避免扫描过深
-        scanned_count = 0
-        max_files = 1000  # 增加扫描限制
-
-        try:
-            for file_path in project_dir.rglob("*"):
-                if scanned_count >= max_files:
-                    break
-                
-                # 过滤忽略目录
-                if any(d in file_path.parts for d in ignored_dirs):
-                    continue
-
-                if file_path.is_file():
-                    scanned_count += 1
-                    file_str = str(file_path)
-                    for ext, lang in extension_map.items():
-                        if file_str.endswith(ext):
-                            languages.add(lang)
-                            break
-        except PermissionError as e:
-            self.think(f"文件扫描权限错误: {e}")
-
         # 检测 Web 框架 (增强版)
-        web_frameworks_map = {
-            "app.py": "Flask",
-            "wsgi.py": "Flask",
-            "manage.py": "Django",
-            "application.go": "Go Web Framework",
-            "gin.go": "Gin",
-            "main.go": "Go", # 通用
-            "NestFactory": "NestJS", # 内容检测可能太慢，这里只做文件名
-        }
-        
-        for fname, fw in web_frameworks_map.items():
-             if (project_dir / fname).exists():
-                 frameworks.add(fw)
-
-        result = {
-            "languages": sorted(list(languages)),
-            "frameworks": sorted(list(frameworks)),
-            "package_managers": sorted(list(package_managers)),
-        }
+        for fname, fw in _WEB_FRAMEWORK_FILES.items():
+            if fname in scan.root_names:
+                frameworks.add(fw)
 
-        self.think(f"技术栈识别结果 - 语言: {result['languages']}, 框架: {result['frameworks']}")
-        return result
+        self.think(f"技术栈识别结果 - 语言: {languages}, 框架: {frameworks}")
+        return {
+            "languages": languages,
+            "frameworks": frameworks,
+            "package_managers": package_managers,
+        }
 
     def _update_package_managers(self, file_name: str, package_managers: Set[str]):
         """更新包管理器集合"""
-        if file_name == "package.json":
-            package_managers.add("npm")
-        elif file_name == "requirements.txt":
-            package_managers.add("pip")
-        elif file_name == "Cargo.toml":
-            package_managers.add("cargo")
-        elif file_name == "go.mod":
-            package_managers.add("go")
-        elif file_name == "pom.xml":
-            package_managers.add("maven")
-        elif file_name == "build.gradle":
-            package_managers.add("gradle")
-        elif file_name == "Gemfile":
-            package_managers.add("bundler")
-        elif file_name == "composer.json":
-            package_managers.add("composer")
+        manager = _PACKAGE_MANAGERS.get(file_name)
+        if manager:
+            package_managers.add(manager)
 
     async def _recommend_tools(self, tech_stack: Dict[str, Any]) -> List[ToolInfo]:
         """
@@ -501,61 +1175,11 @@ class ReconAgent(BaseAgent):
             recommendations.append("safety")
 
         # 去重并保持顺序
-        seen = set()
-        ordered_tools = []
-        for tool in recommendations:
-            if tool not in seen:
-                seen.add(tool)
-                ordered_tools.append(tool)
-
-        # 获取工具信息
-        all_tools = [
-            ToolInfo(
-                name="semgrep",
-                description="静态代码分析工具，支持多种语言",
-                language=["*"],
-                install_cmd="pip install semgrep",
-                check_cmd=["semgrep", "--version"],
-                priority=10,
-            ),
-            ToolInfo(
-                name="bandit",
-                description="Python 安全漏洞扫描工具",
-                language=["python"],
-                install_cmd="pip install bandit",
-                check_cmd=["bandit", "--version"],
-                priority=9,
-            ),
-            ToolInfo(
-                name="safety",
-                description="Python 依赖漏洞扫描工具",
-                language=["python"],
-                install_cmd="pip install safety",
-                check_cmd=["safety", "--version"],
-                priority=7,
-            ),
-            ToolInfo(
-                name="gitleaks",
-                description="密钥和敏感信息检测工具",
-                language=["*"],
-                install_cmd="go install github.com/zricethezav/gitleaks/v8/cmd/gitleaks@latest",
-                check_cmd=["gitleaks", "version"],
-                priority=8,
-            ),
-            ToolInfo(
-                name="npm_audit",
-                description="Node.js 依赖漏洞扫描工具",
-                language=["javascript", "typescript"],
-                install_cmd="",  # npm 自带
-                check_cmd=["npm", "--version"],
-                priority=6,
-            ),
+        return [
+            tool for tool in map(_RECOMMENDABLE_TOOLS.get, dict.fromkeys(recommendations))
+            if tool is not None
         ]
 
-        # 构建推荐工具列表
-        tool_map = {t.name: t for t in all_tools}
-        return [tool_map[name] for name in ordered_tools if name in tool_map]
-
     async def _scan_with_tools(
         self,
         recommended_tools: List[ToolInfo],
@@ -575,38 +1199,46 @@ class ReconAgent(BaseAgent):
 
         # 只运行可用的工具
         available_names = {t.name for t in available_tools}
-
+        runnable = []
         for tool_info in recommended_tools:
             if tool_info.name not in available_names:
                 self.think(f"工具 {tool_info.name} 不可用，跳过")
                 continue
-
             self.think(f"运行工具: {tool_info.name}")
+            runnable.append(tool_info)
 
-            try:
-                result = await self._tool_service.run_tool_by_name(tool_info.name)
-
-                if result and result.success:
-                    self.think(f"工具 {tool_info.name} 发现 {len(result.findings)} 个问题")
-
-                    # 转换为统一格式
-                    for finding in result.findings:
-                        all_findings.append({
-                            "tool": tool_info.name,
-                            "severity": finding.get("severity", "medium"),
-                            "title": finding.get("title", ""),
-                            "description": finding.get("description", ""),
-                            "file_path": finding.get("file_path", ""),
-                            "line_number": finding.get("line_number", 0),
-                            "rule_id": finding.get("rule_id", ""),
-                            "cwe_ids": finding.get("cwe_ids", []),
-                            "metadata": finding.get("metadata", {}),
-                        })
-                else:
-                    self.think(f"工具 {tool_info.name} 执行失败: {result.error if result else 'Unknown error'}")
+        # 各工具是独立子进程，并发运行（按 CPU 数限制并发）
+        semaphore = asyncio.Semaphore(os.cpu_count() or 1)
 
-            except Exception as e:
-                logger.warning(f"运行工具 {tool_info.name} 失败: {e}")
+        async def _run(tool_info: ToolInfo):
+            async with semaphore:
+                return await self._tool_service.run_tool_by_name(tool_info.name)
+
+        results = await asyncio.gather(*(_run(t) for t in runnable), return_exceptions=True)
+
+        for tool_info, result in zip(runnable, results):
+            if isinstance(result, Exception):
+                logger.warning(f"运行工具 {tool_info.name} 失败: {result}")
+                continue
+
+            if result and result.success:
+                self.think(f"工具 {tool_info.name} 发现 {len(result.findings)} 个问题")
+
+                # 转换为统一格式
+                for finding in result.findings:
+                    all_findings.append({
+                        "tool": tool_info.name,
+                        "severity": finding.get("severity", "medium"),
+                        "title": finding.get("title", ""),
+                        "description": finding.get("description", ""),
+                        "file_path": finding.get("file_path", ""),
+                        "line_number": finding.get("line_number", 0),
+                        "rule_id": finding.get("rule_id", ""),
+                        "cwe_ids": finding.get("cwe_ids", []),
+                        "metadata": finding.get("metadata", {}),
+                    })
+            else:
+                self.think(f"工具 {tool_info.name} 执行失败: {result.error if result else 'Unknown error'}")
 
         return all_findings
 
@@ -629,63 +1261,62 @@ class ReconAgent(BaseAgent):
         """
         high_risk_areas = []
 
-        # 按文件分组统计问题
-        file_issues = {}
+        # 第一遍只按文件统计各严重程度的数量（未知严重程度不影响优先级，直接跳过）
+        file_counts: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0, 0])
         for finding in tool_findings:
             file_path = finding.get("file_path", "")
-            if not file_path:
+            index = _RISK_SEVERITY_INDEX.get(finding.get("severity", "medium"))
+            if not file_path or index is None:
                 continue
-
-            severity = finding.get("severity", "medium")
-            line_number = finding.get("line_number", 0)
-
-            if file_path not in file_issues:
-                file_issues[file_path] = {
-                    "critical": [],
-                    "high": [],
-                    "medium": [],
-                    "low": [],
-                }
-
-            if severity in file_issues[file_path]:
-                file_issues[file_path][severity].append(line_number)
+            file_counts[file_path][index] += 1
 
         # 生成高风险区域
-        for file_path, issues in file_issues.items():
+        file_lines: Dict[str, Tuple[List[int], ...]] = {}
+        for file_path, (critical, high, medium, _) in file_counts.items():
             # 优先级规则
             priority = 0
 
             # 有 critical 问题
-            if issues["critical"]:
-                priority = 100 + len(issues["critical"])
+            if critical:
+                priority = 100 + critical
             # 有 high 问题
-            elif issues["high"]:
-                priority = 70 + len(issues["high"])
+            elif high:
+                priority = 70 + high
             # 有多个 medium 问题
-            elif len(issues["medium"]) >= 3:
-                priority = 50 + len(issues["medium"])
+            elif medium >= 3:
+                priority = 50 + medium
             # 有 medium 问题
-            elif issues["medium"]:
-                priority = 30 + len(issues["medium"])
+            elif medium:
+                priority = 30 + medium
 
             if priority > 0:
+                lines = file_lines[file_path] = ([], [], [], [])
                 high_risk_areas.append({
                     "file_path": file_path,
                     "priority": priority,
-                    "issues": issues,
+                    "issues": dict(zip(_RISK_SEVERITIES, lines)),
                     "recommendation": "优先分析此文件",
                 })
 
-        # 按优先级排序
-        high_risk_areas.sort(key=lambda x: x["priority"], reverse=True)
+        # 第二遍只为入选的文件收集行号（只有 low 问题的文件不分配行号列表）
+        if file_lines:
+            for finding in tool_findings:
+                lines = file_lines.get(finding.get("file_path", ""))
+                if lines is None:
+                    continue
+                index = _RISK_SEVERITY_INDEX.get(finding.get("severity", "medium"))
+                if index is not None:
+                    lines[index].append(finding.get("line_number", 0))
 
-        # 只返回优先级 >= 30 的区域
-        return [area for area in high_risk_areas if area["priority"] >= 30]
+        # 按优先级排序（有问题的文件优先级至少为 31，无需再过滤）
+        high_risk_areas.sort(key=_by_priority, reverse=True)
+        return high_risk_areas
 
     async def _run_dataflow_analysis(
         self,
         project_path: str,
         tech_stack: Dict[str, Any],
+        index: Optional[_StructureIndex] = None,
     ) -> List[Dict[str, Any]]:
         """
         执行数据流分析
@@ -693,6 +1324,7 @@ class ReconAgent(BaseAgent):
         Args:
             project_path: 项目路径
             tech_stack: 技术栈信息
+            index: 结构扫描时建立的文件索引（覆盖整棵树时直接分析其中的文件，不再遍历项目）
 
         Returns:
             数据流分析发现的漏洞列表
@@ -708,10 +1340,13 @@ class ReconAgent(BaseAgent):
         self.think("开始数据流分析...")
 
         try:
-            # 分析整个项目
-            vulnerabilities = await self._dataflow_analyzer.analyze_project(
-                project_path=project_path,
-                file_patterns=None,  # 分析所有文件
+            # 分析是同步的 CPU 密集任务，放到线程中执行，不阻塞事件循环
+            vulnerabilities = await asyncio.to_thread(
+                self._dataflow_analyzer.analyze_project,
+                project_path,
+                None,  # 默认分析 Python 文件
+                # 索引不完整（按层列目录时单个目录失败会被跳过）时仍由分析器递归查找
+                index.dataflow_files if index is not None and index.complete else None,
             )
 
             self.think(f"数据流分析完成，发现 {len(vulnerabilities)} 个潜在漏洞")
@@ -741,56 +1376,118 @@ class ReconAgent(BaseAgent):
             logger.warning(f"数据流分析失败: {e}")
             return []
 
-    async def _scan_structure(self, project_path: str) -> Dict[str, Any]:
+    async def _scan_structure(
+        self,
+        project_path: str,
+        index: Optional[_StructureIndex] = None,
+    ) -> Dict[str, Any]:
         """
-        扫描项目结构
+        扫描项目结构（收集完整的文件和目录列表）
 
         Args:
             project_path: 项目路径
+            index: 可选的文件索引，发现文件时同步完成攻击面分类和依赖清单识别
 
         Returns:
             项目结构
         """
-        from app.services.rust_client import rust_client
-
         files = []
         directories = []
-        
-        # 忽略目录列表
-        ignored_dirs = {
-            ".git", "node_modules", "venv", ".venv", "__pycache__", 
-            "dist", "build", "target", "vendor", ".idea", ".vscode",
-            "bin", "obj", "out"
-        }
 
-        try:
-            items = await rust_client.list_files(project_path)
-            for item in items:
-                # 规范化路径分隔符
-                norm_item = item.replace("\\", "/")
-                
-                # 过滤忽略目录
-                # 检查路径部分中是否包含忽略目录
-                parts = norm_item.split("/")
-                if any(part in ignored_dirs for part in parts):
-                    continue
+        async for kind, path, name in self._iter_structure(project_path, index):
+            if kind == "file":
+                files.append(path)
+                if index is not None:
+                    index.add_file(path, name)
+            else:
+                directories.append(path)
 
-                full_path = item
-                # 简单判断：有后缀的是文件
-                if "." in item.split("/")[-1]:
-                    files.append(full_path)
-                else:
-                    directories.append(full_path)
+        return {"files": files, "directories": directories}
 
-        except Exception as e:
-            logger.warning(f"扫描项目结构失败: {e}")
+    async def _iter_structure(
+        self,
+        project_path: str,
+        index: Optional[_StructureIndex] = None,
+    ) -> AsyncIterator[Tuple[str, str, str]]:
+        """
+        流式遍历项目结构
 
-        return {"files": files, "directories": directories}
+        优先由 Rust 后端一次请求完成整棵树的遍历；后端不支持时退回按层列目录。
+
+        Args:
+            project_path: 项目路径
+            index: 可选的文件索引，walk 完整遍历结束后标记为覆盖整棵树
+
+        Yields:
+            (类型, 路径, 名称)，类型为 "file" 或 "directory"
+        """
+        entries = await _walk_project(project_path)
+        if entries is None:
+            async for item in self._iter_structure_by_level(project_path):
+                yield item
+            return
+
+        # 忽略目录已由后端在遍历时剪枝，文件名也由后端给出，这里不再逐条切分路径
+        for entry in entries:
+            yield ("directory" if entry["is_dir"] else "file"), entry["path"], entry["name"]
+        if index is not None:
+            index.complete = True
+
+    async def _iter_structure_by_level(self, project_path: str) -> AsyncIterator[Tuple[str, str, str]]:
+        """
+        按层列出目录（每层一次合并请求），用于后端不支持 walk 接口时
+
+        后端 /list 本身递归列出整棵树，只返回文件；这里继续列出下一层是为了兼容
+        只返回单层条目的后端，层数不设上限，已见过的路径不会重复列出
+        """
+        from app.services.batched_rust_client import get_list_files_batcher
+
+        batcher = get_list_files_batcher()
+        seen: Set[str] = set()
+
+        async def _list_dir(directory: str) -> List[str]:
+            try:
+                # 同一层的并发请求由 batcher 合并为批量 RPC
+                return await batcher.list_files(directory)
+            except Exception as e:
+                logger.warning(f"扫描项目结构失败 {directory}: {e}")
+                return []
+
+        # 按层遍历：同一层的目录并发列出，关键路径只取决于目录深度
+        level = [project_path]
+        while level:
+            listings = await asyncio.gather(*(_list_dir(d) for d in level))
+            next_level = []
+            for items in listings:
+                for item in items:
+                    # 后端可能返回递归结果，已见过的路径不再重复处理
+                    if item in seen:
+                        continue
+                    seen.add(item)
+
+                    # 规范化路径分隔符
+                    norm_item = item.replace("\\", "/")
+
+                    # 过滤忽略目录
+                    # 检查路径部分中是否包含忽略目录
+                    parts = norm_item.split("/")
+                    if not _IGNORED_DIRS.isdisjoint(parts):
+                        continue
+
+                    # 简单判断：有后缀的是文件
+                    if "." in parts[-1]:
+                        yield "file", item, parts[-1]
+                    else:
+                        next_level.append(item)
+                        yield "directory", item, parts[-1]
+
+            level = next_level
 
     async def _extract_attack_surface(
         self,
         structure: Dict[str, Any],
         tech_stack: Dict[str, Any],
+        index: Optional[_StructureIndex] = None,
     ) -> Dict[str, Any]:
         """
         提取攻击面
@@ -798,161 +1495,130 @@ class ReconAgent(BaseAgent):
         Args:
             structure: 项目结构
             tech_stack: 技术栈
+            index: 结构扫描时建立的文件索引（没有时从文件列表重新建立）
 
         Returns:
             攻击面信息
         """
-        entry_points = []
-        user_inputs = []
-
-        files = structure.get("files", [])
-
-        # 识别潜在的攻击面入口
-        for file_path in files:
-            file_name = file_path.split("/")[-1].lower()
-            file_dir = "/".join(file_path.split("/")[:-1]).lower()
-
-            # Web 路由文件
-            if any(keyword in file_dir or keyword in file_name
-                   for keyword in ["route", "controller", "handler", "api", "view", "endpoint"]):
-                entry_points.append({
-                    "type": "web_route",
-                    "file": file_path,
-                    "description": "Web 路由定义文件",
-                })
-
-            # 表单/输入处理
-            if any(keyword in file_name for keyword in ["form", "input", "upload", "submit"]):
-                user_inputs.append({
-                    "type": "user_input",
-                    "file": file_path,
-                    "description": "用户输入处理文件",
-                })
-
-            # 数据库查询
-            if any(keyword in file_dir or keyword in file_name
-                   for keyword in ["model", "query", "database", "db", "sql"]):
-                entry_points.append({
-                    "type": "database",
-                    "file": file_path,
-                    "description": "数据库操作文件",
-                })
-
-            # 认证/授权
-            if any(keyword in file_dir or keyword in file_name
-                   for keyword in ["auth", "login", "permission", "access", "user", "session"]):
-                entry_points.append({
-                    "type": "auth",
-                    "file": file_path,
-                    "description": "认证/授权文件",
-                    "severity": "high",
-                })
-
-            # 文件操作
-            if any(keyword in file_dir or keyword in file_name
-                   for keyword in ["file", "fs", "io", "upload", "download", "storage"]):
-                entry_points.append({
-                    "type": "file_operation",
-                    "file": file_path,
-                    "description": "文件操作文件",
-                })
-
-            # 命令执行
-            if any(keyword in file_dir or keyword in file_name
-                   for keyword in ["exec", "spawn", "shell", "command", "system", "subprocess"]):
-                entry_points.append({
-                    "type": "command_execution",
-                    "file": file_path,
-                    "description": "命令执行相关",
-                    "severity": "high",
-                })
+        if index is None:
+            index = _StructureIndex.from_files(structure.get("files", []))
 
         return {
-            "entry_points": entry_points,
-            "user_inputs": user_inputs,
-            "file_operations": [e for e in entry_points if e["type"] == "file_operation"],
-            "command_executions": [e for e in entry_points if e["type"] == "command_execution"],
+            "entry_points": index.entry_points,
+            "user_inputs": index.user_inputs,
+            # 分组在分类时已完成，这里不再重新扫描入口点
+            "file_operations": index.by_type["file_operation"],
+            "command_executions": index.by_type["command_execution"],
         }
 
-    async def _analyze_dependencies(self, structure: Dict[str, Any]) -> Dict[str, Any]:
+    async def _analyze_dependencies(
+        self,
+        structure: Dict[str, Any],
+        index: Optional[_StructureIndex] = None,
+    ) -> Dict[str, Any]:
         """
         分析依赖库
 
         Args:
             structure: 项目结构
+            index: 结构扫描时建立的文件索引（没有时从文件列表重新建立）
 
         Returns:
             依赖信息
         """
-        libraries = []
-        files = structure.get("files", [])
-
-        # 分析依赖文件
-        for file_path in files:
-            filename = file_path.split("/")[-1].lower()
+        if index is None:
+            index = _StructureIndex.from_files(structure.get("files", []))
+
+        semaphore = asyncio.Semaphore(_MANIFEST_READ_CONCURRENCY)
+
+        async def _bounded(parse_coro: Awaitable[List[Library]]) -> List[Library]:
+            async with semaphore:
+                return await parse_coro
+
+        # 文件未变化（mtime 和大小一致）时直接复用上次的解析结果
+        per_file: Dict[str, List[Library]] = {}
+        pending = []
+        for file_path in index.manifests:
+            filename = file_path.replace("\\", "/").rsplit("/", 1)[-1].lower()
+            parser = self._manifest_parsers.get(filename)
+            if not parser:
+                continue
 
-            if filename == "package.json":
-                libraries.extend(await self._parse_package_json(file_path))
-            elif filename == "requirements.txt":
-                libraries.extend(await self._parse_requirements_txt(file_path))
+            signature = _file_signature(file_path)
+            cached = _MANIFEST_FILE_CACHE.get(file_path)
+            if signature is not None and cached is not None and cached[0] == signature:
+                _MANIFEST_FILE_CACHE.move_to_end(file_path)
+                per_file[file_path] = cached[1]
+            else:
+                pending.append((file_path, parser, signature))
+
+        # 变化的清单先一次性批量读取，未取到内容的再由解析器逐个读取（限制并发数）
+        contents = await _prefetch_manifests([file_path for file_path, _, _ in pending])
+        results = await asyncio.gather(
+            *(_bounded(parser(file_path, contents.get(file_path))) for file_path, parser, _ in pending),
+            return_exceptions=True,
+        )
+        for (file_path, _, signature), result in zip(pending, results):
+            if isinstance(result, Exception):
+                logger.warning(f"解析依赖文件失败 {file_path}: {result}")
+                continue
+            per_file[file_path] = result
+            if signature is not None:
+                _MANIFEST_FILE_CACHE[file_path] = (signature, result)
+                _MANIFEST_FILE_CACHE.move_to_end(file_path)
+                while len(_MANIFEST_FILE_CACHE) > _MANIFEST_FILE_CACHE_MAX_ENTRIES:
+                    _MANIFEST_FILE_CACHE.popitem(last=False)
+
+        # 按清单顺序合并结果
+        libraries = []
+        for file_path in index.manifests:
+            libraries.extend(per_file.get(file_path, ()))
 
         return {
             "libraries": libraries,
             "total_libraries": len(libraries),
         }
 
-    async def _parse_package_json(self, file_path: str) -> List[Dict[str, str]]:
+    @_content_memoize
+    def _parse_package_json(self, content: str) -> List[Library]:
         """解析 package.json"""
-        from app.services.rust_client import rust_client
-
         try:
-            content = await rust_client.read_file(file_path)
-            import json
-            data = json.loads(content)
+            data = orjson.loads(content)
 
             deps = data.get("dependencies", {})
             dev_deps = data.get("devDependencies", {})
 
-            libraries = []
-            for name, version in list(deps.items()) + list(dev_deps.items()):
-                libraries.append({
-                    "name": name,
-                    "version": version,
-                    "type": "production" if name in deps else "development",
-                    "ecosystem": "npm",
-                })
-
-            return libraries
+            # 分别遍历两组依赖，类型由来源决定，无需逐项判断归属
+            return [
+                Library(name=name, version=version, type="production", ecosystem="npm")
+                for name, version in deps.items()
+            ] + [
+                Library(name=name, version=version, type="development", ecosystem="npm")
+                for name, version in dev_deps.items()
+            ]
         except Exception as e:
             logger.warning(f"解析 package.json 失败: {e}")
             return []
 
-    async def _parse_requirements_txt(self, file_path: str) -> List[Dict[str, str]]:
+    @_content_memoize
+    def _parse_requirements_txt(self, content: str) -> List[Library]:
         """解析 requirements.txt"""
-        from app.services.rust_client import rust_client
-
         try:
-            content = await rust_client.read_file(file_path)
-
             libraries = []
             for line in content.split("\n"):
                 line = line.strip()
                 if not line or line.startswith("#"):
                     continue
 
-                # 解析包名和版本
-                parts = line.split(">=")[:1] if ">=" in line else \
-                        line.split("==")[:1] if "==" in line else \
-                        line.split("~")[:1] if "~" in line else \
-                        [line]
-
-                if parts:
-                    libraries.append({
-                        "name": parts[0].strip(),
-                        "version": line.replace(parts[0], "").strip() or "unknown",
-                        "type": "production",
-                        "ecosystem": "pypi",
-                    })
+                # 一次正则匹配得到包名和版本约束（-r/-e 等选项行不匹配）
+                match = _REQUIREMENT_RE.match(line)
+                if match:
+                    libraries.append(Library(
+                        name=match.group(1),
+                        version=(match.group(2) or "").strip() or "unknown",
+                        type="production",
+                        ecosystem="pypi",
+                    ))
 
             return libraries
         except Exception as e:
@@ -980,7 +1646,7 @@ class ReconAgent(BaseAgent):
 
         # 1. 数据流分析发现的漏洞（最高优先级）
         for finding in dataflow_findings:
-            if finding.get("severity") in ["critical", "high"]:
+            if finding.get("severity") in _HIGH_SEVERITIES:
                 targets.append({
                     "type": "dataflow_vulnerability",
                     "file_path": finding.get("file_path"),
@@ -1002,10 +1668,10 @@ class ReconAgent(BaseAgent):
 
         # 3. 认证/授权入口点
         for entry in attack_surface.get("entry_points", []):
-            if entry.get("severity") == "high":
+            if entry.severity == "high":
                 targets.append({
                     "type": "auth_entry",
-                    "file_path": entry.get("file"),
+                    "file_path": entry.file,
                     "priority": 70,
                     "reason": "认证/授权相关入口点",
                 })
@@ -1014,13 +1680,13 @@ class ReconAgent(BaseAgent):
         for entry in attack_surface.get("command_executions", []):
             targets.append({
                 "type": "command_execution",
-                "file_path": entry.get("file"),
+                "file_path": entry.file,
                 "priority": 80,
                 "reason": "命令执行相关代码",
             })
 
         # 按优先级排序
-        targets.sort(key=lambda x: x["priority"], reverse=True)
+        targets.sort(key=_by_priority, reverse=True)
 
         return targets
 
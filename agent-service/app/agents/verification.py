@@ -3,7 +3,10 @@ Verification Agent - LLM 驱动的漏洞验证者
 
 负责漏洞验证和智能 PoC 生成
 """
-from typing import Dict, Any, List, Optional, TYPE_CHECKING
+import asyncio
+import json
+import threading
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
 from loguru import logger
 
 from app.agents.base import BaseAgent
@@ -20,6 +23,100 @@ except ImportError:
     DOCKER_AVAILABLE = False
 
 
+# PoC 生成时同时要求给出验证计划，一次 LLM 调用得到 PoC 和判定依据
+_POC_PLAN_INSTRUCTIONS = """
+
+## 输出格式
+只返回一个 JSON 对象，不要有其他文字：
+{"poc": "<可直接用 python -c 执行的 PoC 代码>", "expected_evidence_markers": ["<漏洞存在时输出中必然出现的字符串>"], "success_exit_code": 0}"""
+
+# 退出码和预期证据都匹配时直接判定，不再调用 LLM 分析
+_MARKER_MATCH_CONFIDENCE = 0.85
+
+# 每个 PoC 在新建的临时目录中执行（$0 为超时秒数，$1 为代码）
+_POC_EXEC_SCRIPT = 'cd "$(mktemp -d /tmp/poc.XXXXXX)" && exec timeout "$0" python -c "$1"'
+
+# PoC 结束后清理容器：杀掉遗留的子进程（不含 PID 1 和自身），删除临时文件
+_POC_RESET_SCRIPT = "kill -9 -1 2>/dev/null; rm -rf /tmp/* /tmp/.[!.]*"
+
+
+def _remove_container(container: Any) -> None:
+    """移除容器，失败时只记录日志（阻塞）"""
+    try:
+        container.remove(force=True)
+    except Exception as e:
+        logger.debug(f"移除沙箱容器失败: {e}")
+
+
+def _reset_container(container: Any) -> bool:
+    """清理 PoC 遗留的进程和临时文件，成功时返回 True（阻塞）"""
+    try:
+        exit_code, _ = container.exec_run(["sh", "-c", _POC_RESET_SCRIPT])
+    except Exception as e:
+        logger.debug(f"清理沙箱容器失败: {e}")
+        return False
+    return exit_code == 0
+
+
+class SandboxContainerPool:
+    """
+    进程内共享的沙箱容器池（按镜像区分）
+
+    编排器每次调度都会创建新的 VerificationAgent，容器池放在模块级，
+    由所有实例共享，服务关闭时统一移除。空闲容器超过上限或池已关闭时，
+    归还的容器直接移除，保证不会遗留常驻容器。
+
+    同一容器会先后执行多个 PoC。为避免前一个 PoC 的遗留状态影响后一个漏洞的
+    执行结果和证据，每个 PoC 在新的临时目录中执行，结束后杀掉遗留进程并清理
+    临时文件；非零退出（包括超时）或清理失败的容器不再复用。
+    """
+
+    def __init__(self):
+        self._idle: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+        # close() 时递增；取出时的代数与当前不一致的容器归还时直接移除
+        self._generation = 0
+
+    def acquire(self, image: str) -> Tuple[Optional[Any], int]:
+        """取出空闲容器，没有时返回 (None, 代数)，由调用方创建新容器"""
+        with self._lock:
+            idle = self._idle.get(image)
+            return (idle.pop() if idle else None), self._generation
+
+    def release(self, image: str, container: Any, generation: int, max_idle: int) -> bool:
+        """归还容器；池已关闭或空闲容器已满时返回 False，由调用方移除"""
+        with self._lock:
+            if generation != self._generation:
+                return False
+            idle = self._idle.setdefault(image, [])
+            if len(idle) >= max_idle:
+                return False
+            idle.append(container)
+            return True
+
+    async def close(self) -> None:
+        """移除全部空闲容器；正在执行的容器归还时移除"""
+        with self._lock:
+            self._generation += 1
+            containers = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+
+        for container in containers:
+            await asyncio.to_thread(_remove_container, container)
+
+
+# 全局容器池
+_sandbox_pool: Optional[SandboxContainerPool] = None
+
+
+def get_sandbox_pool() -> SandboxContainerPool:
+    """获取全局沙箱容器池"""
+    global _sandbox_pool
+    if _sandbox_pool is None:
+        _sandbox_pool = SandboxContainerPool()
+    return _sandbox_pool
+
+
 class VerificationAgent(BaseAgent):
     """
     LLM 驱动的 Verification Agent
@@ -50,6 +147,9 @@ class VerificationAgent(BaseAgent):
             except Exception as e:
                 logger.warning(f"Docker 客户端初始化失败: {e}")
 
+        # 全局容器池中每个镜像最多保留的空闲容器数
+        self._pool_size = max(1, self.config.get("sandbox_pool_size", 4))
+
     @property
     def llm(self):  # type: ignore
         """延迟初始化 LLM 服务"""
@@ -93,12 +193,14 @@ class VerificationAgent(BaseAgent):
         # 接收任务交接（如果有）
         handoff = context.get("task_handoff")
         if handoff:
-            self.think(f"收到上游任务交接: {handoff.get('from_agent')}")
+            # 同一审计内传递的是 TaskHandoff 对象，只有跨进程时才会是字典
+            if not isinstance(handoff, TaskHandoff):
+                handoff = TaskHandoff.from_dict(handoff)
+            self.think(f"收到上游任务交接: {handoff.from_agent}")
 
         self.think(f"开始验证 {len(findings)} 个漏洞")
 
-        verified = []
-
+        to_verify = []
         for finding in findings:
             # 跳过信息级别的漏洞，但保留低危（为了更全面的覆盖）
             severity = finding.get("severity", "info").lower()
@@ -112,12 +214,34 @@ class VerificationAgent(BaseAgent):
             #     self.think(f"跳过低置信度 ({confidence}) 的发现: {finding.get('title')}")
             #     continue
 
-            result = await self._verify_finding(finding)
+            to_verify.append(finding)
+
+        # LLM 调用和沙箱执行以等待为主，多个漏洞并发验证，信号量限制同时占用的 LLM/Docker 数量
+        semaphore = asyncio.Semaphore(max(1, self.config.get("max_concurrent_verifications", 4)))
+
+        async def verify(finding: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._verify_finding(finding)
+
+        results = await asyncio.gather(*(verify(f) for f in to_verify), return_exceptions=True)
+
+        verified = []
+        for finding, result in zip(to_verify, results):
+            if isinstance(result, BaseException):
+                # 单个漏洞验证出错不影响其他漏洞，记为未验证
+                logger.warning(f"验证漏洞失败 {finding.get('title', 'Unknown')}: {result}")
+                result = {
+                    "finding_id": finding.get("id"),
+                    "verified": False,
+                    "confidence": 0.0,
+                    "poc_output": "",
+                    "error": str(result),
+                }
             verified.append(result)
 
         # 统计结果
-        total_verified = len([v for v in verified if v["verified"]])
-        total_false_positives = len([v for v in verified if not v["verified"]])
+        total_verified = sum(1 for v in verified if v["verified"])
+        total_false_positives = len(verified) - total_verified
 
         self.think(f"验证完成，{total_verified} 个确认为真实漏洞，{total_false_positives} 个误报")
 
@@ -140,8 +264,9 @@ class VerificationAgent(BaseAgent):
         vuln_type = finding.get("vulnerability_type", finding.get("type", "unknown"))
         self.think(f"验证漏洞: {vuln_type} - {finding.get('title', 'Unknown')}")
 
-        # 1. 生成 PoC 代码
-        poc_code = await self._generate_poc(finding)
+        # 1. 一次 LLM 调用生成 PoC 代码和验证计划
+        plan = await self._generate_poc_and_analysis_plan(finding)
+        poc_code = plan["poc"]
 
         if not poc_code:
             self.think(f"PoC 生成失败，标记为未验证")
@@ -159,12 +284,14 @@ class VerificationAgent(BaseAgent):
             environment=self._build_sandbox_env(finding),
         )
 
-        # 3. 使用 LLM 分析执行结果
-        analysis = await self._analyze_execution_with_llm(
-            execution_result=execution_result,
-            finding=finding,
-            poc_code=poc_code,
-        )
+        # 3. 预期证据出现时直接判定，结果不明确时才使用 LLM 分析执行结果
+        analysis = self._match_expected_evidence(execution_result, plan)
+        if analysis is None:
+            analysis = await self._analyze_execution_with_llm(
+                execution_result=execution_result,
+                finding=finding,
+                poc_code=poc_code,
+            )
 
         self.think(f"验证结果: {'确认存在漏洞' if analysis['verified'] else '无法确认'} (置信度: {analysis['confidence']:.2f})")
 
@@ -178,15 +305,15 @@ class VerificationAgent(BaseAgent):
             "analysis_reasoning": analysis.get("reasoning", ""),
         }
 
-    async def _generate_poc(self, finding: Dict[str, Any]) -> str:
+    async def _generate_poc_and_analysis_plan(self, finding: Dict[str, Any]) -> Dict[str, Any]:
         """
-        使用 LLM 生成 PoC 代码
+        使用 LLM 生成 PoC 代码和验证计划
 
         Args:
             finding: 漏洞信息
 
         Returns:
-            PoC 代码字符串
+            验证计划: poc（PoC 代码，失败时为空）、expected_evidence_markers、success_exit_code
         """
         self.think("正在使用 LLM 生成 PoC 代码...")
 
@@ -196,16 +323,70 @@ class VerificationAgent(BaseAgent):
         try:
             response = await self.llm.generate(
                 messages=[
-                    {"role": "system", "content": verification_prompt},
+                    {"role": "system", "content": verification_prompt + _POC_PLAN_INSTRUCTIONS},
                     {"role": "user", "content": f"请为以下漏洞生成 PoC 代码：\n\n{finding.get('description', '')}"},
                 ],
                 max_tokens=2048,
                 temperature=0.3,  # 降低温度以获得更稳定的代码
             )
-            return self._extract_code_from_response(response.content)
+            return self._parse_poc_plan(response.content)
         except Exception as e:
             self.think(f"LLM PoC 生成失败: {e}")
-            return ""
+            return {"poc": "", "expected_evidence_markers": [], "success_exit_code": 0}
+
+    def _parse_poc_plan(self, content: str) -> Dict[str, Any]:
+        """解析验证计划；模型未按 JSON 返回时把响应当作 PoC 代码，不提供预期证据"""
+        plan = None
+        start, end = content.find("{"), content.rfind("}")
+        if start != -1 and end > start:
+            try:
+                plan = json.loads(content[start:end + 1])
+            except json.JSONDecodeError:
+                plan = None
+
+        if not isinstance(plan, dict) or not isinstance(plan.get("poc"), str):
+            return {
+                "poc": self._extract_code_from_response(content),
+                "expected_evidence_markers": [],
+                "success_exit_code": 0,
+            }
+
+        markers = plan.get("expected_evidence_markers")
+        exit_code = plan.get("success_exit_code", 0)
+        return {
+            "poc": self._extract_code_from_response(plan["poc"]),
+            "expected_evidence_markers": [m for m in markers if isinstance(m, str) and m]
+            if isinstance(markers, list) else [],
+            "success_exit_code": exit_code if isinstance(exit_code, int) else 0,
+        }
+
+    def _match_expected_evidence(
+        self,
+        execution_result: Dict[str, Any],
+        plan: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        按验证计划中的预期证据判定执行结果
+
+        退出码与预期一致且输出包含预期证据时确认漏洞；其他情况结果不明确，返回 None。
+        PoC 源码中直接出现的标记可能只是被打印出来，不作为证据
+        """
+        poc_code = plan.get("poc", "")
+        markers = [marker for marker in plan.get("expected_evidence_markers") or [] if marker not in poc_code]
+        if not markers or execution_result.get("exit_code", -1) != plan.get("success_exit_code", 0):
+            return None
+
+        output = execution_result.get("output", "")
+        matched = [marker for marker in markers if marker in output]
+        if not matched:
+            return None
+
+        return {
+            "verified": True,
+            "confidence": _MARKER_MATCH_CONFIDENCE,
+            "reasoning": f"输出包含预期证据: {', '.join(matched)}",
+            "evidence": output[:500],
+        }
 
     async def _analyze_execution_with_llm(
         self,
@@ -329,32 +510,53 @@ class VerificationAgent(BaseAgent):
 
         self.think(f"在 Docker 沙箱中执行代码（镜像: {sandbox_image}）")
 
-        try:
-            # 创建容器
-            container = self._docker_client.containers.run(
-                image=sandbox_image,
-                command=f"python -c {self._quote_string(code)}",
-                network_mode="none",  # 隔离网络
-                mem_limit="512m",
-                cpu_quota=50000,
-                detach=True,
-            )
-
+        pool = get_sandbox_pool()
+        container, generation = pool.acquire(sandbox_image)
+        if container is None:
             try:
-                # 等待执行完成（最多 30 秒）
-                result = container.wait(timeout=30)
-                output = container.logs(stdout=True, stderr=True).decode('utf-8')
-
-                return {
-                    "exit_code": result['StatusCode'],
-                    "output": output,
-                }
-            finally:
-                container.remove(force=True)
+                container = await asyncio.to_thread(self._create_pool_container, sandbox_image)
+            except Exception as e:
+                self.think(f"沙箱执行失败: {e}")
+                return {"output": str(e), "exit_code": -1}
 
+        healthy = False
+        try:
+            # Docker SDK 是阻塞调用，放到线程中执行，并发验证时不阻塞事件循环
+            result = await asyncio.to_thread(
+                self._exec_in_container, container, code, environment.get("timeout", 30)
+            )
+            # 非零退出（包括超时）的 PoC 可能留下难以清理的状态，容器不再复用
+            healthy = result["exit_code"] == 0 and await asyncio.to_thread(_reset_container, container)
+            return result
         except Exception as e:
+            # exec 失败说明容器可能已损坏，移除后由下次执行重新创建
             self.think(f"沙箱执行失败: {e}")
             return {"output": str(e), "exit_code": -1}
+        finally:
+            if not (healthy and pool.release(sandbox_image, container, generation, self._pool_size)):
+                await asyncio.to_thread(_remove_container, container)
+
+    def _create_pool_container(self, sandbox_image: str) -> Any:
+        """创建常驻的沙箱容器（阻塞）"""
+        return self._docker_client.containers.run(
+            image=sandbox_image,
+            command=["sleep", "infinity"],
+            network_mode="none",  # 隔离网络
+            mem_limit="512m",
+            cpu_quota=50000,
+            detach=True,
+        )
+
+    def _exec_in_container(self, container: Any, code: str, timeout: int) -> Dict[str, Any]:
+        """在常驻容器的临时目录中执行代码并等待结果（阻塞，超时由容器内的 timeout 命令终止）"""
+        exit_code, output = container.exec_run(
+            ["sh", "-c", _POC_EXEC_SCRIPT, str(timeout), code],
+            demux=False,
+        )
+        return {
+            "exit_code": exit_code,
+            "output": output.decode("utf-8", errors="replace") if output else "",
+        }
 
     def _build_sandbox_env(self, finding: Dict[str, Any]) -> Dict[str, Any]:
         """构建沙箱环境配置"""
@@ -405,10 +607,6 @@ class VerificationAgent(BaseAgent):
                     return '\n'.join(lines).strip()
         return response.strip()
 
-    def _quote_string(self, s: str) -> str:
-        """引用字符串用于 shell"""
-        return f'"{s.replace('"', '\\"')}"'
-
 
 # 创建全局实例
 verification_agent = VerificationAgent()
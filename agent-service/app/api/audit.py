@@ -12,6 +12,7 @@ import uuid
 import asyncio
 import json
 import sqlite3
+from collections import Counter
 from loguru import logger
 
 from app.agents.orchestrator import OrchestratorAgent
@@ -553,6 +554,25 @@ async def cancel_audit(audit_id: str):
     return {"success": True, "message": "审计已终止"}
 
 
+@router.post("/projects/{project_id}/invalidate-cache")
+async def invalidate_project_cache(project_id: str):
+    """
+    清除项目的跨审计缓存（侦察结果、只读工具结果）
+
+    项目代码在原路径上更新后调用，下一次审计重新侦察和执行工具
+
+    Args:
+        project_id: 项目 ID
+
+    Returns:
+        操作结果
+    """
+    from app.agents.recon import invalidate_project_caches
+
+    removed = invalidate_project_caches(project_id)
+    return {"success": True, "removed": removed}
+
+
 @router.get("/{audit_id}/report")
 async def export_audit_report(
     audit_id: str,
@@ -777,22 +797,14 @@ async def _execute_audit(
         )
 
 
-def _group_by_severity(findings: list) -> dict:
-    """按严重程度分组统计"""
-    grouped = {
-        "critical": 0,
-        "high": 0,
-        "medium": 0,
-        "low": 0,
-        "info": 0,
-    }
+# 统计中固定展示的严重程度
+_SEVERITY_GROUPS = ("critical", "high", "medium", "low", "info")
 
-    for finding in findings:
-        severity = finding.get("severity", "info").lower()
-        if severity in grouped:
-            grouped[severity] += 1
 
-    return grouped
+def _group_by_severity(findings: list) -> dict:
+    """按严重程度分组统计"""
+    counts = Counter(finding.get("severity", "info").lower() for finding in findings)
+    return {severity: counts[severity] for severity in _SEVERITY_GROUPS}
 
 
 @router.get("/monitoring/metrics")
@@ -11,7 +11,10 @@
 
 参考 DeepAudit-3.0.0 实现
 """
+import multiprocessing
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Dict, List, Optional, Set, Tuple
@@ -457,6 +460,15 @@ class TaintAnalyzer:
         return recommendations.get(sink_category, "验证并净化所有用户输入")
 
 
+# 文件数超过该值时按进程并行分析（污点分析是纯 Python 正则匹配，受 GIL 限制）
+_PARALLEL_ANALYSIS_MIN_FILES = 64
+
+
+def _analyze_file_in_worker(file_path: str) -> List[Vulnerability]:
+    """进程池中分析单个文件（使用子进程自己的全局分析器）"""
+    return get_dataflow_analyzer()._analyze_path(file_path)
+
+
 class DataFlowAnalyzer:
     """
     数据流分析器
@@ -471,6 +483,7 @@ class DataFlowAnalyzer:
         self,
         project_path: str,
         file_patterns: Optional[List[str]] = None,
+        file_list: Optional[List[str]] = None,
     ) -> List[Vulnerability]:
         """
         分析整个项目
@@ -478,47 +491,74 @@ class DataFlowAnalyzer:
         Args:
             project_path: 项目路径
             file_patterns: 文件匹配模式列表
+            file_list: 调用方已发现的待分析文件（提供时不再遍历项目目录）
 
         Returns:
             所有漏洞列表
         """
-        project_dir = Path(project_path)
-        vulnerabilities = []
+        if file_list is not None:
+            files = list(file_list)
+        else:
+            project_dir = Path(project_path)
 
-        # 默认分析 Python 文件
-        if file_patterns is None:
-            file_patterns = ["*.py"]
+            # 默认分析 Python 文件
+            if file_patterns is None:
+                file_patterns = ["*.py"]
 
-        # 查找所有匹配的文件
-        files = []
-        for pattern in file_patterns:
-            files.extend(project_dir.rglob(pattern))
+            # 查找所有匹配的文件
+            files = []
+            for pattern in file_patterns:
+                files.extend(str(path) for path in project_dir.rglob(pattern))
 
         logger.info(f"数据流分析: 找到 {len(files)} 个文件")
 
-        # 分析每个文件
-        for file_path in files:
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+        vulnerabilities = None
+        if len(files) >= _PARALLEL_ANALYSIS_MIN_FILES:
+            vulnerabilities = self._analyze_in_processes(files)
+        if vulnerabilities is None:
+            vulnerabilities = []
+            for file_path in files:
+                vulnerabilities.extend(self._analyze_path(file_path))
 
-                file_vulns = self.taint_analyzer.analyze_file(
-                    str(file_path),
-                    content
-                )
+        logger.info(f"数据流分析完成: 发现 {len(vulnerabilities)} 个潜在漏洞")
+        return vulnerabilities
 
-                # 添加文件路径到路径信息
-                for vuln in file_vulns:
-                    vuln.path.source_location = (str(file_path), vuln.path.source_location[1])
-                    vuln.path.sink_location = (str(file_path), vuln.path.sink_location[1])
+    def _analyze_in_processes(self, files: List[str]) -> Optional[List[Vulnerability]]:
+        """按进程池并行分析文件，进程池不可用时返回 None（由调用方顺序分析）"""
+        # spawn 启动子进程，避免在多线程的服务进程中 fork
+        max_workers = os.cpu_count() or 1
+        chunksize = max(1, len(files) // (max_workers * 4))
+        vulnerabilities: List[Vulnerability] = []
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                for file_vulns in executor.map(_analyze_file_in_worker, files, chunksize=chunksize):
+                    vulnerabilities.extend(file_vulns)
+        except Exception as e:
+            logger.warning(f"并行数据流分析失败，改为顺序分析: {e}")
+            return None
+        return vulnerabilities
 
-                vulnerabilities.extend(file_vulns)
+    def _analyze_path(self, file_path: str) -> List[Vulnerability]:
+        """读取并分析单个文件，失败时返回空列表"""
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
 
-            except Exception as e:
-                logger.warning(f"分析文件 {file_path} 失败: {e}")
+            file_vulns = self.taint_analyzer.analyze_file(file_path, content)
 
-        logger.info(f"数据流分析完成: 发现 {len(vulnerabilities)} 个潜在漏洞")
-        return vulnerabilities
+            # 添加文件路径到路径信息
+            for vuln in file_vulns:
+                vuln.path.source_location = (file_path, vuln.path.source_location[1])
+                vuln.path.sink_location = (file_path, vuln.path.sink_location[1])
+
+            return file_vulns
+
+        except Exception as e:
+            logger.warning(f"分析文件 {file_path} 失败: {e}")
+            return []
 
     def analyze_code(self, code: str, file_path: str = "<unknown>") -> List[Vulnerability]:
         """
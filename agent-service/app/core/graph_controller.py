@@ -7,6 +7,7 @@ from typing import Dict, Any, Optional, List
 from loguru import logger
 import uuid
 import asyncio
+from collections import Counter
 
 from app.core.agent_registry import agent_registry, AgentRegistry
 from app.core.message import MessageBus, MessageType, MessagePriority, AgentMessage
@@ -291,14 +292,11 @@ class AgentGraphController:
 
         # 按类型分组
         all_agents = await self.registry.get_all_agents()
-        by_type = {}
-        for agent in all_agents:
-            agent_type = agent["agent_type"]
-            by_type[agent_type] = by_type.get(agent_type, 0) + 1
+        by_type = Counter(agent["agent_type"] for agent in all_agents)
 
         return {
             **stats,
-            "by_type": by_type,
+            "by_type": dict(by_type),
         }
 
     def _get_agent_class(self, agent_type: str) -> type:
@@ -251,6 +251,13 @@ class ToolRegistry:
 
     def __init__(self):
         self._tools: Dict[str, Type[MCPTool]] = {}
+        # 工具集版本号，注册变更时递增，供下游缓存失效判断
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """工具集版本号"""
+        return self._version
 
     def register(self, tool_class: Type[MCPTool]) -> None:
         """注册工具"""
@@ -258,6 +265,7 @@ class ToolRegistry:
             raise ValueError(f"工具类 {tool_class.__name__} 缺少 name 属性")
 
         self._tools[tool_class.name] = tool_class
+        self._version += 1
 
     def get(self, name: str) -> Optional[Type[MCPTool]]:
         """获取工具类"""
@@ -13,6 +13,10 @@ from loguru import logger
 from app.core.agent_state import AgentState, AgentStatus
 
 
+# 每轮迭代的思考事件消息模板
+_THINKING_MESSAGE_TMPL = "[迭代 {}/{}] LLM正在思考..."
+
+
 @dataclass
 class AgentStep:
     """执行步骤"""
@@ -136,10 +140,12 @@ class ReActLoop:
 
     async def _execute_iteration(self, iteration: int) -> AgentStep:
         """执行单次迭代"""
-        await self._emit_event(
-            "thinking",
-            f"[迭代 {iteration}/{self.config.max_iterations}] LLM正在思考..."
-        )
+        # 没有事件发射器时跳过消息格式化
+        if self.event_emitter:
+            await self._emit_event(
+                "thinking",
+                _THINKING_MESSAGE_TMPL.format(iteration, self.config.max_iterations)
+            )
 
         # 1. Thought: LLM思考
         llm_response, tokens = await self._call_llm()
@@ -47,13 +47,16 @@ class ReActParser:
     ACTION_INPUT_PATTERN = r'Action Input:\s*(.*?)(?=Thought:|Action:|Observation:|Final Answer:|$)'
     FINAL_ANSWER_PATTERN = r'Final Answer:\s*(.*?)$'
 
-    def __init__(self):
-        """初始化解析器"""
-        # 预编译正则表达式以提高性能
-        self.thought_re = re.compile(self.THOUGHT_PATTERN, re.DOTALL | re.MULTILINE)
-        self.action_re = re.compile(self.ACTION_PATTERN, re.MULTILINE)
-        self.action_input_re = re.compile(self.ACTION_INPUT_PATTERN, re.DOTALL | re.MULTILINE)
-        self.final_answer_re = re.compile(self.FINAL_ANSWER_PATTERN, re.DOTALL | re.MULTILINE)
+    # 预编译正则表达式（类级别，每个进程只编译一次，所有实例共享）
+    thought_re = re.compile(THOUGHT_PATTERN, re.DOTALL | re.MULTILINE)
+    action_re = re.compile(ACTION_PATTERN, re.MULTILINE)
+    action_input_re = re.compile(ACTION_INPUT_PATTERN, re.DOTALL | re.MULTILINE)
+    final_answer_re = re.compile(FINAL_ANSWER_PATTERN, re.DOTALL | re.MULTILINE)
+    # Markdown 加粗标签，例如 **Action:** -> Action:
+    markdown_label_re = re.compile(r'\*\*(Thought|Action Input|Action|Final Answer|Observation):\*\*')
+    # 代码块标记
+    code_fence_re = re.compile(r'```(?:json)?\s*')
+    thought_prefix_re = re.compile(r'^Thought:\s*')
 
     def parse(self, response: str) -> ReActStep:
         """
@@ -84,8 +87,7 @@ class ReActParser:
             step.is_final = True
             answer_text = final_match.group(1).strip()
             # 移除代码块标记
-            answer_text = re.sub(r'```json\s*', '', answer_text)
-            answer_text = re.sub(r'```\s*', '', answer_text)
+            answer_text = self.code_fence_re.sub('', answer_text)
             # 尝试解析 JSON
             try:
                 step.final_answer = json.loads(answer_text)
@@ -99,7 +101,7 @@ class ReActParser:
             if not step.thought or len(step.thought) < 10:
                 before_final = cleaned[:cleaned.find('Final Answer:')].strip()
                 if before_final:
-                    before_final = re.sub(r'^Thought:\s*', '', before_final)
+                    before_final = self.thought_prefix_re.sub('', before_final)
                     step.thought = before_final[:500] if len(before_final) > 500 else before_final
 
             return step
@@ -114,7 +116,7 @@ class ReActParser:
                 action_pos = cleaned.find('Action:')
                 if action_pos > 0:
                     before_action = cleaned[:action_pos].strip()
-                    before_action = re.sub(r'^Thought:\s*', '', before_action)
+                    before_action = self.thought_prefix_re.sub('', before_action)
                     if before_action:
                         step.thought = before_action[:500] if len(before_action) > 500 else before_action
 
@@ -124,8 +126,7 @@ class ReActParser:
             if input_match:
                 input_text = input_match.group(1).strip()
                 # 移除代码块标记
-                input_text = re.sub(r'```json\s*', '', input_text)
-                input_text = re.sub(r'```\s*', '', input_text)
+                input_text = self.code_fence_re.sub('', input_text)
                 # 尝试解析 JSON
                 try:
                     step.action_input = json.loads(input_text)
@@ -150,16 +151,8 @@ class ReActParser:
         if not response:
             return ""
 
-        cleaned = response
-
-        # 移除 Markdown 加粗标记
-        cleaned = re.sub(r'\*\*Thought:\*\*', 'Thought:', cleaned)
-        cleaned = re.sub(r'\*\*Action:\*\*', 'Action:', cleaned)
-        cleaned = re.sub(r'\*\*Action Input:\*\*', 'Action Input:', cleaned)
-        cleaned = re.sub(r'\*\*Final Answer:\*\*', 'Final Answer:', cleaned)
-        cleaned = re.sub(r'\*\*Observation:\*\*', 'Observation:', cleaned)
-
-        return cleaned
+        # 移除 Markdown 加粗标记（单次扫描）
+        return self.markdown_label_re.sub(r'\1:', response)
 
     def extract_thought_only(self, response: str) -> str:
         """
@@ -84,12 +84,21 @@ class RateLimiter:
                 self._total_rejected += 1
                 return False
 
+            # 预留令牌（允许透支）：等待结束时令牌恰好补足，
+            # 后续请求按累计欠额计算各自的等待时间，每个请求只需 sleep 一次
+            self._tokens -= tokens
+
         # 等待令牌补充
         self._total_wait_time += wait_time
         await asyncio.sleep(wait_time)
+        return True
+
+    async def __aenter__(self) -> "RateLimiter":
+        await self.acquire()
+        return self
 
-        # 重新尝试获取
-        return await self.acquire(tokens, block=False)
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> bool:
+        return False
 
     def _refill(self) -> None:
         """补充令牌"""
@@ -138,7 +147,7 @@ class RateLimiter:
         self._refill()  # 确保获取最新状态
         return {
             "name": self.name,
-            "available_tokens": int(self._tokens),
+            "available_tokens": max(0, int(self._tokens)),
             "max_tokens": self.config.max_tokens,
             "tokens_per_second": self.config.tokens_per_second,
             "total_requests": self._total_requests,
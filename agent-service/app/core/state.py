@@ -3,8 +3,8 @@ Agent 工作流状态管理
 
 定义审计任务的状态结构和流转
 """
-from typing import TypedDict, List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field, asdict
 from enum import Enum
 
 
@@ -24,11 +24,12 @@ class AgentStatus(str, Enum):
     FAILED = "failed"
 
 
-class AuditState(TypedDict):
+@dataclass(slots=True)
+class AuditState:
     """
     审计工作流状态
 
-    这是 LangGraph 工作流的状态定义
+    使用 slots 数据类：字段固定，属性访问比字典查找更快，实例也更省内存
     """
     # 基本信息
     audit_id: str
@@ -36,21 +37,25 @@ class AuditState(TypedDict):
     audit_type: str
 
     # 状态
-    status: AuditStatus
-    current_stage: str
+    status: AuditStatus = AuditStatus.PENDING
+    current_stage: str = "initialization"
 
     # 各 Agent 的结果
-    recon_result: Optional[Dict[str, Any]]
-    scan_results: List[Dict[str, Any]]
-    analysis_results: List[Dict[str, Any]]
-    verification_results: List[Dict[str, Any]]
+    recon_result: Optional[Dict[str, Any]] = None
+    scan_results: List[Dict[str, Any]] = field(default_factory=list)
+    analysis_results: List[Dict[str, Any]] = field(default_factory=list)
+    verification_results: List[Dict[str, Any]] = field(default_factory=list)
 
     # 最终报告
-    final_report: Optional[Dict[str, Any]]
+    final_report: Optional[Dict[str, Any]] = None
 
     # 错误处理
-    errors: List[str]
-    retry_count: int
+    errors: List[str] = field(default_factory=list)
+    retry_count: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（用于序列化）"""
+        return asdict(self)
 
 
 @dataclass
@@ -123,21 +128,12 @@ def create_initial_audit_state(
         audit_type: 审计类型
 
     Returns:
-        初始状态字典
+        初始状态
     """
     return AuditState(
         audit_id=audit_id,
         project_id=project_id,
         audit_type=audit_type,
-        status=AuditStatus.PENDING,
-        current_stage="initialization",
-        recon_result=None,
-        scan_results=[],
-        analysis_results=[],
-        verification_results=[],
-        final_report=None,
-        errors=[],
-        retry_count=0,
     )
 
 
@@ -155,25 +151,25 @@ def merge_agent_result(
     Returns:
         更新后的状态
     """
-    state["current_stage"] = agent_result.agent_name
+    state.current_stage = agent_result.agent_name
 
     if agent_result.status == "success":
         # 根据 Agent 类型存储结果
         if agent_result.agent_name == "recon":
-            state["recon_result"] = agent_result.result
+            state.recon_result = agent_result.result
         elif agent_result.agent_name == "scanner":
-            state["scan_results"] = agent_result.result.get("findings", [])
+            state.scan_results = agent_result.result.get("findings", [])
         elif agent_result.agent_name == "analysis":
-            state["analysis_results"] = agent_result.result.get("vulnerabilities", [])
+            state.analysis_results = agent_result.result.get("vulnerabilities", [])
         elif agent_result.agent_name == "verification":
-            state["verification_results"] = agent_result.result.get("verified", [])
+            state.verification_results = agent_result.result.get("verified", [])
 
-        state["status"] = AuditStatus.RUNNING
+        state.status = AuditStatus.RUNNING
     else:
-        state["errors"].append(agent_result.error or "Unknown error")
-        state["retry_count"] += 1
+        state.errors.append(agent_result.error or "Unknown error")
+        state.retry_count += 1
 
-        if state["retry_count"] >= 3:
-            state["status"] = AuditStatus.FAILED
+        if state.retry_count >= 3:
+            state.status = AuditStatus.FAILED
 
     return state
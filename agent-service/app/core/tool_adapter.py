@@ -3,7 +3,7 @@ MCP 工具适配器
 
 将 MCP 工具系统适配到现有的 agent 框架中
 """
-from typing import Dict, Any, Optional, Callable, List
+from typing import Dict, Any, Optional, Callable, List, Tuple
 from loguru import logger
 
 from app.core.mcp_tools import get_tool_registry, ToolResult
@@ -15,6 +15,16 @@ import app.core.tools
 registry = get_tool_registry()
 logger.info(f"[ToolAdapter] 已注册 {len(registry._tools)} 个 MCP 工具")
 
+# LLM 工具 schema 缓存: (注册表 id, 注册表版本号) -> 工具列表
+# schema 完全由已注册的工具类决定，每轮对话重复构建只会产生无用的分配
+_llm_tools_cache: Optional[Tuple[Tuple[int, int], List[Dict[str, Any]]]] = None
+
+# 所有工具通用的 force_refresh 参数，由 ToolCallLoop 消费，用于跳过结果缓存
+_FORCE_REFRESH_PARAM = {
+    "type": "boolean",
+    "description": "为 true 时忽略缓存的相同调用结果，强制重新执行",
+}
+
 
 class MCPToolAdapter:
     """
@@ -58,8 +68,13 @@ class MCPToolAdapter:
         获取LLM工具格式（OpenAI Function Calling兼容）
 
         Returns:
-            LLM工具列表
+            LLM工具列表（按注册表版本缓存，调用方不应修改）
         """
+        global _llm_tools_cache
+        cache_key = (id(self.registry), self.registry.version)
+        if _llm_tools_cache is not None and _llm_tools_cache[0] == cache_key:
+            return _llm_tools_cache[1]
+
         tools = []
         for tool_def in self.registry.list_tools():
             # 转换为 OpenAI Function Calling 格式
@@ -73,6 +88,7 @@ class MCPToolAdapter:
                     "parameters": self._convert_parameters_to_openai(tool_def)
                 }
             })
+        _llm_tools_cache = (cache_key, tools)
         return tools
 
     def _convert_parameters_to_openai(self, tool_def) -> Dict[str, Any]:
@@ -87,7 +103,8 @@ class MCPToolAdapter:
         """
         if tool_def.input_schema:
             # 如果有自定义的完整 schema，直接使用
-            return tool_def.input_schema
+            schema = tool_def.input_schema
+            return {**schema, "properties": {**schema.get("properties", {}), "force_refresh": _FORCE_REFRESH_PARAM}}
 
         # 从参数列表构建 OpenAI 格式
         properties = {}
@@ -116,6 +133,8 @@ class MCPToolAdapter:
             if param.required:
                 required.append(param.name)
 
+        properties["force_refresh"] = _FORCE_REFRESH_PARAM
+
         return {
             "type": "object",
             "properties": properties,
@@ -0,0 +1,119 @@
+"""
+跨审计工具结果缓存
+
+同一项目的多次审计经常以相同参数调用只读工具（读取文件、符号搜索、静态扫描等）。
+按 (项目, 工具名, 规范化参数) 缓存结果，在 TTL 内直接复用，
+避免重复执行耗时的扫描和查询。
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+
+# 只读工具：结果只取决于项目代码和参数，可在同一项目的不同审计间复用
+SHARED_CACHEABLE_TOOLS = frozenset({
+    "read_file",
+    "list_files",
+    "get_ast_context",
+    "get_code_structure",
+    "search_symbol",
+    "get_call_graph",
+    "get_knowledge_graph",
+    "search_similar_code",
+    "search_vulnerability_patterns",
+    "pattern_match",
+    "semgrep_scan",
+    "bandit_scan",
+    "gitleaks_scan",
+})
+
+
+class ToolResultCache:
+    """
+    工具结果缓存（LRU + TTL）
+
+    键为 (namespace, tool_key)，namespace 通常是 "project_id:项目指纹"
+    """
+
+    def __init__(self, ttl_seconds: float = 600.0, max_entries: int = 2048):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, tuple], Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, namespace: str, tool_key: tuple) -> Optional[Any]:
+        """获取缓存结果，过期或不存在时返回 None"""
+        key = (namespace, tool_key)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def set(self, namespace: str, tool_key: tuple, result: Any) -> None:
+        """写入缓存结果，超过容量时淘汰最久未使用的条目"""
+        key = (namespace, tool_key)
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """
+        使缓存失效
+
+        Args:
+            namespace: 仅清除该命名空间及其 "namespace:" 子命名空间（如项目代码更新后）；
+                为 None 时清空全部
+
+        Returns:
+            清除的条目数量
+        """
+        if namespace is None:
+            count = len(self._entries)
+            self._entries.clear()
+        else:
+            sub_prefix = f"{namespace}:"
+            keys = [
+                key for key in self._entries
+                if key[0] == namespace or key[0].startswith(sub_prefix)
+            ]
+            for key in keys:
+                del self._entries[key]
+            count = len(keys)
+
+        if count:
+            logger.info(f"[ToolResultCache] 清除 {count} 个缓存条目 (namespace={namespace})")
+        return count
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# 全局缓存实例
+_tool_result_cache: Optional[ToolResultCache] = None
+
+
+def get_tool_result_cache() -> ToolResultCache:
+    """获取全局工具结果缓存"""
+    global _tool_result_cache
+    if _tool_result_cache is None:
+        _tool_result_cache = ToolResultCache()
+    return _tool_result_cache
@@ -4,15 +4,26 @@ Tool Call Loop
 
 支持流式思考展示和显式 ReAct 格式
 """
-from typing import List, Dict, Any, Callable, Optional
+from typing import List, Dict, Any, Callable, Optional, Set
 import json
 import asyncio
+import orjson
 from loguru import logger
 from datetime import datetime
 
 from app.services.llm.service import LLMService
 from app.services.llm.adapters.base import LLMMessage
 from app.core.react_parser import extract_thought
+from app.core.tool_cache import SHARED_CACHEABLE_TOOLS, get_tool_result_cache
+
+# 有副作用或需要每次执行的工具，不缓存其结果
+DEFAULT_UNCACHEABLE_TOOLS = frozenset({"finish_analysis", "report_finding", "mark_false_positive"})
+
+# 错误结果前缀，错误不写入缓存
+_ERROR_PREFIXES = ("Error", "错误", "执行失败")
+
+# 流式思考开始事件的消息
+_THINKING_START_MESSAGE = "开始思考..."
 
 
 class ToolCallLoop:
@@ -36,6 +47,9 @@ class ToolCallLoop:
         event_callback: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
         enable_streaming: bool = True,
         react_format: bool = True,  # 新增：是否使用 ReAct 格式
+        parallel_tool_calls: bool = True,
+        uncacheable_tools: Optional[Set[str]] = None,
+        shared_cache_namespace: Optional[str] = None,
     ):
         self.llm = llm
         self.tools = tools
@@ -46,6 +60,13 @@ class ToolCallLoop:
         self.event_callback = event_callback
         self.enable_streaming = enable_streaming
         self.react_format = react_format
+        self.parallel_tool_calls = parallel_tool_calls
+
+        # 工具结果缓存: (工具名, 规范化参数) -> 结果，生命周期与本循环（一次审计任务）一致
+        self.uncacheable_tools = uncacheable_tools if uncacheable_tools is not None else DEFAULT_UNCACHEABLE_TOOLS
+        self._tool_cache: Dict[tuple, str] = {}
+        # 跨审计共享缓存的命名空间（通常为 project_id），为 None 时不使用共享缓存
+        self.shared_cache_namespace = shared_cache_namespace
 
         # 统计信息
         self.tool_call_count = 0
@@ -92,16 +113,10 @@ class ToolCallLoop:
                     # 发送思考开始事件（ReAct 格式）
                     if self.event_callback:
                         try:
-                            if self.react_format:
-                                await self.event_callback("thought_start", {
-                                    "message": "开始思考...",
-                                    "iteration": iteration
-                                })
-                            else:
-                                await self.event_callback("thinking_start", {
-                                    "message": "开始思考...",
-                                    "iteration": iteration
-                                })
+                            await self.event_callback(
+                                "thought_start" if self.react_format else "thinking_start",
+                                {"message": _THINKING_START_MESSAGE, "iteration": iteration},
+                            )
                         except Exception as e:
                             logger.warning(f"Failed to emit thinking_start event: {e}")
 
@@ -225,103 +240,15 @@ class ToolCallLoop:
                 logger.info("No tool calls, finishing loop")
                 break
 
-            # 5. 执行工具调用
-            for tool_call in tool_calls:
-                function_name = tool_call["function"]["name"]
-                arguments_str = tool_call["function"]["arguments"]
-                call_id = tool_call["id"]
-
-                try:
-                    arguments = json.loads(arguments_str)
-                    logger.info(f"Executing tool: {function_name} with args: {arguments}")
-                    self.tool_call_count += 1
-
-                    # 发送 Action 事件（ReAct 格式）
-                    if self.event_callback:
-                        try:
-                            if self.react_format:
-                                # ReAct 格式：发送 action 事件
-                                await self.event_callback("action", {
-                                    "action": function_name,
-                                    "action_input": arguments,
-                                    "iteration": iteration
-                                })
-                            else:
-                                await self.event_callback("tool_call", {
-                                    "tool_name": function_name,
-                                    "tool_input": arguments,
-                                    "message": f"调用工具: {function_name}"
-                                })
-                        except Exception as e:
-                            logger.warning(f"Failed to emit tool_call event: {e}")
-
-                    start_time = datetime.now()
-
-                    if function_name in self.tool_handlers:
-                        handler = self.tool_handlers[function_name]
-                        if asyncio.iscoroutinefunction(handler):
-                            result = await handler(**arguments)
-                        else:
-                            result = handler(**arguments)
-                            # 如果 handler 返回的是 coroutine（例如 lambda 返回 async 函数调用），则 await 它
-                            if asyncio.iscoroutine(result):
-                                result = await result
-
-                        # 序列化结果
-                        if not isinstance(result, str):
-                            result = json.dumps(result, ensure_ascii=False)
-                    else:
-                        result = f"Error: Tool '{function_name}' not found"
-
-                    duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
-
-                    # 发送 Observation 事件（ReAct 格式）
-                    if self.event_callback:
-                        try:
-                            # 截断过长的结果
-                            result_display = result[:2000] + "..." if len(result) > 2000 else result
-
-                            if self.react_format:
-                                # ReAct 格式：发送 observation 事件
-                                await self.event_callback("observation", {
-                                    "action": function_name,
-                                    "observation": result_display,
-                                    "duration_ms": duration_ms,
-                                    "iteration": iteration
-                                })
-                            else:
-                                await self.event_callback("tool_result", {
-                                    "tool_name": function_name,
-                                    "tool_output": result_display,
-                                    "tool_duration_ms": duration_ms,
-                                    "message": f"工具 {function_name} 执行完成"
-                                })
-                        except Exception as e:
-                            logger.warning(f"Failed to emit tool_result event: {e}")
-
-                except json.JSONDecodeError:
-                    result = f"Error: Invalid JSON arguments for {function_name}"
-                except Exception as e:
-                    logger.error(f"Tool execution failed: {e}")
-                    result = f"Error executing {function_name}: {str(e)}"
-                    # 发送错误事件
-                    if self.event_callback:
-                        try:
-                            if self.react_format:
-                                await self.event_callback("observation", {
-                                    "action": function_name,
-                                    "observation": f"错误: {str(e)}",
-                                    "error": True,
-                                    "iteration": iteration
-                                })
-                            else:
-                                await self.event_callback("error", {
-                                    "message": f"工具执行失败: {function_name}",
-                                    "error": str(e)
-                                })
-                        except Exception as e_emit:
-                            logger.warning(f"Failed to emit error event: {e_emit}")
+            # 5. 执行工具调用（同一轮的多个工具调用相互独立，并发执行；结果按原顺序写入历史）
+            if self.parallel_tool_calls and len(tool_calls) > 1:
+                results = await asyncio.gather(
+                    *(self._execute_tool_call(tool_call, iteration) for tool_call in tool_calls)
+                )
+            else:
+                results = [await self._execute_tool_call(tool_call, iteration) for tool_call in tool_calls]
 
+            for call_id, function_name, result in results:
                 # 6. 记录工具结果
                 self.history.append({
                     "role": "tool",
@@ -330,9 +257,11 @@ class ToolCallLoop:
                     "content": str(result)
                 })
 
-                # 检查是否是审计完成标记
+                # 检查是否是审计完成标记（先做子串判断，避免解析每个工具结果）
+                if "__audit_complete__" not in result:
+                    continue
                 try:
-                    result_obj = json.loads(result) if isinstance(result, str) else result
+                    result_obj = orjson.loads(result)
                     if isinstance(result_obj, dict) and result_obj.get("__audit_complete__"):
                         logger.info("Audit completion signal received, finishing loop")
                         final_response = result_obj.get("summary", "审计已完成")
@@ -343,10 +272,158 @@ class ToolCallLoop:
 
         return final_response
 
+    async def _execute_tool_call(self, tool_call: Dict[str, Any], iteration: int) -> tuple:
+        """
+        执行单个工具调用
+
+        Returns:
+            (call_id, function_name, result) 元组，异常已转换为错误字符串
+        """
+        function_name = tool_call["function"]["name"]
+        arguments_str = tool_call["function"]["arguments"]
+        call_id = tool_call["id"]
+
+        try:
+            # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，下方异常处理保持不变
+            arguments = orjson.loads(arguments_str)
+            logger.info(f"Executing tool: {function_name} with args: {arguments}")
+            self.tool_call_count += 1
+
+            # 发送 Action 事件（ReAct 格式）
+            if self.event_callback:
+                try:
+                    if self.react_format:
+                        # ReAct 格式：发送 action 事件
+                        await self.event_callback("action", {
+                            "action": function_name,
+                            "action_input": arguments,
+                            "iteration": iteration
+                        })
+                    else:
+                        await self.event_callback("tool_call", {
+                            "tool_name": function_name,
+                            "tool_input": arguments,
+                            "message": f"调用工具: {function_name}"
+                        })
+                except Exception as e:
+                    logger.warning(f"Failed to emit tool_call event: {e}")
+
+            start_time = datetime.now()
+
+            # 同一循环内相同参数的重复调用直接复用结果（force_refresh 可强制重新执行）
+            force_refresh = bool(arguments.pop("force_refresh", False))
+            cache_key = self._tool_cache_key(function_name, arguments)
+            cached = None if force_refresh or cache_key is None else self._get_cached_result(cache_key)
+
+            if cached is not None:
+                logger.info(f"Tool cache hit: {function_name}")
+                result = cached
+            elif function_name in self.tool_handlers:
+                handler = self.tool_handlers[function_name]
+                if asyncio.iscoroutinefunction(handler):
+                    result = await handler(**arguments)
+                else:
+                    result = handler(**arguments)
+                    # 如果 handler 返回的是 coroutine（例如 lambda 返回 async 函数调用），则 await 它
+                    if asyncio.iscoroutine(result):
+                        result = await result
+
+                # 序列化结果
+                if not isinstance(result, str):
+                    result = json.dumps(result, ensure_ascii=False)
+
+                if cache_key is not None and not result.startswith(_ERROR_PREFIXES):
+                    self._store_cached_result(cache_key, result)
+            else:
+                result = f"Error: Tool '{function_name}' not found"
+
+            duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+
+            # 发送 Observation 事件（ReAct 格式）
+            if self.event_callback:
+                try:
+                    # 截断过长的结果
+                    result_display = result[:2000] + "..." if len(result) > 2000 else result
+
+                    if self.react_format:
+                        # ReAct 格式：发送 observation 事件
+                        await self.event_callback("observation", {
+                            "action": function_name,
+                            "observation": result_display,
+                            "duration_ms": duration_ms,
+                            "iteration": iteration
+                        })
+                    else:
+                        await self.event_callback("tool_result", {
+                            "tool_name": function_name,
+                            "tool_output": result_display,
+                            "tool_duration_ms": duration_ms,
+                            "message": f"工具 {function_name} 执行完成"
+                        })
+                except Exception as e:
+                    logger.warning(f"Failed to emit tool_result event: {e}")
+
+        except json.JSONDecodeError:
+            result = f"Error: Invalid JSON arguments for {function_name}"
+        except Exception as e:
+            logger.error(f"Tool execution failed: {e}")
+            result = f"Error executing {function_name}: {str(e)}"
+            # 发送错误事件
+            if self.event_callback:
+                try:
+                    if self.react_format:
+                        await self.event_callback("observation", {
+                            "action": function_name,
+                            "observation": f"错误: {str(e)}",
+                            "error": True,
+                            "iteration": iteration
+                        })
+                    else:
+                        await self.event_callback("error", {
+                            "message": f"工具执行失败: {function_name}",
+                            "error": str(e)
+                        })
+                except Exception as e_emit:
+                    logger.warning(f"Failed to emit error event: {e_emit}")
+
+        return call_id, function_name, result
+
+    def _get_cached_result(self, cache_key: tuple) -> Optional[str]:
+        """先查本循环缓存，再查同项目的跨审计共享缓存"""
+        cached = self._tool_cache.get(cache_key)
+        if cached is None and self._uses_shared_cache(cache_key):
+            cached = get_tool_result_cache().get(self.shared_cache_namespace, cache_key)
+            if cached is not None:
+                self._tool_cache[cache_key] = cached
+        return cached
+
+    def _store_cached_result(self, cache_key: tuple, result: str) -> None:
+        """写入本循环缓存，只读工具同时写入共享缓存"""
+        self._tool_cache[cache_key] = result
+        if self._uses_shared_cache(cache_key):
+            get_tool_result_cache().set(self.shared_cache_namespace, cache_key, result)
+
+    def _uses_shared_cache(self, cache_key: tuple) -> bool:
+        return self.shared_cache_namespace is not None and cache_key[0] in SHARED_CACHEABLE_TOOLS
+
+    def _tool_cache_key(self, function_name: str, arguments: Dict[str, Any]) -> Optional[tuple]:
+        """计算工具结果缓存键，不可缓存的工具或参数返回 None"""
+        if function_name in self.uncacheable_tools:
+            return None
+        try:
+            return function_name, orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # orjson 不支持的参数（如非字符串键、超出 64 位的整数）退回标准库
+            pass
+        try:
+            return function_name, json.dumps(arguments, sort_keys=True, ensure_ascii=False).encode()
+        except (TypeError, ValueError):
+            return None
+
     def get_stats(self) -> Dict[str, Any]:
         """获取执行统计信息"""
         return {
             "tool_call_count": self.tool_call_count,
             "total_tokens_used": self.total_tokens_used,
-            "iterations": len([h for h in self.history if h["role"] == "assistant"]),
+            "iterations": sum(1 for h in self.history if h["role"] == "assistant"),
         }
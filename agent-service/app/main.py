@@ -3,6 +3,7 @@ CTX-Audit Agent Service 主应用入口
 
 Multi-Agent 代码审计系统的 FastAPI 服务
 """
+import sys
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -91,6 +92,14 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ 关闭事件总线失败: {e}")
 
+    # 移除验证 Agent 共享的沙箱容器池（只在模块已加载时）
+    verification_module = sys.modules.get("app.agents.verification")
+    if verification_module is not None:
+        try:
+            await verification_module.get_sandbox_pool().close()
+        except Exception as e:
+            logger.warning(f"⚠️ 清理沙箱容器失败: {e}")
+
     # 取消所有挂起的任务
     try:
         import asyncio
@@ -0,0 +1,107 @@
+"""
+Rust 后端批量请求封装
+
+将短时间窗口内并发发出的 list_files 请求合并为一次批量 RPC，减少往返次数
+"""
+import asyncio
+from typing import Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from app.services.rust_client import rust_client
+
+
+class ListFilesBatcher:
+    """
+    list_files 请求合并器
+
+    请求先进入缓冲区，达到 max_batch_size 或等待 window_seconds 后
+    通过 rust_client.list_files_batch 一次性发出；后端不支持批量接口时
+    退回为并发的单目录请求。
+    """
+
+    def __init__(self, window_seconds: float = 0.005, max_batch_size: int = 64):
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # 后端返回 404/405 后不再尝试批量接口
+        self._batch_supported = True
+
+    async def list_files(self, directory: str) -> List[str]:
+        """列出目录下的文件（与 rust_client.list_files 等价）"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # 同一批次内的相同目录只请求一次
+        self._pending.setdefault(directory, []).append(future)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(loop, immediate=True)
+        elif self._timer is None:
+            self._schedule_flush(loop, immediate=False)
+
+        return await future
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, immediate: bool) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if immediate:
+            loop.create_task(self._flush())
+        else:
+            self._timer = loop.call_later(self.window_seconds, lambda: loop.create_task(self._flush()))
+
+    async def _flush(self) -> None:
+        """发出缓冲区中的请求并分发结果"""
+        self._timer = None
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        directories = list(pending)
+        try:
+            results = await self._fetch(directories)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for directory, futures in pending.items():
+            files = results.get(directory, [])
+            for future in futures:
+                if not future.done():
+                    future.set_result(files)
+
+    async def _fetch(self, directories: List[str]) -> Dict[str, List[str]]:
+        if self._batch_supported and len(directories) > 1:
+            try:
+                return await rust_client.list_files_batch(directories)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in (404, 405):
+                    logger.info("Rust 后端不支持批量列出文件，退回单目录请求")
+                    self._batch_supported = False
+                else:
+                    logger.warning(f"批量列出文件失败，退回单目录请求: {e}")
+            except httpx.HTTPError as e:
+                logger.warning(f"批量列出文件失败，退回单目录请求: {e}")
+
+        listings = await asyncio.gather(*(rust_client.list_files(d) for d in directories))
+        return dict(zip(directories, listings))
+
+
+# 全局单例
+_list_files_batcher: Optional[ListFilesBatcher] = None
+
+
+def get_list_files_batcher() -> ListFilesBatcher:
+    """获取全局 list_files 合并器"""
+    global _list_files_batcher
+
+    if _list_files_batcher is None:
+        _list_files_batcher = ListFilesBatcher()
+
+    return _list_files_batcher
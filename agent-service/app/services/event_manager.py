@@ -8,7 +8,7 @@ Agent 事件管理器
 import asyncio
 import json
 import logging
-from typing import Optional, Dict, Any, List, Set
+from typing import Optional, Dict, Any, List, Set, Tuple
 from datetime import datetime, timezone
 from dataclasses import dataclass, field
 from loguru import logger
@@ -377,92 +377,148 @@ class EventManager:
             sequence: 序列号（0 表示自动分配）
             **event_data: 事件数据
         """
-        event_type = event_data.get("event_type", "")
-
-        # 检查是否需要节流
-        if self._should_throttle(task_id, event_type):
-            logger.debug(f"[EventManager] Throttled event {event_type} for {task_id}")
-            return  # 跳过此事件
-
         async with self._lock:
-            if task_id not in self._event_queues:
-                self.create_queue(task_id)
-
-            # 如果 sequence 为 0，自动分配下一个序列号
-            if sequence == 0:
-                self._sequences[task_id] += 1
-                sequence = self._sequences[task_id]
-            else:
-                # 更新序列号
-                if sequence > self._sequences[task_id]:
-                    self._sequences[task_id] = sequence
-
-            # 更新最后发送时间
-            self._last_emit_time[task_id][event_type] = time.time()
-
-            # 去重检查
-            event_id = event_data.get("id", str(uuid.uuid4()))
-            if event_id in self._dedup_cache.get(task_id, set()):
-                logger.debug(f"[EventManager] Duplicated event {event_id} for {task_id}")
+            prepared = self._prepare_event(task_id, sequence, event_data)
+            if prepared is None:
                 return
-
-            # 添加到队列
-            event = {
-                "id": event_id,
-                "task_id": task_id,
-                "sequence": sequence,
-                **event_data
-            }
-
-            # 清理无效 UTF-8 字符
-            try:
-                event = _sanitize_event_data(event)
-            except Exception as e:
-                logger.warning(f"[EventManager] 清理事件数据失败: {e}")
-
-            self._event_queues[task_id].append(event)
-            self._persistent_events[task_id].append(event)
-            self._dedup_cache[task_id].add(event_id)
+            event, persistence_event = prepared
 
             # 异步保存到数据库（不阻塞）
             try:
-                # 准备持久化数据
-                persistence_event = {
-                    "id": event.get("id"),
-                    "audit_id": task_id,  # task_id 在持久化层作为 audit_id
-                    "agent_type": event.get("agent_type", "unknown"),
-                    "event_type": event.get("event_type"),
-                    "sequence": sequence,
-                    "timestamp": event.get("timestamp", datetime.now(timezone.utc).isoformat()),
-                    "message": event.get("message"),
-                    "data": event,  # 存储完整事件数据
-                }
                 asyncio.create_task(self._persistence.save_event(persistence_event))
             except Exception as e:
                 logger.warning(f"[EventManager] 异步保存事件到数据库失败: {e}")
 
-            # 批处理逻辑
-            if event_type in BATCHABLE_EVENT_TYPES:
-                # 添加到批处理缓冲区
-                self._batch_buffers[task_id].append(event)
+            await self._dispatch_event(task_id, event)
+
+    async def add_events(self, task_id: str, events: List[Dict[str, Any]]) -> int:
+        """
+        批量添加事件（只获取一次锁，并以单个事务持久化）
+
+        Args:
+            task_id: 任务 ID
+            events: 事件数据列表，每项与 add_event 的关键字参数相同（可含 sequence）
+
+        Returns:
+            实际添加的事件数量（被节流或去重的事件不计入）
+        """
+        async with self._lock:
+            accepted = []
+            persistence_events = []
+            for event_data in events:
+                event_data = dict(event_data)
+                sequence = event_data.pop("sequence", 0)
+                prepared = self._prepare_event(task_id, sequence, event_data)
+                if prepared is not None:
+                    accepted.append(prepared[0])
+                    persistence_events.append(prepared[1])
+
+            if persistence_events:
+                try:
+                    asyncio.create_task(self._persistence.save_events_batch(persistence_events))
+                except Exception as e:
+                    logger.warning(f"[EventManager] 异步批量保存事件到数据库失败: {e}")
+
+            for event in accepted:
+                await self._dispatch_event(task_id, event)
+
+            return len(accepted)
+
+    def _prepare_event(
+        self,
+        task_id: str,
+        sequence: int,
+        event_data: Dict[str, Any],
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        节流、分配序列号、去重并写入内存队列（调用方需持有锁）
+
+        Returns:
+            (事件, 持久化事件) 元组；事件被节流或去重时返回 None
+        """
+        event_type = event_data.get("event_type", "")
+
+        # 检查是否需要节流
+        if self._should_throttle(task_id, event_type):
+            logger.debug(f"[EventManager] Throttled event {event_type} for {task_id}")
+            return None  # 跳过此事件
+
+        if task_id not in self._event_queues:
+            self.create_queue(task_id)
+
+        # 如果 sequence 为 0，自动分配下一个序列号
+        if sequence == 0:
+            self._sequences[task_id] += 1
+            sequence = self._sequences[task_id]
+        else:
+            # 更新序列号
+            if sequence > self._sequences[task_id]:
+                self._sequences[task_id] = sequence
+
+        # 更新最后发送时间
+        self._last_emit_time[task_id][event_type] = time.time()
+
+        # 去重检查
+        event_id = event_data.get("id", str(uuid.uuid4()))
+        if event_id in self._dedup_cache.get(task_id, set()):
+            logger.debug(f"[EventManager] Duplicated event {event_id} for {task_id}")
+            return None
+
+        # 添加到队列
+        event = {
+            "id": event_id,
+            "task_id": task_id,
+            "sequence": sequence,
+            **event_data
+        }
 
-                # 检查是否需要刷新批处理
-                buffer_size = len(self._batch_buffers[task_id])
-                if buffer_size >= BATCH_MAX_SIZE:
+        # 清理无效 UTF-8 字符
+        try:
+            event = _sanitize_event_data(event)
+        except Exception as e:
+            logger.warning(f"[EventManager] 清理事件数据失败: {e}")
+
+        self._event_queues[task_id].append(event)
+        self._persistent_events[task_id].append(event)
+        self._dedup_cache[task_id].add(event_id)
+
+        # 准备持久化数据
+        persistence_event = {
+            "id": event.get("id"),
+            "audit_id": task_id,  # task_id 在持久化层作为 audit_id
+            "agent_type": event.get("agent_type", "unknown"),
+            "event_type": event.get("event_type"),
+            "sequence": sequence,
+            "timestamp": event.get("timestamp", datetime.now(timezone.utc).isoformat()),
+            "message": event.get("message"),
+            "data": event,  # 存储完整事件数据
+        }
+        return event, persistence_event
+
+    async def _dispatch_event(self, task_id: str, event: Dict[str, Any]) -> None:
+        """按事件类型进入批处理缓冲区或直接推送给订阅者（调用方需持有锁）"""
+        # 批处理逻辑
+        if event.get("event_type", "") in BATCHABLE_EVENT_TYPES:
+            # 添加到批处理缓冲区
+            self._batch_buffers[task_id].append(event)
+
+            # 检查是否需要刷新批处理
+            buffer_size = len(self._batch_buffers[task_id])
+            if buffer_size >= BATCH_MAX_SIZE:
+                await self._flush_batch(task_id)
+            elif buffer_size == 1:
+                # 创建自动刷新任务
+                if task_id in self._batch_tasks:
+                    self._batch_tasks[task_id].cancel()
+
+                async def flush_after_delay():
+                    await asyncio.sleep(BATCH_MAX_WAIT_MS / 1000)
                     await self._flush_batch(task_id)
-                elif buffer_size == 1:
-                    # 创建自动刷新任务
-                    if task_id in self._batch_tasks:
-                        self._batch_tasks[task_id].cancel()
-
-                    async def flush_after_delay():
-                        await asyncio.sleep(BATCH_MAX_WAIT_MS / 1000)
-                        await self._flush_batch(task_id)
-
-                    self._batch_tasks[task_id] = asyncio.create_task(flush_after_delay())
-            else:
-                # 非批处理事件直接推送
-                await self._push_to_subscribers(task_id, event)
+
+                self._batch_tasks[task_id] = asyncio.create_task(flush_after_delay())
+        else:
+            # 非批处理事件直接推送
+            await self._push_to_subscribers(task_id, event)
 
     async def subscribe(self, task_id: str, after_sequence: int = 0) -> asyncio.Queue:
         """
@@ -18,10 +18,11 @@ import subprocess
 import re
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from loguru import logger
 import shutil
+import time
 
 
 @dataclass
@@ -56,6 +57,12 @@ class ToolInfo:
     priority: int = 0  # 优先级（0-10），越高优先级越高
 
 
+# 工具可用性探测结果: 工具名 -> (探测时间, 是否可用)
+# 与项目无关，所有项目的适配器共享，TTL 内不再启动 --version 子进程
+_TOOL_AVAILABILITY_TTL = 300.0
+_tool_availability: Dict[str, Tuple[float, bool]] = {}
+
+
 class ExternalToolAdapter:
     """
     外部工具适配器基类
@@ -65,7 +72,6 @@ class ExternalToolAdapter:
 
     def __init__(self, project_path: str):
         self.project_path = Path(project_path)
-        self._is_available: Optional[bool] = None
 
     @property
     def tool_info(self) -> ToolInfo:
@@ -73,9 +79,11 @@ class ExternalToolAdapter:
         raise NotImplementedError
 
     async def is_available(self) -> bool:
-        """检查工具是否可用"""
-        if self._is_available is not None:
-            return self._is_available
+        """检查工具是否可用（结果按工具名在进程内缓存）"""
+        name = self.tool_info.name
+        cached = _tool_availability.get(name)
+        if cached is not None and time.monotonic() - cached[0] <= _TOOL_AVAILABILITY_TTL:
+            return cached[1]
 
         try:
             process = await asyncio.create_subprocess_exec(
@@ -84,15 +92,16 @@ class ExternalToolAdapter:
                 stderr=asyncio.subprocess.PIPE,
             )
             await process.communicate()
-            self._is_available = process.returncode == 0
+            available = process.returncode == 0
         except FileNotFoundError:
-            self._is_available = False
+            available = False
         except Exception as e:
             # 工具未安装是正常情况，使用 debug 级别
-            logger.debug(f"检查工具 {self.tool_info.name} 可用性失败: {e}")
-            self._is_available = False
+            logger.debug(f"检查工具 {name} 可用性失败: {e}")
+            available = False
 
-        return self._is_available
+        _tool_availability[name] = (time.monotonic(), available)
+        return available
 
     async def run(self, **kwargs) -> ToolResult:
         """运行工具"""
@@ -720,12 +729,9 @@ class ExternalToolService:
         ]
 
     async def get_available_tools(self) -> List[ToolInfo]:
-        """获取所有可用的工具"""
-        available = []
-        for adapter in self._adapters:
-            if await adapter.is_available():
-                available.append(adapter.tool_info)
-        return available
+        """获取所有可用的工具（首次探测时各工具并发检查）"""
+        flags = await asyncio.gather(*(adapter.is_available() for adapter in self._adapters))
+        return [adapter.tool_info for adapter, available in zip(self._adapters, flags) if available]
 
     async def run_all_tools(self) -> List[ToolResult]:
         """运行所有可用工具"""
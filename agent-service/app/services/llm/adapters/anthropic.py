@@ -46,17 +46,7 @@ class AnthropicAdapter(BaseLLMAdapter):
         """生成文本"""
 
         # 分离系统消息
-        system_message = ""
-        user_messages = []
-
-        for msg in messages:
-            if msg.role == "system":
-                system_message = msg.content
-            else:
-                user_messages.append({
-                    "role": msg.role,
-                    "content": msg.content,
-                })
+        system_message, user_messages = self._split_messages(messages)
 
         # 构建请求参数
         request_params = {
@@ -89,6 +79,8 @@ class AnthropicAdapter(BaseLLMAdapter):
                     "prompt_tokens": response.usage.input_tokens,
                     "completion_tokens": response.usage.output_tokens,
                     "total_tokens": response.usage.input_tokens + response.usage.output_tokens,
+                    "cache_creation_input_tokens": getattr(response.usage, "cache_creation_input_tokens", None) or 0,
+                    "cache_read_input_tokens": getattr(response.usage, "cache_read_input_tokens", None) or 0,
                 },
                 tool_calls=tool_calls,
                 finish_reason=response.stop_reason,
@@ -108,17 +100,7 @@ class AnthropicAdapter(BaseLLMAdapter):
         """流式生成文本"""
 
         # 分离系统消息
-        system_message = ""
-        user_messages = []
-
-        for msg in messages:
-            if msg.role == "system":
-                system_message = msg.content
-            else:
-                user_messages.append({
-                    "role": msg.role,
-                    "content": msg.content,
-                })
+        system_message, user_messages = self._split_messages(messages)
 
         request_params = {
             "model": self.model,
@@ -159,17 +141,7 @@ class AnthropicAdapter(BaseLLMAdapter):
                 - is_complete: 是否完成
         """
         # 分离系统消息
-        system_message = ""
-        user_messages = []
-
-        for msg in messages:
-            if msg.role == "system":
-                system_message = msg.content
-            else:
-                user_messages.append({
-                    "role": msg.role,
-                    "content": msg.content,
-                })
+        system_message, user_messages = self._split_messages(messages)
 
         request_params = {
             "model": self.model,
@@ -236,6 +208,34 @@ class AnthropicAdapter(BaseLLMAdapter):
             logger.error(f"Anthropic 流式工具调用失败: {e}")
             raise
 
+    def _split_messages(self, messages: List[LLMMessage]) -> tuple:
+        """
+        分离系统消息与对话消息
+
+        带 cache_control 的消息转换为内容块形式，以便 Anthropic 缓存该位置之前的前缀
+        """
+        system_message: Any = ""
+        user_messages = []
+
+        for msg in messages:
+            if msg.role == "system":
+                if msg.cache_control:
+                    system_message = [{"type": "text", "text": msg.content, "cache_control": msg.cache_control}]
+                else:
+                    system_message = msg.content
+            elif msg.cache_control:
+                user_messages.append({
+                    "role": msg.role,
+                    "content": [{"type": "text", "text": msg.content, "cache_control": msg.cache_control}],
+                })
+            else:
+                user_messages.append({
+                    "role": msg.role,
+                    "content": msg.content,
+                })
+
+        return system_message, user_messages
+
     def _convert_tools(self, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """转换工具格式为 Anthropic 格式"""
         anthropic_tools = []
@@ -54,6 +54,8 @@ class LLMMessage:
     content: str
     tool_calls: Optional[List[Dict[str, Any]]] = None
     tool_call_id: Optional[str] = None
+    # 提示词缓存断点（Anthropic: {"type": "ephemeral"}），其他提供商忽略
+    cache_control: Optional[Dict[str, str]] = None
 
 
 class BaseLLMAdapter(ABC):
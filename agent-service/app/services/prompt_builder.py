@@ -9,6 +9,8 @@
 - 反幻觉规则
 - 多 Agent 协作规则
 """
+from collections import Counter
+from itertools import islice
 from typing import Dict, Any, List, Optional
 from loguru import logger
 
@@ -1094,10 +1096,7 @@ Action Input: {{
         ]
 
         # 按严重程度分组
-        severity_count = {}
-        for r in scan_results:
-            sev = r.get("severity", "info").lower()
-            severity_count[sev] = severity_count.get(sev, 0) + 1
+        severity_count = Counter(r.get("severity", "info").lower() for r in scan_results)
 
         if severity_count:
             lines.append("**严重程度分布**:")
@@ -1110,7 +1109,7 @@ Action Input: {{
             "**需要关注的问题**:",
         ])
 
-        for i, r in enumerate(scan_results[:10], 1):
+        for i, r in enumerate(islice(scan_results, 10), 1):
             title = r.get("title", "Untitled")
             sev = r.get("severity", "unknown")
             location = r.get("file_path") or r.get("location", "unknown")
@@ -6,6 +6,7 @@
 from pathlib import Path
 from typing import Dict, Any, Optional
 from loguru import logger
+import asyncio
 import yaml
 import re
 
@@ -29,6 +30,10 @@ class PromptLoader:
         """
         self.prompts_dir = Path(prompts_dir)
         self._cache: Dict[str, Dict[str, Any]] = {}
+        # 按 Agent 类型缓存解析后的 YAML（None 表示文件不存在）
+        self._file_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+        # 首次加载时串行化，避免并发审计重复读取和解析同一文件
+        self._load_lock = asyncio.Lock()
 
         # 确保目录存在
         if not self.prompts_dir.exists():
@@ -53,22 +58,26 @@ class PromptLoader:
         cache_key = f"{agent_type}:{template_name}"
 
         # 检查缓存
-        if cache_key in self._cache:
-            return self._cache[cache_key].get("content", "")
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached.get("content", "")
 
-        # 加载 YAML 文件
-        yaml_file = self.prompts_dir / f"{agent_type}.yaml"
-
-        if not yaml_file.exists():
-            logger.warning(f"提示词文件不存在: {yaml_file}")
-            return self._get_default_prompt(agent_type)
+        async with self._load_lock:
+            # 等锁期间可能已被其他协程加载
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached.get("content", "")
 
-        try:
-            with open(yaml_file, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
+            try:
+                data = self._load_yaml(agent_type)
+            except Exception as e:
+                logger.error(f"加载提示词失败 {agent_type}/{template_name}: {e}")
+                return self._get_default_prompt(agent_type)
 
-            # 提取指定模板
-            if template_name == "system_prompt":
+            if data is None:
+                # 文件不存在时缓存默认提示词，避免每次审计都访问文件系统
+                content = self._get_default_prompt(agent_type)
+            elif template_name == "system_prompt":
                 content = data.get("system_prompt", "")
             else:
                 prompts = data.get("prompts", {})
@@ -79,9 +88,27 @@ class PromptLoader:
 
             return content
 
-        except Exception as e:
-            logger.error(f"加载提示词失败 {agent_type}/{template_name}: {e}")
-            return self._get_default_prompt(agent_type)
+    def _load_yaml(self, agent_type: str) -> Optional[Dict[str, Any]]:
+        """
+        读取并解析 Agent 的 YAML 文件（同一文件只解析一次）
+
+        Returns:
+            解析后的数据，文件不存在时返回 None
+        """
+        if agent_type in self._file_cache:
+            return self._file_cache[agent_type]
+
+        yaml_file = self.prompts_dir / f"{agent_type}.yaml"
+
+        if not yaml_file.exists():
+            logger.warning(f"提示词文件不存在: {yaml_file}")
+            data = None
+        else:
+            with open(yaml_file, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+
+        self._file_cache[agent_type] = data
+        return data
 
     async def render_prompt(
         self,
@@ -161,6 +188,7 @@ class PromptLoader:
     def clear_cache(self) -> None:
         """清除缓存"""
         self._cache.clear()
+        self._file_cache.clear()
         logger.info("提示词缓存已清除")
 
     def reload_cache(self) -> None:
@@ -169,6 +197,7 @@ class PromptLoader:
             agent_type, template_name = cache_key.split(":")
             # 触发重新加载（下次访问时会重新读取）
             del self._cache[cache_key]
+        self._file_cache.clear()
         logger.info("提示词缓存已重置")
 
     def _get_default_prompt(self, agent_type: str) -> str:
@@ -262,6 +291,11 @@ async def load_system_prompt(agent_type: str) -> str:
     return await loader.get_system_prompt(agent_type)
 
 
+def reload_prompts() -> None:
+    """丢弃已缓存的提示词，下次访问时从文件重新加载（配置更新后调用）"""
+    get_prompt_loader().reload_cache()
+
+
 async def render_prompt(
     agent_type: str,
     template_name: str,
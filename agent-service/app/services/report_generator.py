@@ -3,6 +3,7 @@
 生成 Markdown 格式的漏洞报告
 """
 
+from collections import Counter
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -55,6 +56,11 @@ class ReportGenerator:
         }
         return emojis.get(severity.lower(), "⚪")
 
+    @staticmethod
+    def _count_severities(findings: List[Dict[str, Any]]) -> Counter:
+        """单次遍历统计各严重程度的数量"""
+        return Counter(f.get("severity", "").lower() for f in findings)
+
     @classmethod
     def _format_finding(cls, finding: Dict[str, Any], index: int) -> str:
         """格式化单个漏洞发现"""
@@ -127,10 +133,11 @@ class ReportGenerator:
         """
         # 统计信息
         total_findings = len(findings)
-        critical_count = sum(1 for f in findings if f.get("severity", "").lower() == "critical")
-        high_count = sum(1 for f in findings if f.get("severity", "").lower() == "high")
-        medium_count = sum(1 for f in findings if f.get("severity", "").lower() == "medium")
-        low_count = sum(1 for f in findings if f.get("severity", "").lower() == "low")
+        severity_counts = cls._count_severities(findings)
+        critical_count = severity_counts["critical"]
+        high_count = severity_counts["high"]
+        medium_count = severity_counts["medium"]
+        low_count = severity_counts["low"]
 
         # 计算安全评分 (100 - 严重程度权重)
         score = 100
@@ -247,10 +254,11 @@ class ReportGenerator:
         """
         # 统计信息
         total_findings = len(findings)
-        critical_count = sum(1 for f in findings if f.get("severity", "").lower() == "critical")
-        high_count = sum(1 for f in findings if f.get("severity", "").lower() == "high")
-        medium_count = sum(1 for f in findings if f.get("severity", "").lower() == "medium")
-        low_count = sum(1 for f in findings if f.get("severity", "").lower() == "low")
+        severity_counts = cls._count_severities(findings)
+        critical_count = severity_counts["critical"]
+        high_count = severity_counts["high"]
+        medium_count = severity_counts["medium"]
+        low_count = severity_counts["low"]
 
         # 计算安全评分
         score = 100
@@ -393,10 +401,11 @@ class ReportGenerator:
         """
         # 统计信息
         total_findings = len(findings)
-        critical_count = sum(1 for f in findings if f.get("severity", "").lower() == "critical")
-        high_count = sum(1 for f in findings if f.get("severity", "").lower() == "high")
-        medium_count = sum(1 for f in findings if f.get("severity", "").lower() == "medium")
-        low_count = sum(1 for f in findings if f.get("severity", "").lower() == "low")
+        severity_counts = cls._count_severities(findings)
+        critical_count = severity_counts["critical"]
+        high_count = severity_counts["high"]
+        medium_count = severity_counts["medium"]
+        low_count = severity_counts["low"]
 
         # 计算安全评分
         score = 100
@@ -91,6 +91,70 @@ class RustBackendClient:
             logger.error(f"列出文件失败: {e}")
             return []
 
+    async def list_files_batch(self, directories: List[str]) -> Dict[str, List[str]]:
+        """
+        批量列出多个目录下的文件（一次请求）
+
+        Args:
+            directories: 目录路径列表
+
+        Returns:
+            目录路径 -> 文件列表
+
+        Raises:
+            httpx.HTTPError: 请求失败（后端不支持批量接口时为 404/405）
+        """
+        client = await self._get_client()
+        response = await client.post("/api/files/list_batch", json={"directories": directories})
+        response.raise_for_status()
+        return response.json()
+
+    async def walk(
+        self,
+        root: str,
+        max_depth: Optional[int] = None,
+        ignore: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        一次请求遍历目录树
+
+        Args:
+            root: 根目录
+            max_depth: 最大遍历层数，None 表示遍历整棵树
+            ignore: 不进入的目录名
+
+        Returns:
+            条目列表，每项包含 path、name 和 is_dir（忽略目录不会出现）
+
+        Raises:
+            httpx.HTTPError: 请求失败（后端不支持该接口时为 404/405）
+        """
+        client = await self._get_client()
+        response = await client.post(
+            "/api/files/walk",
+            json={"root": root, "max_depth": max_depth, "ignore": ignore or []},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def read_files_batch(self, paths: List[str]) -> Dict[str, str]:
+        """
+        批量读取多个文件内容（一次请求）
+
+        Args:
+            paths: 文件路径列表
+
+        Returns:
+            文件路径 -> 文件内容（读取失败的文件不包含在内）
+
+        Raises:
+            httpx.HTTPError: 请求失败
+        """
+        client = await self._get_client()
+        response = await client.post("/api/files/read_batch", json={"paths": paths})
+        response.raise_for_status()
+        return response.json()
+
     async def read_file(self, path: str) -> str:
         """读取文件内容"""
         client = await self._get_client()
@@ -0,0 +1,84 @@
+"""
+ListFilesBatcher 单元测试
+"""
+import asyncio
+
+import httpx
+
+from app.services.batched_rust_client import ListFilesBatcher
+from app.services.rust_client import rust_client
+
+
+class TestListFilesBatcher:
+    """测试 list_files 请求合并"""
+
+    def test_concurrent_requests_coalesced(self, monkeypatch):
+        """并发请求合并为一次批量 RPC，重复目录只请求一次"""
+        batches = []
+
+        async def list_files_batch(directories):
+            batches.append(sorted(directories))
+            return {d: [f"{d}/a.py"] for d in directories}
+
+        monkeypatch.setattr(rust_client, "list_files_batch", list_files_batch)
+        batcher = ListFilesBatcher()
+
+        async def run():
+            return await asyncio.gather(
+                batcher.list_files("/x"),
+                batcher.list_files("/y"),
+                batcher.list_files("/x"),
+            )
+
+        assert asyncio.run(run()) == [["/x/a.py"], ["/y/a.py"], ["/x/a.py"]]
+        assert batches == [["/x", "/y"]]
+
+    def test_max_batch_size_flushes_early(self, monkeypatch):
+        """达到批量上限时立即发出"""
+        batches = []
+
+        async def list_files_batch(directories):
+            batches.append(len(directories))
+            return {d: [] for d in directories}
+
+        monkeypatch.setattr(rust_client, "list_files_batch", list_files_batch)
+        batcher = ListFilesBatcher(window_seconds=10, max_batch_size=2)
+
+        async def run():
+            return await asyncio.wait_for(
+                asyncio.gather(batcher.list_files("/a"), batcher.list_files("/b")),
+                timeout=1,
+            )
+
+        asyncio.run(run())
+        assert batches == [2]
+
+    def test_falls_back_when_batch_endpoint_missing(self, monkeypatch):
+        """后端不支持批量接口时退回单目录请求，并不再尝试批量"""
+        batch_calls = []
+        single_calls = []
+
+        async def list_files_batch(directories):
+            batch_calls.append(directories)
+            request = httpx.Request("POST", "http://test/api/files/list_batch")
+            raise httpx.HTTPStatusError("not found", request=request, response=httpx.Response(404, request=request))
+
+        async def list_files(directory):
+            single_calls.append(directory)
+            return [f"{directory}/a.py"]
+
+        monkeypatch.setattr(rust_client, "list_files_batch", list_files_batch)
+        monkeypatch.setattr(rust_client, "list_files", list_files)
+        batcher = ListFilesBatcher()
+
+        async def run():
+            first = await asyncio.gather(batcher.list_files("/x"), batcher.list_files("/y"))
+            second = await asyncio.gather(batcher.list_files("/z"), batcher.list_files("/w"))
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert first == [["/x/a.py"], ["/y/a.py"]]
+        assert second == [["/z/a.py"], ["/w/a.py"]]
+        assert len(batch_calls) == 1
+        assert sorted(single_calls) == ["/w", "/x", "/y", "/z"]
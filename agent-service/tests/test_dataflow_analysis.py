@@ -3,6 +3,7 @@
 """
 import pytest
 
+import app.core.dataflow_analysis as dataflow_module
 from app.core.dataflow_analysis import (
     TaintStatus,
     Source,
@@ -245,6 +246,41 @@ class TestDataFlowAnalyzer:
         # 这个测试需要实际文件，暂时跳过
         pytest.skip("需要实际文件系统")
 
+    def test_analyze_file_list(self, tmp_path, monkeypatch):
+        """提供文件列表时只分析列表中的文件，不遍历项目目录"""
+        code = "user_id = request.GET.get('id')\ncursor.execute(f\"SELECT {user_id}\")\n"
+        listed = tmp_path / "listed.py"
+        listed.write_text(code)
+        (tmp_path / "other.py").write_text(code)
+
+        def fail_rglob(self, pattern):
+            raise AssertionError("不应遍历项目目录")
+
+        monkeypatch.setattr(dataflow_module.Path, "rglob", fail_rglob)
+        vulnerabilities = DataFlowAnalyzer().analyze_project(str(tmp_path), file_list=[str(listed)])
+
+        assert vulnerabilities
+        assert {v.path.sink_location[0] for v in vulnerabilities} == {str(listed)}
+
+    def test_parallel_matches_serial(self, tmp_path, monkeypatch):
+        """文件较多时按进程并行分析，结果与顺序分析一致"""
+        code = "user_id = request.GET.get('id')\ncursor.execute(f\"SELECT {user_id}\")\n"
+        files = []
+        for i in range(3):
+            path = tmp_path / f"m{i}.py"
+            path.write_text(code)
+            files.append(str(path))
+
+        analyzer = DataFlowAnalyzer()
+        serial = analyzer.analyze_project(str(tmp_path), file_list=files)
+        monkeypatch.setattr(dataflow_module, "_PARALLEL_ANALYSIS_MIN_FILES", 1)
+        parallel = analyzer.analyze_project(str(tmp_path), file_list=files)
+
+        def summary(vulnerabilities):
+            return [(v.vuln_type, v.path.sink_location) for v in vulnerabilities]
+
+        assert summary(parallel) == summary(serial)
+
     def test_analyze_code(self):
         """测试分析代码片段"""
         analyzer = DataFlowAnalyzer()
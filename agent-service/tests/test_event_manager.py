@@ -0,0 +1,61 @@
+"""
+EventManager 单元测试
+"""
+import asyncio
+
+import pytest
+
+from app.services.event_manager import EventManager
+
+
+class _RecordingPersistence:
+    """记录持久化调用的假存储"""
+
+    def __init__(self):
+        self.single = []
+        self.batches = []
+
+    async def save_event(self, event):
+        self.single.append(event)
+        return True
+
+    async def save_events_batch(self, events):
+        self.batches.append(events)
+        return len(events)
+
+    def get_events(self, audit_id, after_sequence=0, limit=100):
+        return []
+
+
+class TestBatchEvents:
+    """批量事件测试"""
+
+    @pytest.mark.asyncio
+    async def test_add_events_assigns_sequences_and_persists_once(self):
+        """测试批量添加按顺序分配序列号，并以单个批次持久化"""
+        persistence = _RecordingPersistence()
+        manager = EventManager(persistence=persistence)
+        queue = await manager.subscribe("t1")
+
+        added = await manager.add_events("t1", [
+            {"event_type": "status", "message": "a"},
+            {"event_type": "status", "message": "b"},
+        ])
+        await asyncio.sleep(0)
+
+        assert added == 2
+        assert [e["sequence"] for e in manager.get_events("t1")] == [1, 2]
+        assert len(persistence.batches) == 1 and not persistence.single
+        assert [queue.get_nowait()["message"] for _ in range(2)] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_add_events_skips_duplicates(self):
+        """测试批量添加时重复 ID 被去重"""
+        manager = EventManager(persistence=_RecordingPersistence())
+
+        added = await manager.add_events("t1", [
+            {"id": "e1", "event_type": "status", "message": "a"},
+            {"id": "e1", "event_type": "status", "message": "a"},
+        ])
+
+        assert added == 1
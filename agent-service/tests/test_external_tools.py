@@ -0,0 +1,57 @@
+"""
+ExternalToolService 单元测试
+"""
+import asyncio
+
+import pytest
+
+import app.services.external_tools as external_tools_module
+from app.services.external_tools import ExternalToolService
+
+
+class _FakeProcess:
+    def __init__(self, returncode):
+        self.returncode = returncode
+
+    async def communicate(self):
+        return b"", b""
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """模拟 --version 子进程：只有 semgrep 和 bandit 已安装，记录启动的命令"""
+    calls = []
+
+    async def fake_exec(*cmd, **kwargs):
+        calls.append(cmd[0])
+        if cmd[0] not in ("semgrep", "bandit"):
+            raise FileNotFoundError(cmd[0])
+        return _FakeProcess(0)
+
+    monkeypatch.setattr(external_tools_module.asyncio, "create_subprocess_exec", fake_exec)
+    monkeypatch.setattr(external_tools_module, "_tool_availability", {})
+    return calls
+
+
+class TestToolAvailability:
+    """测试工具可用性探测缓存"""
+
+    def test_probed_once_across_projects(self, probes):
+        """不同项目的服务实例共享探测结果"""
+        first = asyncio.run(ExternalToolService("/a").get_available_tools())
+        probe_count = len(probes)
+        second = asyncio.run(ExternalToolService("/b").get_available_tools())
+
+        assert [t.name for t in first] == [t.name for t in second] == ["semgrep", "bandit"]
+        assert probe_count == 5
+        assert len(probes) == probe_count
+
+    def test_expired_entries_reprobed(self, probes, monkeypatch):
+        """超过 TTL 后重新探测"""
+        service = ExternalToolService("/a")
+        asyncio.run(service.get_available_tools())
+
+        monkeypatch.setattr(external_tools_module, "_TOOL_AVAILABILITY_TTL", -1.0)
+        asyncio.run(service.get_available_tools())
+
+        assert len(probes) == 10
@@ -0,0 +1,452 @@
+"""
+OrchestratorAgent 单元测试
+"""
+import asyncio
+
+import pytest
+
+from app.agents.orchestrator import OrchestratorAgent, AgentStep, Finding
+
+
+class TestOrchestratorFindings:
+    """发现合并与汇总测试"""
+
+    def test_merge_findings_dedup(self):
+        """测试按 ID 去重合并"""
+        agent = OrchestratorAgent()
+
+        added = agent._merge_findings([
+            {"id": "f1", "severity": "high"},
+            {"id": "f1", "severity": "high"},
+            {"severity": "low"},
+        ])
+
+        assert added == 2
+        assert len(agent._all_findings) == 2
+        assert set(agent._findings_by_id) == {f["id"] for f in agent._all_findings}
+
+        # 再次合并相同 ID 不会新增
+        assert agent._merge_findings([{"id": "f1"}]) == 0
+        assert len(agent._all_findings) == 2
+
+    def test_merge_findings_dedup_by_location(self):
+        """测试相同位置和类型的发现只保留一个"""
+        agent = OrchestratorAgent()
+
+        added = agent._merge_findings([
+            {"id": "f1", "file_path": "app/db.py", "line_start": 10, "vulnerability_type": "sql_injection"},
+            {"id": "f2", "file": "app/db.py", "line": 10, "type": "sql_injection"},
+            {"id": "f3", "file_path": "app/db.py", "line_start": 20, "vulnerability_type": "sql_injection"},
+        ])
+
+        assert added == 2
+        assert [f["id"] for f in agent._all_findings] == ["f1", "f3"]
+
+    def test_merge_findings_skips_non_dict(self):
+        """测试非字典发现在入口被过滤"""
+        agent = OrchestratorAgent()
+
+        added = agent._merge_findings(["not a finding", None, {"id": "f1"}])
+
+        assert added == 1
+        assert agent._summarize_findings().count("\n1. ") == 1
+
+    def test_merge_findings_assigns_id(self):
+        """测试缺失 ID 时自动生成"""
+        agent = OrchestratorAgent()
+        finding = {"severity": "medium"}
+
+        agent._merge_findings([finding])
+
+        assert finding["id"]
+        assert agent._findings_by_id[finding["id"]] is agent._all_findings[0]
+
+
+class TestOrchestratorDecisionLoop:
+    """重复决策检测测试"""
+
+    def test_record_decision_counts_repeats(self):
+        """测试相同决策被计数，键顺序不影响"""
+        agent = OrchestratorAgent()
+        step_a = AgentStep(thought="", action="dispatch_agent", action_input={"agent": "recon", "task": "t"})
+        step_b = AgentStep(thought="", action="dispatch_agent", action_input={"task": "t", "agent": "recon"})
+        other = AgentStep(thought="", action="summarize", action_input={})
+
+        assert agent._record_decision(step_a) == 1
+        assert agent._record_decision(other) == 1
+        assert agent._record_decision(step_b) == 2
+        assert agent._record_decision(step_a) == 3
+
+
+class TestOrchestratorSystemPrompt:
+    """系统提示词特化测试"""
+
+    def test_quick_prompt_skips_verification(self):
+        """测试快速审计提示词不包含验证阶段"""
+        agent = OrchestratorAgent()
+
+        quick = agent._get_system_prompt("quick")
+        full = agent._get_system_prompt("full")
+
+        assert "verification" not in quick
+        assert "verification" in full
+        assert len(quick) < len(full)
+
+    def test_unknown_type_falls_back_to_full(self):
+        """测试未知审计类型使用完整提示词"""
+        agent = OrchestratorAgent()
+
+        assert agent._get_system_prompt("targeted") is agent._get_system_prompt("full")
+
+    def test_initial_message_only_carries_ids(self):
+        """测试初始消息只包含审计标识，指令位于系统提示词"""
+        agent = OrchestratorAgent()
+
+        message = agent._format_initial_message({"project_id": "p1", "audit_id": "a1", "audit_type": "full"})
+
+        assert "- Project ID: p1" in message
+        assert "- Audit ID: a1" in message
+        assert "dispatch_agent" not in message
+        assert "必须先调度 recon Agent" in agent._get_system_prompt("full")
+
+
+class TestOrchestratorSummary:
+    """汇总统计测试"""
+
+    def test_counts_maintained_incrementally(self):
+        """测试严重程度和类型计数随发现增量更新"""
+        agent = OrchestratorAgent()
+        agent._merge_findings([
+            {"id": "a", "severity": "high", "vulnerability_type": "sql_injection", "file_path": "app/db.py"},
+            {"id": "b", "severity": "high", "vulnerability_type": "xss", "file_path": "app/views.py"},
+            {"id": "c", "type": "xss", "file": "app/templates.py"},
+        ])
+
+        summary = agent._generate_default_summary()
+        assert summary["total_findings"] == 3
+        assert summary["severity_distribution"] == {"critical": 0, "high": 2, "medium": 1, "low": 0}
+
+        text = agent._summarize_findings()
+        assert "- High: 2" in text
+        assert "- xss: 2" in text
+        assert "- sql_injection: 1" in text
+        assert "1. [high] Sql Injection in db.py (app/db.py)" in text
+        assert "3. [medium] Xss in templates.py (app/templates.py)" in text
+
+    def test_findings_by_severity(self):
+        """测试按严重程度查询发现"""
+        agent = OrchestratorAgent()
+        agent._merge_findings([
+            {"id": "a", "severity": "critical", "file_path": "a.py"},
+            {"id": "b", "severity": "low", "file_path": "b.py"},
+            {"id": "c", "severity": "critical", "file_path": "c.py"},
+        ])
+
+        assert [f["id"] for f in agent.get_findings_by_severity("critical")] == ["a", "c"]
+        assert agent.get_findings_by_severity("high") == []
+        assert agent.get_findings_by_severity("info") == []
+
+    def test_counts_rebuilt_after_direct_mutation(self):
+        """测试直接修改发现列表后计数会全量重建"""
+        agent = OrchestratorAgent()
+        agent._merge_findings([{"id": "a", "severity": "high", "file_path": "a.py"}])
+        agent._all_findings.append({"id": "b", "severity": "critical", "vulnerability_type": "rce"})
+
+        summary = agent._generate_default_summary()
+
+        assert summary["severity_distribution"]["critical"] == 1
+        assert summary["severity_distribution"]["high"] == 1
+        assert agent._type_counts["rce"] == 1
+        assert len(agent._summary_detail_lines) == 2
+
+    def test_generated_title_uses_basename(self):
+        """测试缺少标题时按类型和文件名生成"""
+        agent = OrchestratorAgent()
+
+        norm = agent._normalize_finding({"vulnerability_type": "sql_injection", "file_path": "app/db/query.py"})
+
+        assert norm["title"] == "Sql Injection in query.py"
+        assert agent._basename_cache == {"app/db/query.py": "query.py"}
+
+    def test_empty_summary(self):
+        """测试无发现时的汇总"""
+        agent = OrchestratorAgent()
+
+        assert agent._summarize_findings() == "目前还没有发现任何漏洞。"
+        assert agent._generate_default_summary()["total_findings"] == 0
+
+
+class TestCompactFindings:
+    """紧凑发现存储测试"""
+
+    def test_finding_roundtrip(self):
+        """测试 Finding 与字典互转"""
+        data = {"id": "f1", "severity": "high", "title": "SQLi", "file_path": "a.py", "line_start": 3, "cwe": "CWE-89"}
+
+        finding = Finding.from_dict(data)
+
+        assert finding.extra == {"cwe": "CWE-89"}
+        assert finding.get("cwe") == "CWE-89"
+        assert finding.get("severity") == "high"
+        assert finding.to_dict()["cwe"] == "CWE-89"
+
+    def test_compact_mode_summary_and_output(self):
+        """测试紧凑模式下的汇总、验证更新与结果输出"""
+        agent = OrchestratorAgent(config={"compact_findings": True})
+        agent._merge_findings([
+            {"id": "a", "severity": "high", "vulnerability_type": "xss", "file_path": "a.py"},
+        ])
+
+        assert isinstance(agent._all_findings[0], Finding)
+        assert "- High: 1" in agent._summarize_findings()
+
+        agent._findings_by_id["a"].update({"verified": True, "severity": "critical"})
+        output = agent._findings_as_dicts()
+        assert output[0]["verified"] is True
+        assert output[0]["severity"] == "critical"
+
+
+class TestPromptCacheBreakpoints:
+    """提示词缓存断点测试"""
+
+    def test_rolling_breakpoints_keep_two(self):
+        """测试滚动断点只保留最近两个，系统提示词断点常驻"""
+        from app.agents.orchestrator import _CACHE_EPHEMERAL
+        from app.services.llm.adapters.base import LLMMessage
+
+        agent = OrchestratorAgent()
+        agent._conversation = [
+            LLMMessage(role="system", content="sys", cache_control=_CACHE_EPHEMERAL),
+            LLMMessage(role="user", content="init"),
+        ]
+
+        for i in range(3):
+            agent._mark_cache_breakpoint()
+            agent._conversation.append(LLMMessage(role="user", content=f"obs {i}"))
+        agent._mark_cache_breakpoint()
+
+        marked = [m.content for m in agent._conversation if m.cache_control]
+        assert marked == ["sys", "obs 1", "obs 2"]
+
+
+
+class TestObservationOffload:
+    """观察结果压缩与取回测试"""
+
+    @pytest.mark.asyncio
+    async def test_long_observation_compacted_and_retrievable(self):
+        """测试长观察结果在对话中只保留预览，可按步骤 ID 取回原文"""
+        agent = OrchestratorAgent(config={"observation_preview_chars": 10})
+        step = AgentStep(thought="", action="dispatch_agent", action_input={}, observation="x" * 50)
+        agent._steps.append(step)
+
+        compact = agent._compact_observation(step)
+
+        assert compact.startswith("x" * 10 + "\n")
+        assert "step_1" in compact
+        detail_step = AgentStep(thought="", action="get_observation_detail", action_input={"step_id": "step_1"})
+        detail = await agent._handle_observation_detail_action(detail_step)
+        assert detail == "x" * 50
+        detail_step.observation = detail
+        assert agent._compact_observation(detail_step) == detail
+
+    def test_short_observation_kept(self):
+        """测试短观察结果原样保留"""
+        agent = OrchestratorAgent()
+        step = AgentStep(thought="", action="summarize", action_input={}, observation="ok")
+
+        assert agent._compact_observation(step) == "ok"
+        assert agent._observations == {}
+
+
+class TestConversationBound:
+    """对话历史上限测试"""
+
+    def test_trim_keeps_pinned_head_and_alternation(self):
+        """测试裁剪保留系统提示词和初始消息，且之后以 assistant 开头"""
+        from app.services.llm.adapters.base import LLMMessage
+
+        agent = OrchestratorAgent(config={"max_conversation_messages": 6})
+        agent._conversation = [LLMMessage(role="system", content="sys"), LLMMessage(role="user", content="init")]
+        for i in range(5):
+            agent._conversation.append(LLMMessage(role="assistant", content=f"a{i}"))
+            agent._conversation.append(LLMMessage(role="user", content=f"o{i}"))
+
+        agent._trim_conversation()
+
+        assert [m.content for m in agent._conversation] == ["sys", "init", "a3", "o3", "a4", "o4"]
+
+    def test_trim_noop_under_limit(self):
+        """测试未超过上限时不裁剪"""
+        from app.services.llm.adapters.base import LLMMessage
+
+        agent = OrchestratorAgent()
+        agent._conversation = [LLMMessage(role="system", content="sys"), LLMMessage(role="user", content="init")]
+
+        agent._trim_conversation()
+
+        assert len(agent._conversation) == 2
+
+
+class TestParseLLMResponse:
+    """ReAct 决策解析测试"""
+
+    def test_parse_markdown_and_code_fence(self):
+        """测试解析带 Markdown 加粗标签和代码块的决策"""
+        agent = OrchestratorAgent()
+
+        step = agent._parse_llm_response(
+            "**Thought:** 先侦察\n**Action:** dispatch_agent\n**Action Input:** ```json\n{\"agent\": \"recon\"}\n```"
+        )
+
+        assert step.thought == "先侦察"
+        assert step.action == "dispatch_agent"
+        assert step.action_input == {"agent": "recon"}
+
+    def test_parse_missing_action(self):
+        """测试缺少 Action 时返回 None"""
+        assert OrchestratorAgent()._parse_llm_response("Thought: 只有思考") is None
+
+
+class TestStallDetection:
+    """停滞检测测试"""
+
+    def test_stalls_after_limit_without_progress(self):
+        """测试连续无进展达到上限后停止"""
+        agent = OrchestratorAgent(config={"max_stalled_iterations": 2})
+        agent._runtime_context = {"audit_type": "full"}
+        agent._dispatched_tasks = {"recon": 1}
+
+        assert agent._check_stalled() is False  # 调度次数变化
+        assert agent._check_stalled() is False
+        assert agent._check_stalled() is True
+
+    def test_progress_resets_counter(self):
+        """测试出现新发现后计数清零"""
+        agent = OrchestratorAgent(config={"max_stalled_iterations": 2})
+        agent._runtime_context = {"audit_type": "full"}
+
+        assert agent._check_stalled() is False
+        agent._merge_findings([{"id": "a", "file_path": "a.py"}])
+        assert agent._check_stalled() is False
+        assert agent._stall_count == 0
+
+    def test_all_agents_dispatched_tolerates_one_idle_turn(self):
+        """测试所需子 Agent 都已调度后，一轮无进展即停止"""
+        agent = OrchestratorAgent()
+        agent._runtime_context = {"audit_type": "quick"}
+        agent._dispatched_tasks = {"recon": 1, "analysis": 1}
+
+        assert agent._check_stalled() is False
+        assert agent._check_stalled() is True
+
+
+class TestQuickAudit:
+    """测试快速审计的固定流程"""
+
+    def _make_agent(self, monkeypatch, config=None):
+        import app.agents.orchestrator as orchestrator_module
+
+        class _StubPhaseManager:
+            current_phase = orchestrator_module.AuditPhase.INITIALIZATION
+
+            async def transition_to(self, phase):
+                self.current_phase = phase
+
+        async def _register_agent(**kwargs):
+            return None
+
+        async def _noop(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(orchestrator_module, "get_phase_manager", lambda audit_id: _StubPhaseManager())
+        monkeypatch.setattr(orchestrator_module.agent_registry, "register_agent", _register_agent)
+
+        agent = OrchestratorAgent(config)
+        agent._publish_event = _noop
+        agent._publish_events = _noop
+
+        dispatched = []
+
+        async def _dispatch(params):
+            dispatched.append(params["agent"])
+            agent._merge_findings([{"id": f"{params['agent']}-1", "severity": "high"}])
+            return f"## {params['agent']} 执行成功"
+
+        agent._dispatch_agent = _dispatch
+        return agent, dispatched
+
+    def test_quick_audit_skips_llm(self, monkeypatch):
+        """快速审计按 recon → analysis 顺序调度且不调用 LLM"""
+        agent, dispatched = self._make_agent(monkeypatch)
+
+        async def _fail_llm(*args, **kwargs):
+            raise AssertionError("快速审计不应调用 LLM")
+
+        agent._execute_with_llm = _fail_llm
+
+        result = asyncio.run(agent.execute({"audit_id": "a1", "project_id": "p1", "audit_type": "quick"}))
+
+        assert result["status"] == "success"
+        assert dispatched == ["recon", "analysis"]
+        assert [s["action"] for s in result["result"]["steps"]] == ["dispatch_agent", "dispatch_agent"]
+        assert result["stats"]["findings_count"] == 2
+
+    def test_quick_audit_can_use_llm(self, monkeypatch):
+        """配置 quick_audit_use_llm 后快速审计仍走 LLM 循环"""
+        agent, dispatched = self._make_agent(monkeypatch, {"quick_audit_use_llm": True})
+
+        async def _llm_path(context):
+            return {"status": "success", "path": "llm"}
+
+        agent._execute_with_llm = _llm_path
+
+        result = asyncio.run(agent.execute({"audit_id": "a1", "project_id": "p1", "audit_type": "quick"}))
+
+        assert result["path"] == "llm"
+        assert dispatched == []
+
+
+class TestDispatchObservation:
+    """测试子 Agent 调度后的观察结果"""
+
+    def _dispatch(self, monkeypatch, agent_name, result):
+        import app.agents.orchestrator as orchestrator_module
+
+        inputs = []
+
+        class _SubAgent:
+            async def run(self, input_data):
+                inputs.append(input_data)
+                return {"status": "success", "result": result}
+
+        async def _create_agent(**kwargs):
+            return f"{kwargs['agent_type']}-1"
+
+        async def _get_agent_instance(agent_id):
+            return _SubAgent()
+
+        async def _noop(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(orchestrator_module.agent_graph_controller, "create_agent", _create_agent)
+        monkeypatch.setattr(orchestrator_module.agent_registry, "get_agent_instance", _get_agent_instance)
+        agent = OrchestratorAgent()
+        agent._publish_event = _noop
+        observation = asyncio.run(agent._dispatch_agent({"agent": agent_name, "task": "t"}))
+        return agent, observation, inputs
+
+    def test_recon_without_findings_keeps_tech_stack(self, monkeypatch):
+        """侦察无新发现时仍返回技术栈，并记录项目指纹供后续调度传递"""
+        result = {"tech_stack": {"languages": ["Python"]}, "project_fingerprint": "head:digest"}
+        agent, observation, _ = self._dispatch(monkeypatch, "recon", result)
+
+        assert "['Python']" in observation
+        assert agent._runtime_context["project_fingerprint"] == "head:digest"
+
+    def test_analysis_without_findings_short(self, monkeypatch):
+        """分析无新发现时返回简短结果"""
+        _, observation, inputs = self._dispatch(monkeypatch, "analysis", {"findings": []})
+
+        assert "无新增发现" in observation
+        assert inputs[0]["project_fingerprint"] is None
@@ -0,0 +1,65 @@
+"""
+PromptLoader 单元测试
+"""
+import asyncio
+
+import pytest
+
+import app.services.prompt_loader as prompt_loader_module
+from app.services.prompt_loader import PromptLoader
+
+
+class TestPromptLoaderCache:
+    """测试提示词缓存"""
+
+    def test_yaml_parsed_once_per_agent(self, tmp_path, monkeypatch):
+        """同一 Agent 的多个模板只解析一次文件"""
+        (tmp_path / "recon.yaml").write_text(
+            "system_prompt: 系统\nprompts:\n  greet: 你好 {name}\n",
+            encoding="utf-8",
+        )
+        loader = PromptLoader(str(tmp_path))
+
+        calls = []
+        original = prompt_loader_module.yaml.safe_load
+
+        def counting_load(stream):
+            calls.append(1)
+            return original(stream)
+
+        monkeypatch.setattr(prompt_loader_module.yaml, "safe_load", counting_load)
+
+        async def run():
+            system = await loader.get_system_prompt("recon")
+            greet = await loader.get_prompt("recon", "greet", {"name": "A"})
+            again = await loader.get_system_prompt("recon")
+            return system, greet, again
+
+        system, greet, again = asyncio.run(run())
+
+        assert system == again == "系统"
+        assert greet == "你好 A"
+        assert len(calls) == 1
+
+    def test_missing_file_default_is_cached(self, tmp_path):
+        """文件不存在时缓存默认提示词，重载后读取新文件"""
+        loader = PromptLoader(str(tmp_path))
+
+        first = asyncio.run(loader.get_system_prompt("orchestrator"))
+        assert "Orchestrator" in first
+
+        (tmp_path / "orchestrator.yaml").write_text("system_prompt: 新提示词\n", encoding="utf-8")
+        assert asyncio.run(loader.get_system_prompt("orchestrator")) == first
+
+        loader.reload_cache()
+        assert asyncio.run(loader.get_system_prompt("orchestrator")) == "新提示词"
+
+    def test_concurrent_loads_share_result(self, tmp_path):
+        """并发首次加载返回同一结果"""
+        (tmp_path / "analysis.yaml").write_text("system_prompt: 分析\n", encoding="utf-8")
+        loader = PromptLoader(str(tmp_path))
+
+        async def run():
+            return await asyncio.gather(*(loader.get_system_prompt("analysis") for _ in range(5)))
+
+        assert asyncio.run(run()) == ["分析"] * 5
@@ -0,0 +1,54 @@
+"""
+RateLimiter 单元测试
+"""
+import pytest
+import time
+
+from app.core.resilience.rate_limiter import RateLimiter, RateLimiterConfig
+
+
+class TestRateLimiter:
+    """RateLimiter 测试"""
+
+    @pytest.mark.asyncio
+    async def test_acquire_within_capacity(self):
+        """测试桶内有令牌时立即获取"""
+        limiter = RateLimiter("test", RateLimiterConfig(tokens_per_second=1.0, max_tokens=2))
+
+        assert await limiter.acquire() is True
+        assert await limiter.acquire() is True
+        assert limiter.get_status()["total_wait_time"] == 0
+
+    @pytest.mark.asyncio
+    async def test_blocking_acquire_reserves_tokens(self):
+        """测试阻塞获取按累计欠额等待，且只等待一次"""
+        limiter = RateLimiter("test", RateLimiterConfig(tokens_per_second=50.0, max_tokens=1))
+
+        start = time.monotonic()
+        assert await limiter.acquire() is True
+        assert await limiter.acquire() is True
+        assert await limiter.acquire() is True
+        elapsed = time.monotonic() - start
+
+        # 两次透支各需约 1/50 秒
+        assert elapsed >= 0.03
+        assert limiter.get_status()["total_rejected"] == 0
+
+    @pytest.mark.asyncio
+    async def test_non_blocking_rejects(self):
+        """测试非阻塞模式在无令牌时拒绝"""
+        limiter = RateLimiter("test", RateLimiterConfig(tokens_per_second=1.0, max_tokens=1))
+
+        assert await limiter.acquire(block=False) is True
+        assert await limiter.acquire(block=False) is False
+        assert limiter.get_status()["total_rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_context_manager(self):
+        """测试 async with 获取令牌"""
+        limiter = RateLimiter("test", RateLimiterConfig(tokens_per_second=1.0, max_tokens=1))
+
+        async with limiter:
+            pass
+
+        assert limiter.get_status()["total_requests"] == 1
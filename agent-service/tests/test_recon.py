@@ -0,0 +1,746 @@
+"""
+ReconAgent 单元测试
+"""
+import asyncio
+import os
+
+import pytest
+
+import app.agents.recon as recon_module
+import app.services.batched_rust_client as batched_module
+from app.agents.recon import ReconAgent
+from app.services.rust_client import rust_client
+
+
+class _FakeTree:
+    """模拟 rust_client 的目录树接口，记录单目录和批量请求"""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.calls = []
+        self.batches = []
+
+    async def list_files(self, directory):
+        self.calls.append(directory)
+        return self.tree.get(directory, [])
+
+    async def list_files_batch(self, directories):
+        self.batches.append(sorted(directories))
+        return {d: self.tree.get(d, []) for d in directories}
+
+
+@pytest.fixture
+def fake_tree(monkeypatch):
+    """安装模拟目录树并重置全局 batcher（按层列目录路径）"""
+    def install(tree):
+        fake = _FakeTree(tree)
+        monkeypatch.setattr(rust_client, "list_files", fake.list_files)
+        monkeypatch.setattr(rust_client, "list_files_batch", fake.list_files_batch)
+        monkeypatch.setattr(batched_module, "_list_files_batcher", None)
+        monkeypatch.setattr(recon_module, "_walk_supported", False)
+        return fake
+    return install
+
+
+class TestScanStructure:
+    """测试项目结构扫描"""
+
+    def test_sibling_directories_listed_in_one_batch(self, fake_tree):
+        """同一层的子目录合并为一次批量请求，忽略目录被跳过"""
+        fake = fake_tree({
+            "/p": ["/p/main.py", "/p/src", "/p/lib", "/p/node_modules"],
+            "/p/src": ["/p/src/app.py", "/p/src/api"],
+            "/p/lib": ["/p/lib/util.py"],
+            "/p/src/api": ["/p/src/api/routes.py"],
+        })
+
+        structure = asyncio.run(ReconAgent()._scan_structure("/p"))
+
+        assert sorted(structure["files"]) == [
+            "/p/lib/util.py", "/p/main.py", "/p/src/api/routes.py", "/p/src/app.py",
+        ]
+        assert sorted(structure["directories"]) == ["/p/lib", "/p/src", "/p/src/api"]
+        assert fake.calls == ["/p", "/p/src/api"]
+        assert fake.batches == [["/p/lib", "/p/src"]]
+
+    def test_recursive_listing_not_duplicated(self, fake_tree):
+        """后端返回递归结果时不会重复记录文件"""
+        fake_tree({
+            "/p": ["/p/src", "/p/src/app.py"],
+            "/p/src": ["/p/src/app.py"],
+        })
+
+        structure = asyncio.run(ReconAgent()._scan_structure("/p"))
+
+        assert structure["files"] == ["/p/src/app.py"]
+
+    def test_deep_directories_listed(self, fake_tree):
+        """按层列目录不限制层数，第 5 层的文件同样被扫描到"""
+        fake_tree({
+            "/p": ["/p/src"],
+            "/p/src": ["/p/src/main"],
+            "/p/src/main": ["/p/src/main/java"],
+            "/p/src/main/java": ["/p/src/main/java/com"],
+            "/p/src/main/java/com": ["/p/src/main/java/com/App.java"],
+        })
+
+        structure = asyncio.run(ReconAgent()._scan_structure("/p"))
+
+        assert structure["files"] == ["/p/src/main/java/com/App.java"]
+        assert len(structure["directories"]) == 4
+
+    def test_stream_stops_early(self, fake_tree):
+        """流式遍历可以提前终止，不会继续列出更深的目录"""
+        fake = fake_tree({
+            "/p": ["/p/main.py", "/p/src"],
+            "/p/src": ["/p/src/app.py"],
+        })
+
+        async def first_item():
+            stream = ReconAgent()._iter_structure("/p")
+            item = await stream.__anext__()
+            await stream.aclose()
+            return item
+
+        assert asyncio.run(first_item()) == ("file", "/p/main.py", "main.py")
+        assert fake.calls == ["/p"]
+
+    def test_walk_endpoint_used_when_available(self, monkeypatch):
+        """后端支持 walk 时一次请求完成遍历，按条目类型区分文件和目录"""
+        requests = []
+
+        async def walk(root, max_depth=None, ignore=None):
+            requests.append((root, max_depth, ignore))
+            return [
+                {"path": "/p/Dockerfile", "name": "Dockerfile", "is_dir": False},
+                {"path": "/p/app.v2", "name": "app.v2", "is_dir": True},
+                {"path": "/p/app.v2/main.py", "name": "main.py", "is_dir": False},
+            ]
+
+        monkeypatch.setattr(rust_client, "walk", walk)
+        monkeypatch.setattr(recon_module, "_walk_supported", True)
+
+        structure = asyncio.run(ReconAgent()._scan_structure("/p"))
+
+        assert requests == [("/p", None, sorted(recon_module._IGNORED_DIRS))]
+        assert structure == {"files": ["/p/Dockerfile", "/p/app.v2/main.py"], "directories": ["/p/app.v2"]}
+
+    def test_walk_indexes_deep_files(self, monkeypatch):
+        """walk 不限制层数，第 5 层的文件和依赖清单同样进入索引"""
+        deep_dirs = ["/p/src", "/p/src/main", "/p/src/main/java", "/p/src/main/java/com"]
+        deep_files = ["/p/src/main/java/com/LoginController.java", "/p/services/api/app/v1/requirements.txt"]
+
+        async def walk(root, max_depth=None, ignore=None):
+            assert max_depth is None
+            entries = [{"path": d, "name": d.rsplit("/", 1)[-1], "is_dir": True} for d in deep_dirs]
+            return entries + [{"path": f, "name": f.rsplit("/", 1)[-1], "is_dir": False} for f in deep_files]
+
+        monkeypatch.setattr(rust_client, "walk", walk)
+        monkeypatch.setattr(recon_module, "_walk_supported", True)
+
+        structure, index = asyncio.run(ReconAgent()._collect_structure("/p"))
+
+        assert structure == {"file_count": 2, "directory_count": 4}
+        assert index.manifests == ["/p/services/api/app/v1/requirements.txt"]
+        assert "/p/src/main/java/com/LoginController.java" in {e.file for e in index.entry_points}
+
+    def test_index_built_during_scan(self, fake_tree):
+        """扫描时同步建立攻击面和依赖清单索引，结果与单独提取一致"""
+        fake_tree({
+            "/p": ["/p/api", "/p/package.json"],
+            "/p/api": ["/p/api/login.py", "/p/api/Requirements.txt"],
+        })
+        agent = ReconAgent()
+        index = recon_module._StructureIndex()
+
+        structure = asyncio.run(agent._scan_structure("/p", index))
+        fused = asyncio.run(agent._extract_attack_surface(structure, {}, index))
+        separate = asyncio.run(agent._extract_attack_surface(structure, {}))
+
+        assert fused == separate
+        assert sorted(index.manifests) == ["/p/api/Requirements.txt", "/p/package.json"]
+
+
+class TestAttackSurface:
+    """测试攻击面提取"""
+
+    def test_categories_and_user_inputs(self):
+        """按类别生成入口点，用户输入只匹配文件名"""
+        structure = {"files": [
+            "src/API/UserController.py",
+            "forms/helpers.py",
+            "src/upload_form.py",
+        ]}
+
+        surface = asyncio.run(ReconAgent()._extract_attack_surface(structure, {}))
+
+        assert [(e.type, e.file) for e in surface["entry_points"]] == [
+            ("web_route", "src/API/UserController.py"),
+            ("auth", "src/API/UserController.py"),
+            ("file_operation", "src/upload_form.py"),
+        ]
+        assert surface["entry_points"][1].to_dict()["severity"] == "high"
+        assert "severity" not in surface["entry_points"][0].to_dict()
+        assert [u.file for u in surface["user_inputs"]] == ["src/upload_form.py"]
+        assert surface["file_operations"] == [surface["entry_points"][2]]
+        assert surface["command_executions"] == []
+
+
+    def test_automaton_matches_regex(self, monkeypatch):
+        """Aho-Corasick 自动机与正则匹配得到相同的入口点"""
+        pytest.importorskip("ahocorasick")
+        monkeypatch.setattr(recon_module, "AHOCORASICK_AVAILABLE", True)
+        structure = {"files": [
+            "src/api/user_login.py", "lib/io/shell_exec.go", "docs/readme.md",
+            "forms/helpers.py", "src/upload_form.py",
+        ]}
+
+        automaton = recon_module._build_attack_surface_automaton()
+        monkeypatch.setattr(recon_module, "_ATTACK_SURFACE_AUTOMATON", automaton)
+        with_automaton = asyncio.run(ReconAgent()._extract_attack_surface(structure, {}))
+        monkeypatch.setattr(recon_module, "_ATTACK_SURFACE_AUTOMATON", None)
+        with_regex = asyncio.run(ReconAgent()._extract_attack_surface(structure, {}))
+
+        assert with_automaton["entry_points"] == with_regex["entry_points"]
+        assert [u.file for u in with_automaton["user_inputs"]] == ["src/upload_form.py"]
+        assert with_automaton["user_inputs"] == with_regex["user_inputs"]
+
+    def test_records_serialized_at_boundary(self):
+        """入口点为不可变数据类，输出时转换为字典"""
+        import dataclasses
+        from app.agents.recon import EntryPoint, _records_to_dicts
+
+        entry = EntryPoint("auth", "login.py", "认证相关文件", "high")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            entry.file = "other.py"
+
+        assert _records_to_dicts({"entry_points": [entry], "total": 1}) == {
+            "entry_points": [{"type": "auth", "file": "login.py", "description": "认证相关文件", "severity": "high"}],
+            "total": 1,
+        }
+
+
+class TestHighValueTargets:
+    """测试高价值目标识别"""
+
+    def test_dedup_and_skip_ignored(self, tmp_path):
+        """同一文件只记录一次，忽略目录中的文件被跳过"""
+        (tmp_path / "auth_api.py").write_text("x")
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "auth.js").write_text("x")
+
+        agent = ReconAgent()
+
+        async def _noop(*args, **kwargs):
+            return None
+
+        agent._publish_event = _noop
+
+        targets = asyncio.run(agent._identify_high_value_targets(str(tmp_path)))
+
+        assert [(t["path"], t["category"]) for t in targets] == [("auth_api.py", "auth")]
+
+    def test_scan_runs_off_event_loop(self, tmp_path, monkeypatch):
+        """文件系统遍历在线程中执行，发现事件在事件循环中发布"""
+        import threading
+
+        scan_threads = []
+        original = recon_module._scan_high_value_targets
+
+        def scan(project_path):
+            scan_threads.append(threading.get_ident())
+            return original(project_path)
+
+        monkeypatch.setattr(recon_module, "_scan_high_value_targets", scan)
+        (tmp_path / "db_schema.sql").write_text("x")
+        agent = ReconAgent()
+        events = []
+
+        async def publish(event_type, data):
+            events.append((threading.get_ident(), data["message"]))
+
+        agent._publish_event = publish
+
+        asyncio.run(agent._identify_high_value_targets(str(tmp_path)))
+
+        loop_thread = threading.get_ident()
+        assert scan_threads and scan_threads[0] != loop_thread
+        assert events == [(loop_thread, "🎯 发现高价值目标: db_schema.sql (database)")]
+
+
+class TestReconCache:
+    """测试侦察结果缓存"""
+
+    def _make_agent(self, monkeypatch, project_path):
+        monkeypatch.setattr(recon_module, "_recon_cache", None)
+        agent = ReconAgent()
+        runs = []
+
+        async def _get_project_info(project_id):
+            return {"id": project_id, "path": project_path}
+
+        async def _run_recon(project_info, path):
+            runs.append(path)
+            return {"project_path": path, "tool_findings": [{"id": f"f{len(runs)}"}]}
+
+        agent._get_project_info = _get_project_info
+        agent._run_recon = _run_recon
+        return agent, runs
+
+    def test_unchanged_project_reuses_result(self, monkeypatch, tmp_path):
+        """项目未变化时复用结果，且返回副本"""
+        agent, runs = self._make_agent(monkeypatch, str(tmp_path))
+
+        first = asyncio.run(agent.execute({"project_id": "p1"}))
+        first["tool_findings"][0]["id"] = "mutated"
+        second = asyncio.run(agent.execute({"project_id": "p1"}))
+
+        assert len(runs) == 1
+        assert second["tool_findings"][0]["id"] == "f1"
+
+    def test_changed_project_rescanned(self, monkeypatch, tmp_path):
+        """git HEAD 变化后重新侦察"""
+        git_dir = tmp_path / ".git"
+        (git_dir / "refs" / "heads").mkdir(parents=True)
+        (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+        (git_dir / "refs" / "heads" / "main").write_text("aaa\n")
+        agent, runs = self._make_agent(monkeypatch, str(tmp_path))
+
+        asyncio.run(agent.execute({"project_id": "p1"}))
+        (git_dir / "refs" / "heads" / "main").write_text("bbb\n")
+        asyncio.run(agent.execute({"project_id": "p1"}))
+
+        assert len(runs) == 2
+
+
+    def test_nested_change_rescanned(self, monkeypatch, tmp_path):
+        """根目录以下的文件修改或新增后重新侦察（根目录 mtime 不变）"""
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "app.py").write_text("print(1)\n")
+        agent, runs = self._make_agent(monkeypatch, str(tmp_path))
+        root_mtime = os.stat(tmp_path).st_mtime_ns
+
+        asyncio.run(agent.execute({"project_id": "p1"}))
+        (tmp_path / "src" / "new.py").write_text("eval(input())\n")
+        asyncio.run(agent.execute({"project_id": "p1"}))
+        (tmp_path / "src" / "app.py").write_text("print(2)\n")
+        os.utime(tmp_path / "src" / "app.py", ns=(1, 1))
+        asyncio.run(agent.execute({"project_id": "p1"}))
+
+        assert os.stat(tmp_path).st_mtime_ns == root_mtime
+        assert len(runs) == 3
+
+    def test_locks_released_after_use(self, monkeypatch, tmp_path):
+        """侦察结束后不保留按项目和指纹分配的锁"""
+        agent, runs = self._make_agent(monkeypatch, str(tmp_path))
+
+        async def run():
+            await asyncio.gather(*(agent.execute({"project_id": "p1"}) for _ in range(3)))
+
+        asyncio.run(run())
+
+        assert len(runs) == 1
+        assert len(recon_module._recon_locks) == 0
+
+    def test_invalidate_project_caches(self, monkeypatch, tmp_path):
+        """清除项目缓存后重新侦察"""
+        agent, runs = self._make_agent(monkeypatch, str(tmp_path))
+
+        asyncio.run(agent.execute({"project_id": "p1"}))
+        tool_cache = recon_module.get_tool_result_cache()
+        tool_cache.set("p1:old-fingerprint", ("read_file",), "a")
+        tool_cache.set("p10:fingerprint", ("read_file",), "b")
+        assert recon_module.invalidate_project_caches("p1") == 2
+        asyncio.run(agent.execute({"project_id": "p1"}))
+
+        assert len(runs) == 2
+        assert tool_cache.get("p10:fingerprint", ("read_file",)) == "b"
+        tool_cache.invalidate("p10")
+
+    def test_result_carries_fingerprint(self, monkeypatch, tmp_path):
+        """侦察结果附带项目指纹（缓存命中时相同），代码变化后指纹随之变化"""
+        nested = tmp_path / "src"
+        nested.mkdir()
+        (nested / "app.py").write_text("print(1)\n")
+        agent, runs = self._make_agent(monkeypatch, str(tmp_path))
+
+        first = asyncio.run(agent.execute({"project_id": "p1"}))
+        cached = asyncio.run(agent.execute({"project_id": "p1"}))
+        (nested / "app.py").write_text("print(22)\n")
+        changed = asyncio.run(agent.execute({"project_id": "p1"}))
+
+        assert first["project_fingerprint"] == cached["project_fingerprint"]
+        assert changed["project_fingerprint"] != first["project_fingerprint"]
+        assert len(runs) == 2
+
+
+class TestRunRecon:
+    """测试侦察流程编排"""
+
+    def test_independent_stages_run_concurrently(self, monkeypatch):
+        """技术栈、结构扫描和高价值目标识别并发执行"""
+        class _Tools:
+            async def get_available_tools(self):
+                return []
+
+        monkeypatch.setattr(recon_module, "get_external_tool_service", lambda path: _Tools())
+        monkeypatch.setattr(recon_module, "get_dataflow_analyzer", lambda: None)
+
+        agent = ReconAgent()
+        in_flight = 0
+        max_in_flight = 0
+
+        def stage(result):
+            async def run(*args):
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                return result
+            return run
+
+        tech_stack = {"languages": {"Python"}, "frameworks": set(), "package_managers": set()}
+        agent._identify_tech_stack = stage(tech_stack)
+        agent._collect_structure = stage(({"file_count": 0, "directory_count": 0}, recon_module._StructureIndex()))
+        agent._identify_high_value_targets = stage([])
+        agent._scan_with_tools = stage([])
+        agent._run_dataflow_analysis = stage([])
+
+        result = asyncio.run(agent._run_recon({"id": "p1"}, "/p"))
+
+        assert max_in_flight == 3
+        assert result["tech_stack"]["languages"] == ["Python"]
+        assert result["dependencies"]["total_libraries"] == 0
+
+
+class TestHighRiskAreas:
+    """测试高风险区域提取"""
+
+    def test_priority_rules_and_order(self):
+        """按严重程度计算优先级并排序，只有 low 或未知级别的文件被排除"""
+        findings = [
+            {"file_path": "a.py", "severity": "medium", "line_number": 1},
+            {"file_path": "b.py", "severity": "critical", "line_number": 2},
+            {"file_path": "c.py", "severity": "low", "line_number": 3},
+            {"file_path": "d.py", "severity": "unknown", "line_number": 4},
+            {"file_path": "a.py", "severity": "high", "line_number": 5},
+            {"severity": "critical"},
+        ]
+
+        areas = asyncio.run(ReconAgent()._extract_high_risk_areas(findings, {}, "/p"))
+
+        assert [(a["file_path"], a["priority"]) for a in areas] == [("b.py", 101), ("a.py", 71)]
+        assert areas[1]["issues"] == {"critical": [], "high": [5], "medium": [1], "low": []}
+
+
+class TestRecommendTools:
+    """测试工具推荐"""
+
+    def test_deduplicated_in_rule_order(self):
+        """多条规则推荐同一工具时只保留首次出现的位置"""
+        tech_stack = {
+            "languages": {"Python", "TypeScript"},
+            "frameworks": set(),
+            "package_managers": {"npm", "pip"},
+        }
+
+        tools = asyncio.run(ReconAgent()._recommend_tools(tech_stack))
+
+        assert [t.name for t in tools] == ["semgrep", "gitleaks", "bandit", "safety", "npm_audit"]
+
+
+class TestDataflowAnalysis:
+    """测试数据流分析阶段"""
+
+    def test_uses_indexed_files(self):
+        """索引覆盖整棵树时直接分析其中的 Python 文件，否则由分析器递归查找"""
+        index = recon_module._StructureIndex.from_files(["/p/app.py", "/p/package.json", "/p/web/main.js"])
+        calls = []
+
+        class _Analyzer:
+            def analyze_project(self, project_path, file_patterns=None, file_list=None):
+                calls.append((project_path, file_list))
+                return []
+
+        agent = ReconAgent()
+        agent._dataflow_analyzer = _Analyzer()
+        tech_stack = {"languages": {"Python"}, "frameworks": set(), "package_managers": set()}
+
+        assert asyncio.run(agent._run_dataflow_analysis("/p", tech_stack, index)) == []
+        index.complete = True
+        assert asyncio.run(agent._run_dataflow_analysis("/p", tech_stack, index)) == []
+        assert calls == [("/p", None), ("/p", ["/p/app.py"])]
+
+    def test_complete_only_after_full_walk(self, monkeypatch, fake_tree):
+        """只有 walk 完整返回时索引才标记为覆盖整棵树，按层列目录时不标记"""
+        async def walk(root, max_depth=None, ignore=None):
+            return [{"path": "/p/a/b/c/d/deep.py", "name": "deep.py", "is_dir": False}]
+
+        monkeypatch.setattr(rust_client, "walk", walk)
+        monkeypatch.setattr(recon_module, "_walk_supported", True)
+        _, walked = asyncio.run(ReconAgent()._collect_structure("/p"))
+
+        fake_tree({"/p": ["/p/app.py"]})
+        _, listed = asyncio.run(ReconAgent()._collect_structure("/p"))
+
+        assert walked.complete and walked.dataflow_files == ["/p/a/b/c/d/deep.py"]
+        assert not listed.complete
+
+
+class TestScanWithTools:
+    """测试外部工具扫描"""
+
+    def test_tools_run_concurrently(self):
+        """可用工具并发运行，结果按推荐顺序合并，失败的工具被跳过"""
+        from types import SimpleNamespace
+
+        in_flight = 0
+        max_in_flight = 0
+
+        class _Service:
+            async def run_tool_by_name(self, name):
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                if name == "bandit":
+                    raise RuntimeError("boom")
+                return SimpleNamespace(success=True, findings=[{"title": name}], error=None)
+
+        agent = ReconAgent()
+        agent._tool_service = _Service()
+        tools = [SimpleNamespace(name=n) for n in ("semgrep", "gitleaks", "bandit", "safety")]
+        available = tools[:3]
+
+        findings = asyncio.run(agent._scan_with_tools(tools, available))
+
+        assert [f["title"] for f in findings] == ["semgrep", "gitleaks"]
+        assert max_in_flight == min(3, recon_module.os.cpu_count() or 1)
+
+
+class TestDependencyParsing:
+    """测试依赖清单解析"""
+
+    def test_identical_manifests_parsed_once(self, monkeypatch):
+        """内容相同的清单只解析一次，返回的列表互不影响"""
+        contents = {
+            "/a/package.json": '{"dependencies": {"express": "^4.0.0"}}',
+            "/b/package.json": '{"dependencies": {"express": "^4.0.0"}}',
+        }
+
+        async def read_file(path):
+            return contents[path]
+
+        monkeypatch.setattr(rust_client, "read_file", read_file)
+        monkeypatch.setattr(recon_module, "_MANIFEST_CACHE", recon_module.OrderedDict())
+        agent = ReconAgent()
+
+        first = asyncio.run(agent._parse_package_json("/a/package.json"))
+        first.clear()
+        second = asyncio.run(agent._parse_package_json("/b/package.json"))
+
+        assert [lib.to_dict() for lib in second] == [
+            {"name": "express", "version": "^4.0.0", "type": "production", "ecosystem": "npm"},
+        ]
+        assert len(recon_module._MANIFEST_CACHE) == 1
+
+    def test_package_json_dependency_types(self, monkeypatch):
+        """依赖类型由所在字段决定，同时出现在两处的包各记录一次"""
+        content = '{"dependencies": {"react": "18"}, "devDependencies": {"jest": "29", "react": "18"}}'
+        monkeypatch.setattr(recon_module, "_MANIFEST_CACHE", recon_module.OrderedDict())
+
+        libraries = asyncio.run(ReconAgent()._parse_package_json("/p/package.json", content))
+
+        assert [(lib.name, lib.type) for lib in libraries] == [
+            ("react", "production"), ("jest", "development"), ("react", "development"),
+        ]
+
+    def test_manifests_read_concurrently(self, monkeypatch):
+        """多个依赖清单并发读取，结果按文件顺序合并"""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def read_file(path):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return f"{path.split('/')[1]}==1.0"
+
+        async def read_files_batch(paths):
+            raise RuntimeError("not supported")
+
+        monkeypatch.setattr(rust_client, "read_file", read_file)
+        monkeypatch.setattr(rust_client, "read_files_batch", read_files_batch)
+        monkeypatch.setattr(recon_module, "_MANIFEST_CACHE", recon_module.OrderedDict())
+        structure = {"files": ["/a/requirements.txt", "/b/requirements.txt", "/c/main.py"]}
+
+        deps = asyncio.run(ReconAgent()._analyze_dependencies(structure))
+
+        assert [lib.name for lib in deps["libraries"]] == ["a", "b"]
+        assert max_in_flight == 2
+
+
+    def test_manifests_prefetched_in_one_request(self, monkeypatch):
+        """依赖文件内容通过一次批量请求取得，不再逐个读取"""
+        batches = []
+
+        async def read_files_batch(paths):
+            batches.append(list(paths))
+            return {"/a/package.json": '{"dependencies": {"koa": "2"}}', "/b/requirements.txt": "rich"}
+
+        async def read_file(path):
+            raise AssertionError("不应逐个读取")
+
+        monkeypatch.setattr(rust_client, "read_files_batch", read_files_batch)
+        monkeypatch.setattr(rust_client, "read_file", read_file)
+        monkeypatch.setattr(recon_module, "_read_batch_supported", True)
+        monkeypatch.setattr(recon_module, "_MANIFEST_CACHE", recon_module.OrderedDict())
+        structure = {"files": ["/a/package.json", "/b/requirements.txt"]}
+
+        deps = asyncio.run(ReconAgent()._analyze_dependencies(structure))
+
+        assert batches == [["/a/package.json", "/b/requirements.txt"]]
+        assert [lib.name for lib in deps["libraries"]] == ["koa", "rich"]
+
+    def test_unsupported_batch_read_not_retried(self, monkeypatch):
+        """后端不支持批量读取时记住结果，之后直接逐个读取"""
+        import httpx
+
+        attempts = []
+
+        async def read_files_batch(paths):
+            attempts.append(paths)
+            request = httpx.Request("POST", "http://rust/api/files/read_batch")
+            raise httpx.HTTPStatusError("404", request=request, response=httpx.Response(404, request=request))
+
+        monkeypatch.setattr(rust_client, "read_files_batch", read_files_batch)
+        monkeypatch.setattr(recon_module, "_read_batch_supported", True)
+        paths = ["/a/package.json", "/b/package.json"]
+
+        assert asyncio.run(recon_module._prefetch_manifests(paths)) == {}
+        assert asyncio.run(recon_module._prefetch_manifests(paths)) == {}
+        assert len(attempts) == 1
+
+    def test_unchanged_manifest_not_reread(self, monkeypatch, tmp_path):
+        """清单文件未变化时复用上次结果，修改后重新读取"""
+        manifest = tmp_path / "requirements.txt"
+        manifest.write_text("rich\n")
+        reads = []
+
+        async def read_file(path):
+            reads.append(path)
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+
+        monkeypatch.setattr(rust_client, "read_file", read_file)
+        monkeypatch.setattr(recon_module, "_MANIFEST_CACHE", recon_module.OrderedDict())
+        monkeypatch.setattr(recon_module, "_MANIFEST_FILE_CACHE", recon_module.OrderedDict())
+        structure = {"files": [str(manifest)]}
+        agent = ReconAgent()
+
+        first = asyncio.run(agent._analyze_dependencies(structure))
+        second = asyncio.run(agent._analyze_dependencies(structure))
+        manifest.write_text("rich\nhttpx\n")
+        third = asyncio.run(agent._analyze_dependencies(structure))
+
+        assert len(reads) == 2
+        assert first["libraries"] == second["libraries"]
+        assert [lib.name for lib in third["libraries"]] == ["rich", "httpx"]
+
+    def test_requirement_lines(self):
+        """版本约束、extras、注释和选项行都能正确处理"""
+        content = "\n".join([
+            "flask",
+            "Django>=3.2,<4  # web",
+            "requests[socks] ~= 2.31 ; python_version > '3'",
+            "-r base.txt",
+            "# comment",
+        ])
+
+        libraries = ReconAgent._parse_requirements_txt.__wrapped__(None, content)
+
+        assert [(lib.name, lib.version) for lib in libraries] == [
+            ("flask", "unknown"),
+            ("Django", ">=3.2,<4"),
+            ("requests", "~= 2.31"),
+        ]
+
+
+class TestTechStack:
+    """测试技术栈识别"""
+
+    def test_manifests_and_extensions(self, tmp_path):
+        """依赖文件、扩展名和框架特征文件共同决定技术栈"""
+        (tmp_path / "package.json").write_text("{}")
+        (tmp_path / "svc" / "api").mkdir(parents=True)
+        (tmp_path / "svc" / "api" / "requirements.txt").write_text("")
+        (tmp_path / "svc" / "Main.GO").write_text("")
+        (tmp_path / "manage.py").write_text("")
+
+        stack = asyncio.run(ReconAgent()._identify_tech_stack(str(tmp_path)))
+
+        assert stack["languages"] == {"Go", "JavaScript", "Python"}
+        assert stack["frameworks"] == {"Django", "Node.js", "Python/Pip"}
+        assert stack["package_managers"] == {"npm", "pip"}
+
+    def test_extension_scan_prunes_ignored_and_caps(self, tmp_path):
+        """扩展名扫描跳过忽略目录，并受文件数量上限约束；浅层名称不受上限影响"""
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "dep.rb").write_text("")
+        (tmp_path / "a.py").write_text("")
+        (tmp_path / "svc" / "api").mkdir(parents=True)
+        (tmp_path / "svc" / "api" / "go.mod").write_text("")
+
+        assert recon_module._scan_tech_stack_files(tmp_path).languages == {"Python"}
+        capped = recon_module._scan_tech_stack_files(tmp_path, max_files=0)
+        assert capped.languages == set()
+        assert "go.mod" in capped.nested_names
+
+    def test_tool_caches_pruned(self, tmp_path):
+        """工具缓存和构建产物目录不参与扩展名扫描"""
+        (tmp_path / "main.go").write_text("")
+        for cache_dir in (".tox", ".mypy_cache", ".next"):
+            (tmp_path / cache_dir).mkdir()
+            (tmp_path / cache_dir / "x.py").write_text("")
+
+        assert recon_module._scan_tech_stack_files(tmp_path).languages == {"Go"}
+
+    def test_extension_scan_stops_once_languages_stable(self, tmp_path, monkeypatch):
+        """已识别到语言后连续多个目录无新语言即停止深入，浅层清单仍被识别"""
+        (tmp_path / "a.py").write_text("")
+        deep = tmp_path / "svc" / "d1" / "d2" / "d3"
+        deep.mkdir(parents=True)
+        (deep / "main.go").write_text("")
+        (tmp_path / "svc" / "d1" / "go.mod").write_text("")
+
+        assert recon_module._scan_tech_stack_files(tmp_path).languages == {"Go", "Python"}
+
+        monkeypatch.setattr(recon_module, "_EXTENSION_SCAN_STABLE_DIRS", 1)
+        scan = recon_module._scan_tech_stack_files(tmp_path)
+        assert scan.languages == {"Python"}
+        assert "go.mod" in scan.nested_names
+
+    def test_parallel_walk_matches_sequential(self, tmp_path, monkeypatch):
+        """子目录较多时并行遍历，结果与顺序遍历一致"""
+        for i, ext in enumerate([".py", ".go", ".rs", ".rb", ".php", ".java"]):
+            (tmp_path / f"pkg{i}" / "deep").mkdir(parents=True)
+            (tmp_path / f"pkg{i}" / "deep" / f"m{ext}").write_text("")
+        expected = {"Python", "Go", "Rust", "Ruby", "PHP", "Java"}
+
+        assert recon_module._scan_tech_stack_files(tmp_path).languages == expected
+        monkeypatch.setattr(recon_module, "_PARALLEL_WALK_MIN_SUBDIRS", 100)
+        assert recon_module._scan_tech_stack_files(tmp_path).languages == expected
+
+    def test_serialized_at_boundary(self):
+        """输出时转换为有序列表"""
+        from app.agents.recon import _tech_stack_to_dict
+
+        stack = {"languages": {"Python", "Go"}, "frameworks": set(), "package_managers": {"pip"}}
+
+        assert _tech_stack_to_dict(stack) == {
+            "languages": ["Go", "Python"], "frameworks": [], "package_managers": ["pip"],
+        }
@@ -0,0 +1,67 @@
+"""
+审计状态单元测试
+"""
+import pytest
+
+from app.core.state import (
+    AgentExecutionResult,
+    AuditStatus,
+    create_initial_audit_state,
+    merge_agent_result,
+)
+
+
+class TestAuditState:
+    """测试 AuditState 槽位数据类"""
+
+    def test_initial_state_defaults(self):
+        """初始状态使用默认值，列表字段互不共享"""
+        first = create_initial_audit_state("audit-1", "proj-1", "full")
+        second = create_initial_audit_state("audit-2", "proj-1", "full")
+
+        assert first.status == AuditStatus.PENDING
+        assert first.current_stage == "initialization"
+        assert first.retry_count == 0
+        assert first.errors is not second.errors
+
+    def test_slots_reject_unknown_fields(self):
+        """slots 类不接受未声明的字段"""
+        state = create_initial_audit_state("audit-1", "proj-1", "full")
+        with pytest.raises(AttributeError):
+            state.unknown_field = 1
+
+    def test_merge_success_result(self):
+        """成功结果写入对应字段"""
+        state = create_initial_audit_state("audit-1", "proj-1", "full")
+        result = AgentExecutionResult(
+            agent_name="analysis",
+            status="success",
+            result={"vulnerabilities": [{"id": "v1"}]},
+            thinking_chain=[],
+            duration_ms=10,
+        )
+
+        merge_agent_result(state, result)
+
+        assert state.current_stage == "analysis"
+        assert state.analysis_results == [{"id": "v1"}]
+        assert state.status == AuditStatus.RUNNING
+        assert state.to_dict()["analysis_results"] == [{"id": "v1"}]
+
+    def test_merge_failures_mark_failed(self):
+        """连续失败三次后状态置为失败"""
+        state = create_initial_audit_state("audit-1", "proj-1", "full")
+        result = AgentExecutionResult(
+            agent_name="recon",
+            status="error",
+            result=None,
+            thinking_chain=[],
+            duration_ms=5,
+            error="boom",
+        )
+
+        for _ in range(3):
+            merge_agent_result(state, result)
+
+        assert state.errors == ["boom"] * 3
+        assert state.status == AuditStatus.FAILED
@@ -0,0 +1,46 @@
+"""
+MCPToolAdapter 单元测试
+"""
+import pytest
+
+from app.core.mcp_tools import MCPTool, ToolResult, get_tool_registry
+from app.core.tool_adapter import MCPToolAdapter
+
+
+class TestLLMToolsCache:
+    """LLM 工具 schema 缓存测试"""
+
+    def test_schema_reused_across_adapters(self):
+        """测试不同适配器实例复用同一份 schema"""
+        first = MCPToolAdapter(context={"audit_id": "a"}).get_llm_tools()
+        second = MCPToolAdapter(context={"audit_id": "b"}).get_llm_tools()
+
+        assert first is second
+        assert len(first) == len(get_tool_registry().list_tools())
+
+    def test_cache_invalidated_on_register(self):
+        """测试注册新工具后缓存失效"""
+        registry = get_tool_registry()
+        before = MCPToolAdapter().get_llm_tools()
+
+        class _CacheProbeTool(MCPTool):
+            name = "_cache_probe"
+            description = "probe"
+
+            async def execute(self, **kwargs) -> ToolResult:
+                return ToolResult.success("ok")
+
+        registry.register(_CacheProbeTool)
+        try:
+            after = MCPToolAdapter().get_llm_tools()
+            assert after is not before
+            assert "_cache_probe" in [t["function"]["name"] for t in after]
+        finally:
+            registry._tools.pop("_cache_probe", None)
+            registry._version += 1
+
+    def test_force_refresh_param_exposed(self):
+        """测试所有工具 schema 都暴露 force_refresh 参数"""
+        tools = MCPToolAdapter().get_llm_tools()
+
+        assert all("force_refresh" in t["function"]["parameters"]["properties"] for t in tools)
@@ -0,0 +1,207 @@
+"""
+ToolCallLoop 单元测试
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.core.tool_loop import ToolCallLoop
+
+
+class _ScriptedLLM:
+    """按预设顺序返回响应的 LLM"""
+
+    def __init__(self, responses):
+        self._responses = list(responses)
+
+    async def generate_with_tools(self, messages, tools):
+        return self._responses.pop(0)
+
+
+def _tool_call(call_id, name, arguments):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+
+class TestParallelToolCalls:
+    """同轮工具调用并发测试"""
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_run_concurrently_in_order(self):
+        """测试同轮工具调用并发执行，历史按原顺序记录"""
+        async def slow(name):
+            await asyncio.sleep(0.2)
+            return f"done {name}"
+
+        llm = _ScriptedLLM([
+            {"content": "", "tool_calls": [_tool_call("c1", "slow", {"name": "a"}), _tool_call("c2", "slow", {"name": "b"})]},
+            {"content": "finished", "tool_calls": []},
+        ])
+        loop = ToolCallLoop(llm=llm, tools=[], tool_handlers={"slow": slow}, system_prompt="sys", enable_streaming=False)
+
+        start = time.perf_counter()
+        result = await loop.run("go")
+        elapsed = time.perf_counter() - start
+
+        assert result == "finished"
+        assert elapsed < 0.35
+        tool_msgs = [m for m in loop.history if m["role"] == "tool"]
+        assert [m["tool_call_id"] for m in tool_msgs] == ["c1", "c2"]
+        assert [m["content"] for m in tool_msgs] == ["done a", "done b"]
+        assert loop.tool_call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_tool_call_becomes_error_observation(self):
+        """测试单个工具失败不影响同轮其他调用"""
+        async def boom():
+            raise RuntimeError("bad")
+
+        async def ok():
+            return "fine"
+
+        llm = _ScriptedLLM([
+            {"content": "", "tool_calls": [_tool_call("c1", "boom", {}), _tool_call("c2", "ok", {})]},
+            {"content": "end", "tool_calls": []},
+        ])
+        loop = ToolCallLoop(llm=llm, tools=[], tool_handlers={"boom": boom, "ok": ok}, system_prompt="sys", enable_streaming=False)
+
+        await loop.run("go")
+
+        tool_msgs = [m["content"] for m in loop.history if m["role"] == "tool"]
+        assert tool_msgs == ["Error executing boom: bad", "fine"]
+
+
+class TestToolArguments:
+    """工具参数解析与完成信号测试"""
+
+    @pytest.mark.asyncio
+    async def test_invalid_json_arguments(self):
+        """测试参数不是合法 JSON 时返回错误观察结果"""
+        llm = _ScriptedLLM([
+            {"content": "", "tool_calls": [{"id": "c1", "type": "function", "function": {"name": "ok", "arguments": "{bad"}}]},
+            {"content": "end", "tool_calls": []},
+        ])
+        loop = ToolCallLoop(llm=llm, tools=[], tool_handlers={"ok": lambda: "x"}, system_prompt="sys", enable_streaming=False)
+
+        await loop.run("go")
+
+        assert [m["content"] for m in loop.history if m["role"] == "tool"] == ["Error: Invalid JSON arguments for ok"]
+
+    @pytest.mark.asyncio
+    async def test_completion_signal_stops_loop(self):
+        """测试工具返回完成标记后不再调用 LLM"""
+        async def finish_analysis():
+            return {"__audit_complete__": True, "summary": "done"}
+
+        llm = _ScriptedLLM([
+            {"content": "", "tool_calls": [_tool_call("c1", "finish_analysis", {})]},
+        ])
+        loop = ToolCallLoop(llm=llm, tools=[], tool_handlers={"finish_analysis": finish_analysis}, system_prompt="sys", enable_streaming=False)
+
+        assert await loop.run("go") == "done"
+
+
+class TestToolResultCache:
+    """工具结果缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_reuse_result(self):
+        """测试相同参数的调用复用结果，force_refresh 强制重新执行"""
+        calls = []
+
+        async def scan(path):
+            calls.append(path)
+            return f"scanned {path} #{len(calls)}"
+
+        llm = _ScriptedLLM([
+            {"content": "", "tool_calls": [_tool_call("c1", "scan", {"path": "a"})]},
+            {"content": "", "tool_calls": [_tool_call("c2", "scan", {"path": "a"})]},
+            {"content": "", "tool_calls": [_tool_call("c3", "scan", {"path": "a", "force_refresh": True})]},
+            {"content": "end", "tool_calls": []},
+        ])
+        loop = ToolCallLoop(llm=llm, tools=[], tool_handlers={"scan": scan}, system_prompt="sys", enable_streaming=False)
+
+        await loop.run("go")
+
+        tool_msgs = [m["content"] for m in loop.history if m["role"] == "tool"]
+        assert calls == ["a", "a"]
+        assert tool_msgs == ["scanned a #1", "scanned a #1", "scanned a #2"]
+
+    @pytest.mark.asyncio
+    async def test_uncacheable_tool_always_runs(self):
+        """测试有副作用的工具不缓存"""
+        calls = []
+
+        async def report_finding(title):
+            calls.append(title)
+            return "ok"
+
+        llm = _ScriptedLLM([
+            {"content": "", "tool_calls": [_tool_call("c1", "report_finding", {"title": "x"})]},
+            {"content": "", "tool_calls": [_tool_call("c2", "report_finding", {"title": "x"})]},
+            {"content": "end", "tool_calls": []},
+        ])
+        loop = ToolCallLoop(llm=llm, tools=[], tool_handlers={"report_finding": report_finding}, system_prompt="sys", enable_streaming=False)
+
+        await loop.run("go")
+
+        assert calls == ["x", "x"]
+
+    def test_cache_key_ignores_argument_order(self):
+        """测试缓存键与参数顺序无关，orjson 无法编码时退回标准库"""
+        loop = ToolCallLoop(llm=_ScriptedLLM([]), tools=[], tool_handlers={}, system_prompt="sys", enable_streaming=False)
+
+        assert loop._tool_cache_key("scan", {"a": 1, "b": "中"}) == loop._tool_cache_key("scan", {"b": "中", "a": 1})
+        assert loop._tool_cache_key("scan", {"n": 2 ** 70}) == ("scan", b'{"n": 1180591620717411303424}')
+        assert loop._tool_cache_key("scan", {"s": {1, 2}}) is None
+        assert loop._tool_cache_key("report_finding", {"a": 1}) is None
+
+
+class TestSharedToolCache:
+    """跨审计共享缓存测试"""
+
+    @pytest.mark.asyncio
+    async def test_read_only_result_shared_across_loops(self):
+        """测试同一项目的只读工具结果在不同循环间复用"""
+        from app.core.tool_cache import get_tool_result_cache
+
+        get_tool_result_cache().invalidate("proj-shared")
+        calls = []
+
+        async def read_file(path):
+            calls.append(path)
+            return f"content of {path}"
+
+        for _ in range(2):
+            llm = _ScriptedLLM([
+                {"content": "", "tool_calls": [_tool_call("c1", "read_file", {"path": "a.py"})]},
+                {"content": "end", "tool_calls": []},
+            ])
+            loop = ToolCallLoop(
+                llm=llm, tools=[], tool_handlers={"read_file": read_file}, system_prompt="sys",
+                enable_streaming=False, shared_cache_namespace="proj-shared",
+            )
+            await loop.run("go")
+
+        assert calls == ["a.py"]
+        assert get_tool_result_cache().invalidate("proj-shared") == 1
+
+
+class TestToolResultCacheStore:
+    """ToolResultCache 测试"""
+
+    def test_ttl_and_capacity(self):
+        """测试过期淘汰和容量淘汰"""
+        from app.core.tool_cache import ToolResultCache
+
+        cache = ToolResultCache(ttl_seconds=-1, max_entries=2)
+        cache.set("p", ("a",), "1")
+        assert cache.get("p", ("a",)) is None
+
+        cache = ToolResultCache(max_entries=2)
+        cache.set("p", ("a",), "1")
+        cache.set("p", ("b",), "2")
+        cache.set("p", ("c",), "3")
+        assert cache.get("p", ("a",)) is None
+        assert cache.get("p", ("c",)) == "3"
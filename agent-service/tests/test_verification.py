@@ -0,0 +1,232 @@
+"""
+VerificationAgent 单元测试
+"""
+import asyncio
+
+import app.agents.verification as verification_module
+from app.agents.verification import VerificationAgent
+
+
+class _FakeContainer:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.commands = []
+        self.removed = False
+
+    def exec_run(self, cmd, demux=False):
+        if self.fail:
+            raise RuntimeError("容器已退出")
+        self.commands.append(cmd)
+        if cmd[-1] == "exit(3)":
+            return 3, b""
+        return 0, b"ok"
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class _FakeDockerClient:
+    """记录创建的容器，按顺序指定每个容器是否损坏"""
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.created = []
+        self.containers = self
+
+    def run(self, **kwargs):
+        container = _FakeContainer(fail=self.failures.pop(0) if self.failures else False)
+        self.created.append(container)
+        return container
+
+
+class TestConcurrentVerification:
+    """测试并发验证"""
+
+    def test_bounded_concurrency_and_order(self):
+        """并发数受配置限制，结果保持发现顺序，Info 级别被跳过"""
+        agent = VerificationAgent(config={"enable_sandbox": False, "max_concurrent_verifications": 2})
+        in_flight = 0
+        max_in_flight = 0
+
+        async def verify(finding):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"finding_id": finding["id"], "verified": finding["id"] % 2 == 0, "confidence": 0.5}
+
+        agent._verify_finding = verify
+        findings = [{"id": i, "severity": "high"} for i in range(5)] + [{"id": 9, "severity": "info"}]
+
+        result = asyncio.run(agent.execute({"findings": findings}))
+
+        assert max_in_flight == 2
+        assert [v["finding_id"] for v in result["verified"]] == [0, 1, 2, 3, 4]
+        assert result["total_verified"] == 3
+        assert result["total_false_positives"] == 2
+
+    def test_failed_finding_recorded_as_unverified(self):
+        """单个漏洞验证抛出异常时记为未验证，不影响其他漏洞"""
+        agent = VerificationAgent(config={"enable_sandbox": False})
+
+        async def verify(finding):
+            if finding["id"] == 1:
+                raise RuntimeError("LLM 超时")
+            return {"finding_id": finding["id"], "verified": True, "confidence": 0.9}
+
+        agent._verify_finding = verify
+        findings = [{"id": 0, "severity": "high"}, {"id": 1, "severity": "medium"}]
+
+        result = asyncio.run(agent.execute({"findings": findings}))
+
+        assert result["verified"][1] == {
+            "finding_id": 1, "verified": False, "confidence": 0.0, "poc_output": "", "error": "LLM 超时",
+        }
+        assert result["total_verified"] == 1
+
+
+class TestPocPlan:
+    """测试 PoC 与验证计划的合并生成"""
+
+    def test_parse_plan_and_fallback(self):
+        """JSON 响应解析为验证计划，非 JSON 响应整体作为 PoC 代码"""
+        agent = VerificationAgent(config={"enable_sandbox": False})
+
+        plan = agent._parse_poc_plan(
+            '```json\n{"poc": "print(\'PWNED\')", "expected_evidence_markers": ["PWNED", 1], "success_exit_code": 0}\n```'
+        )
+        assert plan == {"poc": "print('PWNED')", "expected_evidence_markers": ["PWNED"], "success_exit_code": 0}
+
+        fallback = agent._parse_poc_plan("```python\nd = {'a': 1}\nprint(d)\n```")
+        assert fallback == {"poc": "d = {'a': 1}\nprint(d)", "expected_evidence_markers": [], "success_exit_code": 0}
+
+    def test_matched_evidence_skips_llm_analysis(self):
+        """输出包含预期证据时不再调用 LLM 分析，不明确时才调用"""
+        agent = VerificationAgent(config={"enable_sandbox": False})
+        analysis_calls = []
+        outputs = iter(["payload PWNED", "nothing here"])
+
+        async def plan(finding):
+            return {"poc": "print(1)", "expected_evidence_markers": ["PWNED"], "success_exit_code": 0}
+
+        async def execute(code, environment):
+            return {"exit_code": 0, "output": next(outputs)}
+
+        async def analyze(execution_result, finding, poc_code):
+            analysis_calls.append(execution_result["output"])
+            return {"verified": False, "confidence": 0.2}
+
+        agent._generate_poc_and_analysis_plan = plan
+        agent._execute_in_sandbox = execute
+        agent._analyze_execution_with_llm = analyze
+
+        first = asyncio.run(agent._verify_finding({"id": 1}))
+        second = asyncio.run(agent._verify_finding({"id": 2}))
+
+        assert first["verified"] is True
+        assert second["verified"] is False
+        assert analysis_calls == ["nothing here"]
+
+    def test_marker_in_poc_source_not_evidence(self):
+        """PoC 源码中直接出现的标记不作为证据，交给 LLM 分析"""
+        agent = VerificationAgent(config={"enable_sandbox": False})
+        analysis_calls = []
+
+        async def plan(finding):
+            return {"poc": "print('VULNERABLE')", "expected_evidence_markers": ["VULNERABLE"], "success_exit_code": 0}
+
+        async def execute(code, environment):
+            return {"exit_code": 0, "output": "VULNERABLE"}
+
+        async def analyze(execution_result, finding, poc_code):
+            analysis_calls.append(poc_code)
+            return {"verified": False, "confidence": 0.1}
+
+        agent._generate_poc_and_analysis_plan = plan
+        agent._execute_in_sandbox = execute
+        agent._analyze_execution_with_llm = analyze
+
+        result = asyncio.run(agent._verify_finding({"id": 1}))
+
+        assert result["verified"] is False
+        assert analysis_calls == ["print('VULNERABLE')"]
+
+
+class TestSandboxPool:
+    """测试沙箱容器复用"""
+
+    def _agent(self, monkeypatch, client, pool_size=1):
+        monkeypatch.setattr(verification_module, "DOCKER_AVAILABLE", True)
+        agent = VerificationAgent(config={"enable_sandbox": False, "sandbox_pool_size": pool_size})
+        agent._docker_client = client
+        return agent
+
+    def test_shared_across_instances_and_replaced(self, monkeypatch):
+        """不同实例共享容器池；exec 失败的容器被移除，下次执行重新创建"""
+        monkeypatch.setattr(verification_module, "_sandbox_pool", None)
+        client = _FakeDockerClient([False, True, False])
+        env = {"timeout": 5}
+
+        async def run():
+            first = await self._agent(monkeypatch, client)._execute_in_sandbox("print(1)", env)
+            second = await self._agent(monkeypatch, client)._execute_in_sandbox("print(2)", env)
+            await verification_module.get_sandbox_pool().close()
+            broken = await self._agent(monkeypatch, client)._execute_in_sandbox("print(3)", env)
+            recovered = await self._agent(monkeypatch, client)._execute_in_sandbox("print(4)", env)
+            return first, second, broken, recovered
+
+        first, second, broken, recovered = asyncio.run(run())
+
+        assert first == second == recovered == {"exit_code": 0, "output": "ok"}
+        assert broken["exit_code"] == -1
+        reset = ["sh", "-c", verification_module._POC_RESET_SCRIPT]
+        assert client.created[0].commands == [
+            ["sh", "-c", verification_module._POC_EXEC_SCRIPT, "5", "print(1)"], reset,
+            ["sh", "-c", verification_module._POC_EXEC_SCRIPT, "5", "print(2)"], reset,
+        ]
+        assert client.created[0].removed and client.created[1].removed
+        assert len(client.created) == 3 and not client.created[2].removed
+
+    def test_failed_poc_container_not_reused(self, monkeypatch):
+        """PoC 非零退出（包括超时）时容器不清理复用，直接移除"""
+        monkeypatch.setattr(verification_module, "_sandbox_pool", None)
+        client = _FakeDockerClient([])
+        agent = self._agent(monkeypatch, client)
+
+        async def run():
+            failed = await agent._execute_in_sandbox("exit(3)", {})
+            passed = await agent._execute_in_sandbox("print(1)", {})
+            return failed, passed
+
+        failed, passed = asyncio.run(run())
+
+        assert failed == {"exit_code": 3, "output": ""}
+        assert passed == {"exit_code": 0, "output": "ok"}
+        assert len(client.created) == 2
+        assert client.created[0].removed and len(client.created[0].commands) == 1
+        assert not client.created[1].removed
+
+    def test_close_during_execution_and_overflow(self, monkeypatch):
+        """关闭时正在执行的容器归还时被移除；超出空闲上限的容器不保留"""
+        monkeypatch.setattr(verification_module, "_sandbox_pool", None)
+        client = _FakeDockerClient([])
+        agent = self._agent(monkeypatch, client)
+        pool = verification_module.get_sandbox_pool()
+        original_exec = agent._exec_in_container
+
+        def closing_exec(container, code, timeout):
+            if code == "close":
+                asyncio.run(pool.close())
+            return original_exec(container, code, timeout)
+
+        agent._exec_in_container = closing_exec
+
+        async def run():
+            await agent._execute_in_sandbox("close", {})
+            await asyncio.gather(*(agent._execute_in_sandbox("print(1)", {}) for _ in range(3)))
+
+        asyncio.run(run())
+
+        assert client.created[0].removed
+        assert sorted(c.removed for c in client.created[1:]) == [False, True, True]
@@ -1,5 +1,6 @@
 use actix_web::{web, HttpResponse, Responder};
 use serde::{Deserialize, Serialize};
+use std::collections::{HashMap, HashSet};
 use std::path::{Path as StdPath, PathBuf};
 
 #[derive(Serialize, Deserialize)]
@@ -7,6 +8,11 @@ pub struct ReadFileRequest {
     pub path: String,
 }
 
+#[derive(Serialize, Deserialize)]
+pub struct ReadFilesBatchRequest {
+    pub paths: Vec<String>,
+}
+
 #[derive(Serialize, Deserialize)]
 pub struct ListFilesRequest {
     pub directory: String,
@@ -14,6 +20,28 @@ pub struct ListFilesRequest {
     pub recursive: bool,
 }
 
+#[derive(Serialize, Deserialize)]
+pub struct ListFilesBatchRequest {
+    pub directories: Vec<String>,
+}
+
+#[derive(Serialize, Deserialize)]
+pub struct WalkRequest {
+    pub root: String,
+    // 未指定时遍历整棵树（与 /list 的递归列出一致）
+    #[serde(default)]
+    pub max_depth: Option<usize>,
+    #[serde(default)]
+    pub ignore: Vec<String>,
+}
+
+#[derive(Serialize)]
+pub struct WalkEntry {
+    pub path: String,
+    pub name: String,
+    pub is_dir: bool,
+}
+
 #[derive(Serialize, Deserialize)]
 pub struct SearchFilesRequest {
     pub query: String,
@@ -29,7 +57,10 @@ pub struct FileInfo {
 pub fn configure_files_routes(cfg: &mut web::ServiceConfig) {
     cfg
         .route("/read", web::get().to(read_file))
+        .route("/read_batch", web::post().to(read_files_batch))
         .route("/list", web::get().to(list_files))
+        .route("/list_batch", web::post().to(list_files_batch))
+        .route("/walk", web::post().to(walk_files))
         .route("/search", web::get().to(search_files));
 }
 
@@ -50,6 +81,21 @@ pub async fn read_file(query: web::Query<ReadFileRequest>) -> impl Responder {
     }
 }
 
+// 批量读取文件内容（并发读取），不存在或读取失败的文件不出现在结果中
+pub async fn read_files_batch(body: web::Json<ReadFilesBatchRequest>) -> impl Responder {
+    let reads = body.paths.iter().map(|path| async move {
+        (path, tokio::fs::read_to_string(path).await.ok())
+    });
+
+    let contents: HashMap<&String, String> = futures_util::future::join_all(reads)
+        .await
+        .into_iter()
+        .filter_map(|(path, content)| content.map(|c| (path, c)))
+        .collect();
+
+    HttpResponse::Ok().json(contents)
+}
+
 pub async fn list_files(query: web::Query<ListFilesRequest>) -> impl Responder {
     let path = PathBuf::from(&query.directory);
 
@@ -70,6 +116,24 @@ pub async fn list_files(query: web::Query<ListFilesRequest>) -> impl Responder {
     }
 }
 
+// 批量递归列出多个目录下的文件（并发读取），不存在或读取失败的目录不出现在结果中
+pub async fn list_files_batch(body: web::Json<ListFilesBatchRequest>) -> impl Responder {
+    let listings = body.directories.iter().map(|directory| async move {
+        let mut entries = vec![];
+        let result = _list_files_recursive(StdPath::new(directory), &mut entries).await;
+        entries.sort();
+        (directory, result.ok().map(|_| entries))
+    });
+
+    let files: HashMap<&String, Vec<String>> = futures_util::future::join_all(listings)
+        .await
+        .into_iter()
+        .filter_map(|(directory, entries)| entries.map(|e| (directory, e)))
+        .collect();
+
+    HttpResponse::Ok().json(files)
+}
+
 // 递归列出所有文件
 async fn _list_files_recursive(dir: &StdPath, entries: &mut Vec<String>) -> Result<(), anyhow::Error> {
     let mut rd = tokio::fs::read_dir(dir).await?;
@@ -101,6 +165,64 @@ async fn _list_files_recursive(dir: &StdPath, entries: &mut Vec<String>) -> Resu
     Ok(())
 }
 
+// 按层遍历目录（同一层的目录并发读取），指定 max_depth 时最多遍历该层数，跳过 ignore 中的目录名
+// 符号链接不跟随（file_type 不解析链接），不会因链接成环而无限遍历
+pub async fn walk_files(body: web::Json<WalkRequest>) -> impl Responder {
+    let root = PathBuf::from(&body.root);
+
+    if !root.exists() {
+        return HttpResponse::Ok().json(vec![] as Vec<WalkEntry>);
+    }
+
+    let ignore: HashSet<&str> = body.ignore.iter().map(String::as_str).collect();
+    let mut entries = vec![];
+    let mut level = vec![root];
+    let mut depth = 0;
+
+    while body.max_depth.map_or(true, |max_depth| depth < max_depth) {
+        depth += 1;
+        let listings = futures_util::future::join_all(
+            level.iter().map(|dir| _read_dir_entries(dir.as_path()))
+        ).await;
+
+        let mut next_level = vec![];
+        // 单个目录读取失败时跳过该目录
+        for (path, is_dir) in listings.into_iter().flat_map(Result::unwrap_or_default) {
+            let (Some(path_str), Some(name)) = (path.to_str(), path.file_name().and_then(|n| n.to_str())) else {
+                continue;
+            };
+
+            if is_dir {
+                if ignore.contains(name) {
+                    continue;
+                }
+                next_level.push(path.clone());
+            }
+
+            entries.push(WalkEntry { path: path_str.to_string(), name: name.to_string(), is_dir });
+        }
+
+        if next_level.is_empty() {
+            break;
+        }
+        level = next_level;
+    }
+
+    HttpResponse::Ok().json(entries)
+}
+
+async fn _read_dir_entries(dir: &StdPath) -> Result<Vec<(PathBuf, bool)>, anyhow::Error> {
+    let mut rd = tokio::fs::read_dir(dir).await?;
+    let mut entries = vec![];
+
+    while let Some(entry) = rd.next_entry().await? {
+        let is_dir = entry.file_type().await?.is_dir();
+        entries.push((entry.path(), is_dir));
+    }
+
+    Ok(entries)
+}
+
 pub async fn search_files(query: web::Query<SearchFilesRequest>) -> impl Responder {
     let path = PathBuf::from(&query.path);
     let query_str = &query.query;